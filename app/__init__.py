@@ -1,7 +1,34 @@
 """
-This module initializes the app package and imports key classes.
+This module initializes the app package and exposes key classes.
+
+The classes are imported on first access, so importing the arithmetic core
+(app.strategies, app.strategy_factory, app.plugins) does not import the REPL,
+the calculator history or pandas.
 """
 
-from .app import App
-from .calculator import Calculator
-from .repl import REPL
+import importlib
+
+_EXPORTS = {
+    'App': 'app.app',
+    'Calculator': 'app.calculator',
+    'REPL': 'app.repl'
+}
+
+def __getattr__(name):
+    """
+    Import an exported class on first access.
+
+    Args:
+        name (str): The attribute name.
+
+    Returns:
+        type: The exported class.
+
+    Raises:
+        AttributeError: If the name is not exported by the package.
+    """
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,215 @@
+"""
+This module defines running summary statistics of the results of each operation,
+updated in O(1) per operation and rebuilt from a HistoryStore in one vectorized pass.
+"""
+
+import math
+import numpy as np
+
+class RunningStats:
+    """
+    The count, sum, mean, variance, min and max of a stream of results, updated with
+    Welford's algorithm, and the number of failed operations.
+
+    Results that are not numbers (NaN) are not counted.
+    """
+    def __init__(self):
+        """
+        Initialize empty RunningStats.
+        """
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.errors = 0
+
+    def update(self, value):
+        """
+        Add one result.
+
+        Args:
+            value (float): The result of an operation.
+        """
+        if math.isnan(value):
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, count, mean, m2, minimum, maximum):
+        """
+        Add a group of results given by its own statistics, using Chan's parallel
+        variant of Welford's algorithm.
+
+        Args:
+            count (int): The number of results in the group.
+            mean (float): The mean of the group.
+            m2 (float): The sum of squared differences from the mean of the group.
+            minimum (float): The smallest result of the group.
+            maximum (float): The largest result of the group.
+        """
+        # pylint: disable=too-many-arguments
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.total += mean * count
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+
+    @property
+    def variance(self):
+        """
+        Get the sample variance of the results.
+
+        Returns:
+            float: The variance, or NaN for fewer than two results.
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    def to_dict(self):
+        """
+        Get the statistics as a dictionary.
+
+        Returns:
+            dict: The count, sum, mean, variance, min, max and error count. Statistics
+            of an empty stream are NaN.
+        """
+        empty = self.count == 0
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': math.nan if empty else self.mean,
+            'variance': self.variance,
+            'min': math.nan if empty else self.min,
+            'max': math.nan if empty else self.max,
+            'errors': self.errors
+        }
+
+def group_stats(codes, values, groups):
+    """
+    Compute the statistics of each group of values in one vectorized pass.
+
+    Args:
+        codes (np.ndarray): The group code of each value, from 0 to groups - 1.
+        values (np.ndarray): The values. NaN values are ignored.
+        groups (int): The number of groups.
+
+    Returns:
+        tuple: Arrays of the count, mean, m2, min and max of each group.
+    """
+    keep = ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+    counts = np.bincount(codes, minlength=groups)
+    sums = np.bincount(codes, weights=values, minlength=groups)
+    means = np.divide(sums, counts, out=np.zeros(groups), where=counts > 0)
+    m2 = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=groups)
+    minimum = np.full(groups, math.inf)
+    maximum = np.full(groups, -math.inf)
+    np.minimum.at(minimum, codes, values)
+    np.maximum.at(maximum, codes, values)
+    return counts, means, m2, minimum, maximum
+
+class OperationAggregates:
+    """
+    RunningStats of the results of each operation.
+    """
+    def __init__(self):
+        """
+        Initialize empty OperationAggregates.
+        """
+        self.stats = {}
+
+    def _stats(self, operation):
+        """
+        Get the RunningStats of an operation, creating them if needed.
+        """
+        stats = self.stats.get(operation)
+        if stats is None:
+            stats = self.stats[operation] = RunningStats()
+        return stats
+
+    def update(self, operation, result):
+        """
+        Add the result of one operation.
+
+        Args:
+            operation (str): The operation performed.
+            result (float): The result of the operation.
+        """
+        try:
+            value = float(result)
+        except (TypeError, ValueError, OverflowError):
+            value = math.nan
+        self._stats(operation).update(value)
+
+    def update_batch(self, names, codes, results):
+        """
+        Add the results of a batch of operations.
+
+        Args:
+            names (list): The distinct operation names of the batch.
+            codes (np.ndarray): The index into `names` of each operation.
+            results (np.ndarray): The results of the operations.
+        """
+        groups = group_stats(np.asarray(codes, dtype=np.intp),
+                             np.asarray(results, dtype=np.float64), len(names))
+        for name, count, mean, m2, minimum, maximum in zip(names, *groups):
+            if count:
+                self._stats(name).merge(int(count), float(mean), float(m2),
+                                        float(minimum), float(maximum))
+
+    def record_errors(self, operation, count=1):
+        """
+        Count failed operations.
+
+        Args:
+            operation (str): The operation that failed.
+            count (int, optional): The number of failures. Defaults to 1.
+        """
+        self._stats(operation).errors += count
+
+    def rebuild(self, store):
+        """
+        Recompute the statistics from a HistoryStore, keeping the error counts, which
+        are not part of the history.
+
+        Args:
+            store (HistoryStore): The history of operations.
+        """
+        errors = {name: stats.errors for name, stats in self.stats.items() if stats.errors}
+        self.stats = {}
+        size = len(store)
+        self.update_batch(store.operations, store.codes[:size], store.result[:size])
+        for name, count in errors.items():
+            self.record_errors(name, count)
+
+    def clear(self):
+        """
+        Remove all statistics.
+        """
+        self.stats = {}
+
+    def summary(self, operation=None):
+        """
+        Get the statistics of one operation or of every operation.
+
+        Args:
+            operation (str, optional): The operation. Defaults to None for all of them.
+
+        Returns:
+            dict: The statistics of the operation, or the statistics of every
+            operation keyed by name.
+        """
+        if operation is not None:
+            return self.stats.get(operation, RunningStats()).to_dict()
+        return {name: stats.to_dict() for name, stats in self.stats.items()}
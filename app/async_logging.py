@@ -0,0 +1,355 @@
+"""
+This module moves log output off the calculation path. Records are put on a queue
+by a handler that neither formats nor writes them, and a background listener
+formats them and hands them to the configured handlers, with file output written
+in batches.
+
+Enable it with the LOG_MODE=async environment variable. LOG_RATE_LIMIT sets the
+number of records per second each logger may emit below WARNING, 0 for no limit.
+"""
+
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger('app.async_logging')
+
+class RateLimitFilter(logging.Filter):
+    """
+    A filter that limits the records of each logger with a token bucket.
+
+    Records at WARNING or above always pass, and the number of records dropped per
+    logger is counted in `dropped`.
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(self, rate, burst=None):
+        """
+        Initialize the RateLimitFilter.
+
+        Args:
+            rate (float): The records per second each logger may emit.
+            burst (int, optional): The records a logger may emit at once. Defaults to
+            one second of records.
+
+        Raises:
+            ValueError: If the rate is not positive.
+        """
+        super().__init__()
+        if rate <= 0:
+            raise ValueError("Log rate limit must be positive")
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self.dropped = collections.Counter()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """
+        Check whether a record fits within the rate of its logger.
+
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            bool: True if the record should be emitted.
+        """
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(record.name, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[record.name] = (tokens, now)
+                self.dropped[record.name] += 1
+                return False
+            self._buckets[record.name] = (tokens - 1, now)
+            return True
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    A QueueHandler that queues records as they are, so their messages are only
+    formatted by the listener thread.
+
+    Arguments of a record are formatted after the logging call returns, so they
+    must not be modified afterwards. Records that do not fit in a full queue are
+    dropped and counted in `dropped` rather than blocking the caller.
+    """
+    def __init__(self, log_queue):
+        """
+        Initialize the LazyQueueHandler.
+
+        Args:
+            log_queue (queue.Queue): The queue records are put on.
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        """
+        Put a record on the queue, dropping it if the queue is full.
+
+        Args:
+            record (logging.LogRecord): The record.
+        """
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        """
+        Prepare a record for queuing without formatting it.
+
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            logging.LogRecord: The same record.
+        """
+        return record
+
+class BufferedFileHandler(logging.FileHandler):
+    """
+    A FileHandler that writes formatted records in batches, once `capacity` records
+    are pending, `flush_interval` seconds have passed since the last write or a
+    record at ERROR or above arrives.
+    """
+    def __init__(self, filename, mode='a', encoding=None, capacity=256, flush_interval=1.0):
+        """
+        Initialize the BufferedFileHandler.
+
+        Args:
+            filename (str): The log file.
+            mode (str, optional): The mode the file is opened with. Defaults to 'a'.
+            encoding (str, optional): The encoding of the file. Defaults to None.
+            capacity (int, optional): The number of pending records that triggers a
+            write. Defaults to 256.
+            flush_interval (float, optional): The longest time in seconds records stay
+            pending while new records arrive. Defaults to 1.0.
+        """
+        # pylint: disable=too-many-arguments
+        super().__init__(filename, mode, encoding, delay=True)
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def from_handler(cls, handler, capacity=256, flush_interval=1.0):
+        """
+        Create a BufferedFileHandler writing to the same file as a FileHandler, with
+        its level, formatter and filters.
+
+        Args:
+            handler (logging.FileHandler): The handler to replace.
+            capacity (int, optional): See __init__. Defaults to 256.
+            flush_interval (float, optional): See __init__. Defaults to 1.0.
+
+        Returns:
+            BufferedFileHandler: The new handler.
+        """
+        buffered = cls(handler.baseFilename, 'a', handler.encoding, capacity, flush_interval)
+        buffered.setLevel(handler.level)
+        buffered.setFormatter(handler.formatter)
+        for log_filter in handler.filters:
+            buffered.addFilter(log_filter)
+        return buffered
+
+    def emit(self, record):
+        """
+        Format a record and write the pending records if a batch is due.
+
+        Args:
+            record (logging.LogRecord): The record.
+        """
+        try:
+            self._pending.append(self.format(record) + self.terminator)
+        except Exception:  # pylint: disable=broad-exception-caught
+            self.handleError(record)
+            return
+        if (len(self._pending) >= self.capacity or record.levelno >= logging.ERROR
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Write the pending records to the file with a single write.
+        """
+        self.acquire()
+        try:
+            if self._pending:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(''.join(self._pending))
+                self._pending.clear()
+            if self.stream is not None:
+                self.stream.flush()
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self):
+        """
+        Write the pending records and close the file.
+        """
+        self.flush()
+        super().close()
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    A QueueListener that flushes its handlers whenever the queue has been idle for
+    `flush_interval` seconds, so buffered records are written during quiet periods.
+    """
+    def __init__(self, log_queue, *handlers, flush_interval=1.0):
+        """
+        Initialize the BatchingQueueListener.
+
+        Args:
+            log_queue (queue.Queue): The queue of records.
+            *handlers (logging.Handler): The handlers records are passed to.
+            flush_interval (float, optional): The idle time in seconds after which the
+            handlers are flushed. Defaults to 1.0.
+        """
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def enqueue_sentinel(self):
+        """
+        Queue the sentinel that stops the listener, waiting for room in a full queue.
+        """
+        self.queue.put(self._sentinel)
+
+    def dequeue(self, block):
+        """
+        Get the next record, flushing the handlers while the queue is idle.
+
+        Args:
+            block (bool): Whether to wait for a record.
+
+        Returns:
+            logging.LogRecord: The next record.
+        """
+        while True:
+            try:
+                return self.queue.get(block, self.flush_interval)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+class AsyncLogging:
+    """
+    Routes the output of a logger through a queue to a background listener.
+
+    Starting moves the handlers of the logger behind a LazyQueueHandler, replacing
+    FileHandlers with BufferedFileHandlers, and stopping drains the queue and puts
+    the original handlers back.
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, logger_name='app', queue_size=10_000, rate_limit=0, capacity=256,
+                 flush_interval=1.0):
+        """
+        Initialize the AsyncLogging.
+
+        Args:
+            logger_name (str, optional): The logger whose handlers are moved. Defaults
+            to 'app'.
+            queue_size (int, optional): The maximum number of queued records; further
+            records are dropped until the listener catches up. Defaults to 10000.
+            rate_limit (float, optional): The records per second each logger may emit
+            below WARNING, or 0 for no limit. Defaults to 0.
+            capacity (int, optional): The number of records per file write. Defaults
+            to 256.
+            flush_interval (float, optional): The longest time in seconds file output
+            is held back. Defaults to 1.0.
+        """
+        # pylint: disable=too-many-arguments
+        self.logger_name = logger_name
+        self.queue_size = queue_size
+        self.rate_limit = rate_limit
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.rate_filter = RateLimitFilter(rate_limit) if rate_limit > 0 else None
+        self.queue_handler = None
+        self._listener = None
+        self._handlers = []
+
+    @classmethod
+    def from_env(cls, logger_name='app'):
+        """
+        Create an AsyncLogging with the rate limit of the LOG_RATE_LIMIT environment
+        variable.
+
+        Args:
+            logger_name (str, optional): The logger whose handlers are moved. Defaults
+            to 'app'.
+
+        Returns:
+            AsyncLogging: The asynchronous logging setup.
+        """
+        return cls(logger_name, rate_limit=float(os.getenv('LOG_RATE_LIMIT', '0')))
+
+    @property
+    def running(self):
+        """
+        Check whether the listener is running.
+
+        Returns:
+            bool: True between start and stop.
+        """
+        return self._listener is not None
+
+    def start(self):
+        """
+        Move the handlers of the logger to the background listener.
+        """
+        if self._listener is not None:
+            return
+        target = logging.getLogger(self.logger_name)
+        self._handlers = target.handlers[:]
+        handlers = [BufferedFileHandler.from_handler(handler, self.capacity, self.flush_interval)
+                    if isinstance(handler, logging.FileHandler) else handler
+                    for handler in self._handlers]
+        log_queue = queue.Queue(self.queue_size)
+        self.queue_handler = LazyQueueHandler(log_queue)
+        if self.rate_filter is not None:
+            self.queue_handler.addFilter(self.rate_filter)
+        self._listener = BatchingQueueListener(log_queue, *handlers,
+                                               flush_interval=self.flush_interval)
+        for handler in self._handlers:
+            target.removeHandler(handler)
+        target.addHandler(self.queue_handler)
+        self._listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Write every queued record and put the original handlers of the logger back.
+        """
+        listener, self._listener = self._listener, None
+        if listener is None:
+            return
+        target = logging.getLogger(self.logger_name)
+        target.removeHandler(self.queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            if handler in self._handlers:
+                handler.flush()
+            else:
+                handler.close()
+        for handler in self._handlers:
+            target.addHandler(handler)
+        atexit.unregister(self.stop)
+        if self.queue_handler.dropped:
+            logger.warning("%d log records dropped because the log queue was full",
+                           self.queue_handler.dropped)
+        if self.rate_filter is not None and self.rate_filter.dropped:
+            logger.warning("Log records dropped by the rate limit: %s",
+                           dict(self.rate_filter.dropped))
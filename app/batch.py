@@ -0,0 +1,160 @@
+"""
+This module provides the non-interactive batch mode, which evaluates a stream of
+operations read from a file or stdin and writes one result per operation.
+
+Each input line is either "operation a b" separated by whitespace, or a JSON
+object such as {"op": "add", "a": 1, "b": 2}. Blank lines and lines starting
+with '#' are skipped. Lines are processed in chunks: each chunk is parsed in bulk,
+evaluated with one vectorized call per operation and written with a single write.
+"""
+
+import itertools
+import json
+import numpy as np
+from app.calculator import Calculator
+from app.strategy_factory import StrategyFactory
+
+CHUNKSIZE = 65_536
+
+ERROR_MESSAGES = {
+    'divide': "Cannot divide by zero",
+    'root': "Cannot take root with zero or of a negative number",
+    'power': "Result is not a finite number"
+}
+
+def error_message(operation):
+    """
+    Get the error message of a failed operation.
+
+    Args:
+        operation (str): The operation that failed.
+
+    Returns:
+        str: The reason the operation failed.
+    """
+    try:
+        StrategyFactory.create_strategy(operation)
+    except ValueError as error:
+        return str(error)
+    return ERROR_MESSAGES.get(operation, f"Operation '{operation}' failed")
+
+def _parse_fields(line):
+    """
+    Parse one input line into an operation and two operand strings.
+
+    Returns:
+        tuple: The operation and operands, or None if the line is malformed.
+    """
+    if line.startswith('{'):
+        try:
+            record = json.loads(line)
+            return (str(record.get('op', record.get('operation'))),
+                    record.get('a', record.get('operand1')),
+                    record.get('b', record.get('operand2')))
+        except (ValueError, AttributeError):
+            return None
+    fields = line.split()
+    return tuple(fields) if len(fields) == 3 else None
+
+def parse_chunk(lines):
+    """
+    Parse a chunk of input lines.
+
+    Chunks of plain "operation a b" lines are parsed with a single split and bulk
+    float conversion. Chunks with JSON lines or lines without exactly three fields
+    are parsed line by line.
+
+    Args:
+        lines (list): The input lines, without blank or comment lines.
+
+    Returns:
+        tuple: The operations (object array), the first and second operands
+        (float64 arrays) and a mask of malformed lines.
+    """
+    split = [line.split() for line in lines]
+    if all(len(fields) == 3 for fields in split) and not any(
+            line.startswith('{') for line in lines):
+        operations, a, b = zip(*split) if split else ((), (), ())
+        try:
+            return (np.array(operations, dtype=object),
+                    np.array(a, dtype=np.float64),
+                    np.array(b, dtype=np.float64),
+                    np.zeros(len(lines), dtype=bool))
+        except ValueError:
+            pass
+    operations = np.empty(len(lines), dtype=object)
+    a = np.full(len(lines), np.nan)
+    b = np.full(len(lines), np.nan)
+    invalid = np.zeros(len(lines), dtype=bool)
+    for i, line in enumerate(lines):
+        fields = _parse_fields(line)
+        try:
+            operations[i], a[i], b[i] = fields[0], float(fields[1]), float(fields[2])
+        except (TypeError, ValueError):
+            operations[i], invalid[i] = '', True
+    return operations, a, b, invalid
+
+def format_results(operations, batch, invalid):
+    """
+    Format the results of a chunk, one line per operation.
+
+    Args:
+        operations (np.ndarray): The operations of the chunk.
+        batch (BatchResult): The results and error mask.
+        invalid (np.ndarray): The mask of malformed lines.
+
+    Returns:
+        str: The output lines, each terminated by a newline.
+    """
+    lines = [str(value) for value in batch.result.tolist()]
+    for i in np.flatnonzero(batch.errors | invalid).tolist():
+        if invalid[i]:
+            lines[i] = "Error: Malformed input line"
+        else:
+            lines[i] = f"Error: {error_message(operations[i])}"
+    return '\n'.join(lines) + '\n'
+
+def iter_chunks(infile, chunksize=CHUNKSIZE):
+    """
+    Read input lines in chunks, skipping blank and comment lines.
+
+    Args:
+        infile (file): The input stream.
+        chunksize (int, optional): The number of lines per chunk. Defaults to CHUNKSIZE.
+
+    Yields:
+        list: The next chunk of stripped lines.
+    """
+    lines = (line.strip() for line in infile)
+    lines = (line for line in lines if line and not line.startswith('#'))
+    while True:
+        chunk = list(itertools.islice(lines, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+def run_batch(infile, outfile, calculator=None, chunksize=CHUNKSIZE):
+    """
+    Evaluate every operation of an input stream and write the results.
+
+    Args:
+        infile (file): The input stream of operations.
+        outfile (file): The output stream for results.
+        calculator (Calculator, optional): The calculator recording the operations.
+        Defaults to a new Calculator.
+        chunksize (int, optional): The number of lines processed at a time.
+        Defaults to CHUNKSIZE.
+
+    Returns:
+        tuple: The number of operations processed and the number that failed.
+    """
+    calculator = calculator or Calculator()
+    total = failed = 0
+    for lines in iter_chunks(infile, chunksize):
+        operations, a, b, invalid = parse_chunk(lines)
+        batch = calculator.execute_many(operations, a, b)
+        outfile.write(format_results(operations, batch, invalid))
+        total += len(lines)
+        failed += int(np.count_nonzero(batch.errors))
+    outfile.flush()
+    return total, failed
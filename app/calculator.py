@@ -3,17 +3,33 @@ This module defines the Calculator class, which provides basic arithmetic operat
 and manages the history of these operations.
 """
 
+import itertools
 import logging
-import pandas as pd
+import threading
+import numpy as np
+from app.aggregates import OperationAggregates
 from app.calculator_config import CalculatorConfig
+from app.expression import compile_expression
+from app.history_compression import compressed_path
+from app.history_loader import HistoryLoader, read_history_store
+from app.history_store import HistoryStore, factorize_operations
+from app.instrumentation import instrumentation, timed
+from app.observer_dispatch import ObserverDispatcher
+from app.result_cache import ResultCache
 from app.strategy_factory import StrategyFactory
+from app import vectorized
 
 logger = logging.getLogger('app.calculator')
 
 class Calculator:
     """
     A simple calculator class to perform basic arithmetic operations and manage history.
+
+    A Calculator may be shared between threads. Its history and statistics are
+    updated under a lock, while strategies and observers run outside of it, so an
+    observer may see concurrent operations in a different order than the history.
     """
+    # pylint: disable=too-many-instance-attributes
     def __init__(self, config=None):
         """
         Initialize the Calculator with an optional configuration.
@@ -22,10 +38,64 @@ class Calculator:
             config (CalculatorConfig, optional): Configuration for the calculator. Defaults to None.
         """
         self.config = config if config else CalculatorConfig()
-        self.history = pd.DataFrame(columns=['operation', 'operand1', 'operand2', 'result'])
+        self._lock = threading.RLock()
+        self.store = HistoryStore()
+        self.history_loader = None
+        self.aggregates = OperationAggregates()
         self.observers = []
+        self.dispatcher = None
+        if self.config.observer_dispatch == 'async':
+            self.dispatcher = ObserverDispatcher(self._update_observers,
+                                                 self._update_observers_batch,
+                                                 maxsize=self.config.observer_queue_size,
+                                                 policy=self.config.observer_backpressure)
+        self.cache = None
+        if self.config.result_cache_size > 0:
+            self.cache = ResultCache(self.config.result_cache_size,
+                                     self.config.result_cache_memory)
         logger.info("Calculator initialized with empty history.")
 
+    @property
+    def history(self):
+        """
+        Get the history of operations as a DataFrame built from the history store.
+
+        Returns:
+            pd.DataFrame: The history of operations.
+        """
+        with self._lock:
+            self.resolve_history()
+            return self.store.to_frame()
+
+    @history.setter
+    def history(self, frame):
+        """
+        Replace the history of operations.
+
+        Args:
+            frame (pd.DataFrame): The new history of operations.
+        """
+        store = HistoryStore.from_frame(frame)
+        with self._lock:
+            self.history_loader = None
+            self.store = store
+            self.aggregates.rebuild(self.store)
+
+    def resolve_history(self):
+        """
+        Finish a deferred history load, keeping operations recorded in the meantime
+        after the loaded ones.
+        """
+        with self._lock:
+            loader, self.history_loader = self.history_loader, None
+            if loader is None:
+                return
+            loaded = loader.result()
+            if loaded is not None:
+                loaded.extend_store(self.store)
+                self.store = loaded
+                self.aggregates.rebuild(self.store)
+
     def add_observer(self, observer):
         """
         Add an observer to the calculator.
@@ -35,9 +105,10 @@ class Calculator:
         """
         self.observers.append(observer)
 
+    @timed('calculator.notify_observers')
     def notify_observers(self, operation, a, b, result):
         """
-        Notify all observers of an operation.
+        Notify all observers of an operation, through the dispatcher in async mode.
 
         Args:
             operation (str): The operation performed.
@@ -45,9 +116,72 @@ class Calculator:
             b (float): The second operand.
             result (float): The result of the operation.
         """
+        if self.dispatcher is not None:
+            self.dispatcher.submit(operation, a, b, result)
+        else:
+            self._update_observers(operation, a, b, result)
+
+    def notify_observers_batch(self, operation, a, b, result):
+        """
+        Notify all observers of a batch of operations, through the dispatcher in
+        async mode.
+
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results of the operations.
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.submit_batch(operation, a, b, result)
+        else:
+            self._update_observers_batch(operation, a, b, result)
+
+    def _update_observers(self, operation, a, b, result):
+        """
+        Update every observer with an operation, timing each observer while
+        instrumentation is enabled.
+        """
+        for observer in self.observers:
+            if instrumentation.enabled:
+                instrumentation.call(f'observer.{type(observer).__name__}', observer.update,
+                                     operation, a, b, result)
+            else:
+                observer.update(operation, a, b, result)
+
+    def _update_observers_batch(self, operation, a, b, result):
+        """
+        Update every observer with a batch of operations, with a single call each.
+        Observers without an update_batch method are updated once per operation.
+        """
         for observer in self.observers:
-            observer.update(operation, a, b, result)
+            update_batch = getattr(observer, 'update_batch', None)
+            if update_batch is not None:
+                update_batch(operation, a, b, result)
+            else:
+                operations = (itertools.repeat(operation) if isinstance(operation, str)
+                              else operation)
+                for name, x, y, z in zip(operations, a.tolist(), b.tolist(), result.tolist()):
+                    observer.update(name, x, y, z)
+
+    def flush_observers(self):
+        """
+        Wait until observers have handled every operation performed so far.
+        """
+        if self.dispatcher is not None:
+            self.dispatcher.flush()
+
+    def close_observers(self):
+        """
+        Deliver pending observer updates and stop the async dispatcher, if any.
+        Later notifications are delivered synchronously.
+        """
+        dispatcher, self.dispatcher = self.dispatcher, None
+        if dispatcher is not None:
+            dispatcher.close()
 
+    @timed('calculator.save_operation')
     def save_operation(self, operation, a, b, result):
         """
         Save an operation to the history.
@@ -58,35 +192,88 @@ class Calculator:
             b (float): The second operand.
             result (float): The result of the operation.
         """
-        new_record = pd.DataFrame([{
-            'operation': operation,
-            'operand1': a,
-            'operand2': b,
-            'result': result
-        }])
-        self.history = pd.concat([self.history, new_record], ignore_index=True)
+        if self.config.history_enabled:
+            with self._lock:
+                self.store.append(operation, a, b, result)
+                self.aggregates.update(operation, result)
         self.notify_observers(operation, a, b, result)
 
-    def load_history(self, filename=None):
+    def save_batch(self, operation, a, b, result):
+        """
+        Save a batch of operations to the history.
+
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results of the operations.
+        """
+        if self.config.history_enabled:
+            names, codes = factorize_operations(operation, len(result))
+            with self._lock:
+                self.store.extend(operation, a, b, result)
+                self.aggregates.update_batch(names, codes, result)
+        self.notify_observers_batch(operation, a, b, result)
+
+    def record_errors(self, errors):
+        """
+        Count failed operations in the statistics, such as those evaluated in worker
+        processes. Unsupported operations are not counted.
+
+        Args:
+            errors (dict): The number of failures of each operation name.
+        """
+        supported = StrategyFactory.supported_operations()
+        with self._lock:
+            for name, count in errors.items():
+                if name in supported:
+                    self.aggregates.record_errors(name, count)
+
+    def clear_history(self):
+        """
+        Clear the history of operations.
+        """
+        with self._lock:
+            self.history_loader = None
+            self.store.clear()
+            self.aggregates.clear()
+
+    def load_history(self, filename=None, mode='eager'):
         """
-        Load the history from a file.
+        Load the history from a file. With a configured history compression, the
+        filename gets the extension of the compression.
 
         Args:
             filename (str, optional): The filename to load the history from. Defaults to None.
+            mode (str, optional): 'eager' to load now, 'lazy' to load on first access to
+            the history, or 'background' to load in a background thread. Operations
+            recorded before a deferred load finishes are kept after the loaded ones.
+            Defaults to 'eager'.
         """
-        filename = filename or self.config.calculator_history_file
-        try:
-            self.history = pd.read_csv(filename)
-            logger.info("Calculator history loaded from file: %s", filename)
-        except FileNotFoundError:
-            logger.warning("History file not found: %s", filename)
-        except pd.errors.EmptyDataError:
-            logger.warning("History file is empty: %s", filename)
+        filename = compressed_path(filename or self.config.calculator_history_file,
+                                   self.config.history_compression)
+        if mode in ('lazy', 'background'):
+            loader = HistoryLoader(filename, background=mode == 'background')
+            with self._lock:
+                self.history_loader = loader
+            return
+        store = read_history_store(filename)
+        with self._lock:
+            self.history_loader = None
+            if store is not None:
+                self.store = store
+                self.aggregates.rebuild(self.store)
 
+    @timed('calculator.execute_operation')
     def execute_operation(self, operation, a, b):
         """
         Execute an operation using the specified strategy.
 
+        With a result cache, repeated calls return the cached result without running
+        the strategy again. They are still recorded in the history and notified to
+        the observers.
+
         Args:
             operation (str): The operation to perform.
             a (float): The first operand.
@@ -96,10 +283,170 @@ class Calculator:
             float: The result of the operation.
         """
         strategy = StrategyFactory.create_strategy(operation)
-        result = strategy.execute(a, b)
+        try:
+            if instrumentation.enabled:
+                result = instrumentation.call(f'strategy.{operation}', self._run_strategy,
+                                              strategy, a, b)
+            else:
+                result = self._run_strategy(strategy, a, b)
+        except Exception:
+            with self._lock:
+                self.aggregates.record_errors(operation)
+            raise
         self.save_operation(operation, a, b, result)
         return result
 
+    def _run_strategy(self, strategy, a, b):
+        """
+        Execute a strategy, through the result cache if there is one.
+        """
+        if self.cache is not None:
+            return self.cache.execute(strategy, a, b)
+        return strategy.execute(a, b)
+
+    @timed('calculator.execute_batch')
+    def execute_batch(self, operation, a_array, b_array):
+        """
+        Execute an operation over arrays of operands in a single vectorized call.
+
+        Elements that fail (division by zero, root with zero, results that are not
+        finite) are reported in the error mask instead of raising, and only the
+        successful elements are recorded in the history.
+
+        Args:
+            operation (str): The operation to perform.
+            a_array (array_like): The first operands.
+            b_array (array_like): The second operands.
+
+        Returns:
+            BatchResult: The float64 results and the boolean error mask.
+
+        Raises:
+            ValueError: If the operation is not supported.
+        """
+        strategy = StrategyFactory.create_strategy(operation)
+        a, b = vectorized.as_operands(a_array, b_array)
+        batch = vectorized.evaluate(operation, strategy, a, b)
+        valid = ~batch.errors
+        if not valid.all():
+            with self._lock:
+                self.aggregates.record_errors(operation, int(np.count_nonzero(batch.errors)))
+        if valid.all():
+            self.save_batch(operation, a, b, batch.result)
+        else:
+            self.save_batch(operation, a[valid], b[valid], batch.result[valid])
+        return batch
+
+    @timed('calculator.execute_many')
+    def execute_many(self, operations, a_array, b_array):
+        """
+        Execute a mix of operations, one per element, over arrays of operands.
+
+        Elements are grouped by operation and each group is evaluated with a single
+        vectorized call. Failed elements, including unsupported operations, are
+        reported in the error mask, and the successful elements are recorded in the
+        history in input order.
+
+        Args:
+            operations (array_like): The operation to perform for each element.
+            a_array (array_like): The first operands.
+            b_array (array_like): The second operands.
+
+        Returns:
+            BatchResult: The float64 results and the boolean error mask.
+        """
+        a, b = vectorized.as_operands(a_array, b_array)
+        # Names that are not strings, such as numbers or None, become unsupported names
+        operations = np.asarray(operations, dtype=object).astype(str)
+        operations, a, b = np.broadcast_arrays(operations, a, b)
+        operations, a, b = operations.ravel(), a.ravel(), b.ravel()
+        result, errors = vectorized.evaluate_many(operations, a, b,
+                                                  StrategyFactory.create_strategy)
+        valid = ~errors
+        if errors.any():
+            self.record_errors(vectorized.count_by_operation(operations[errors]))
+        self.save_batch(operations[valid], a[valid], b[valid], result[valid])
+        return vectorized.BatchResult(result, errors)
+
+    @timed('calculator.evaluate_expression')
+    def evaluate_expression(self, text, **variables):
+        """
+        Evaluate an infix expression such as '2 + 3 * 4 ^ 0.5' or 'root(x, 3)'.
+
+        The expression is compiled once and cached, so evaluating the same text
+        again skips parsing and strategy lookups. Expressions are not recorded in
+        the history.
+
+        Args:
+            text (str): The expression.
+            **variables: The value of each variable of the expression.
+
+        Returns:
+            float: The value of the expression.
+
+        Raises:
+            ValueError: If the expression is invalid or an operation fails.
+        """
+        return compile_expression(text).evaluate(**variables)
+
+    @timed('calculator.evaluate_expression_batch')
+    def evaluate_expression_batch(self, text, **arrays):
+        """
+        Evaluate an infix expression element-wise over arrays of variable values,
+        with one vectorized call per operation of the expression.
+
+        Args:
+            text (str): The expression.
+            **arrays: The array, or number, of each variable of the expression.
+
+        Returns:
+            BatchResult: The float64 results and the boolean error mask.
+
+        Raises:
+            ValueError: If the expression is invalid or a variable has no value.
+        """
+        return compile_expression(text).evaluate_array(**arrays)
+
+    def query_history(self, operation=None, result=None, operand1=None, operand2=None):
+        """
+        Find the operations in the history matching all of the given conditions.
+
+        Lookups go through indexes that are built on the first query and then kept
+        up to date as operations are saved, so they do not scan the history.
+
+        Args:
+            operation (str, optional): The operation performed.
+            result (tuple, optional): The closed (low, high) range of the result, where
+            either bound may be None.
+            operand1 (tuple, optional): The closed range of the first operand.
+            operand2 (tuple, optional): The closed range of the second operand.
+
+        Returns:
+            pd.DataFrame: The matching operations, indexed by their row in the history.
+        """
+        with self._lock:
+            self.resolve_history()
+            rows = self.store.query(operation, result, operand1, operand2)
+            return self.store.take(rows)
+
+    def get_statistics(self, operation=None):
+        """
+        Get running summary statistics of the results in the history.
+
+        The statistics are updated on each saved operation and rebuilt in one pass
+        when the history is loaded, so this never scans the history.
+
+        Args:
+            operation (str, optional): The operation. Defaults to None for all of them.
+
+        Returns:
+            dict: The count, sum, mean, variance, min, max and error count of the
+            operation, or of every operation keyed by name.
+        """
+        with self._lock:
+            self.resolve_history()
+            return self.aggregates.summary(operation)
+
     def get_history(self):
         """
         Get the history of operations.
@@ -9,8 +9,12 @@ class CalculatorConfig:
     """
     Configuration settings for the Calculator class.
     """
+    # pylint: disable=too-many-instance-attributes
     def __init__(self, precision=2, history_enabled=True,
-                 calculator_history_file='data/calculator_history.csv'):
+                 calculator_history_file='data/calculator_history.csv', history_format='csv',
+                 history_loading='lazy', observer_dispatch='sync', observer_queue_size=1024,
+                 observer_backpressure='block', result_cache_size=0,
+                 result_cache_memory=1 << 20, history_compression=None):
         """
         Initialize the CalculatorConfig with optional settings.
 
@@ -19,10 +23,50 @@ class CalculatorConfig:
             history_enabled (bool, optional): Whether history is enabled. Defaults to True.
             calculator_history_file (str, optional): The file to store calculator history. 
             Defaults to 'data/calculator_history.csv'.
+            history_format (str, optional): The format of history files, 'csv', the
+            memory-mapped 'binary' format or the 'segmented' directory of rotating CSV
+            segments. Defaults to 'csv'.
+            history_loading (str, optional): How the REPL loads history at startup: 'eager',
+            'lazy' (on first access) or 'background' (in a thread). Defaults to 'lazy'.
+            observer_dispatch (str, optional): 'sync' to update observers in the calling
+            thread, or 'async' to queue updates for a worker thread. Defaults to 'sync'.
+            observer_queue_size (int, optional): The maximum number of queued observer
+            updates in async mode. Defaults to 1024.
+            observer_backpressure (str, optional): What to do when the observer queue is
+            full: 'block', 'drop' or 'coalesce'. Defaults to 'block'.
+            result_cache_size (int, optional): The number of operation results kept in an
+            LRU cache, or 0 to disable the cache. Defaults to 0.
+            result_cache_memory (int, optional): The maximum estimated memory of the
+            result cache, in bytes. Defaults to 1 MiB.
+            history_compression (str, optional): 'gzip', 'bz2' or 'xz' to compress CSV
+            history files, whose names then get the extension of the compression.
+            Defaults to None for the compression implied by the filename extension.
         """
+        # pylint: disable=too-many-arguments
         self.precision = precision
         self.history_enabled = history_enabled
         self.calculator_history_file = calculator_history_file
+        self.history_format = history_format
+        self.history_loading = history_loading
+        self.observer_dispatch = observer_dispatch
+        self.observer_queue_size = observer_queue_size
+        self.observer_backpressure = observer_backpressure
+        self.result_cache_size = result_cache_size
+        self.result_cache_memory = result_cache_memory
+        self.history_compression = history_compression
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create the configuration of the interactive calculator from the environment.
+
+        RESULT_CACHE_SIZE sets the number of cached operation results (default 0,
+        no cache).
+
+        Returns:
+            CalculatorConfig: The configuration.
+        """
+        return cls(result_cache_size=int(os.getenv('RESULT_CACHE_SIZE', '0')))
 
     def set_precision(self, precision):
         """
@@ -0,0 +1,361 @@
+"""
+This module defines the expression engine, which compiles infix expressions such as
+`2 + 3 * 4 ^ 0.5` or `root(x, 3) / y` onto the registered strategies.
+
+Binary operators map to the add, subtract, multiply, divide and power strategies,
+and `name(a, b)` calls any registered operation, including plugins. An expression
+is parsed once, its strategies are resolved, constant subexpressions are folded,
+and the result is cached, so evaluating it again costs neither a parse nor a
+strategy lookup. A compiled expression evaluates on numbers or on NumPy arrays.
+"""
+
+from collections import namedtuple
+import functools
+import re
+import numpy as np
+from app import vectorized
+from app.strategy_factory import StrategyFactory
+
+Constant = namedtuple('Constant', ['value'])
+Variable = namedtuple('Variable', ['name'])
+Call = namedtuple('Call', ['operation', 'strategy', 'left', 'right'])
+
+OPERATORS = {'+': 'add', '-': 'subtract', '*': 'multiply', '/': 'divide', '^': 'power'}
+# Binding power of each binary operator, and whether it is right associative
+PRECEDENCE = {'+': (1, False), '-': (1, False), '*': (2, False), '/': (2, False),
+              '^': (4, True)}
+UNARY_PRECEDENCE = 3
+# Deepest nesting of parentheses, signs, calls and right-associative powers, which
+# keeps the recursive parser and evaluators well within the interpreter's recursion
+# limit. Chains of left-associative operators, such as `x + x + ...`, are evaluated
+# in a loop and may be of any length.
+MAX_DEPTH = 200
+
+_TOKEN = re.compile(r'\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+                    r'|(?P<name>[A-Za-z_]\w*)|(?P<symbol>\*\*|[-+*/^(),]))')
+
+def tokenize(text):
+    """
+    Split an expression into number, name and symbol tokens.
+
+    Args:
+        text (str): The expression.
+
+    Returns:
+        list: (kind, value) tuples, ending with ('end', None).
+
+    Raises:
+        ValueError: If the expression contains an invalid character.
+    """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Invalid character in expression at position {position}: "
+                             f"'{text[position:].strip()[:1]}'")
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'number':
+            value = float(value)
+        elif value == '**':
+            value = '^'
+        tokens.append((kind, value))
+        position = match.end()
+    tokens.append(('end', None))
+    return tokens
+
+def _describe(token):
+    """
+    Describe a token for an error message.
+    """
+    kind, value = token
+    if kind == 'end':
+        return 'end of expression'
+    return f"'{value:g}'" if kind == 'number' else f"'{value}'"
+
+class _Parser:
+    """
+    A precedence-climbing parser building an expression tree from tokens.
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+        self.depth = 0
+
+    def peek(self):
+        """
+        Get the next token without consuming it.
+        """
+        return self.tokens[self.position]
+
+    def take(self, expected=None):
+        """
+        Consume the next token, checking its value if `expected` is given.
+        """
+        token = self.tokens[self.position]
+        if expected is not None and token[1] != expected:
+            raise ValueError(f"Expected '{expected}' but found {_describe(token)}")
+        self.position += 1
+        return token
+
+    def parse(self):
+        """
+        Parse a whole expression.
+        """
+        tree = self.expression(0)
+        if self.peek()[0] != 'end':
+            raise ValueError(f"Unexpected {_describe(self.peek())}")
+        return tree
+
+    def expression(self, min_precedence):
+        """
+        Parse an expression whose binary operators bind at least `min_precedence`,
+        limiting how deeply expressions are nested.
+        """
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ValueError("Expression is nested too deeply")
+        tree = self.binary(min_precedence)
+        self.depth -= 1
+        return tree
+
+    def binary(self, min_precedence):
+        """
+        Parse an operand followed by binary operators binding at least `min_precedence`.
+        """
+        left = self.unary()
+        while True:
+            kind, symbol = self.peek()
+            if kind != 'symbol' or symbol not in PRECEDENCE:
+                return left
+            precedence, right_associative = PRECEDENCE[symbol]
+            if precedence < min_precedence:
+                return left
+            self.take()
+            right = self.expression(precedence if right_associative else precedence + 1)
+            left = _call(OPERATORS[symbol], left, right)
+
+    def unary(self):
+        """
+        Parse an operand with optional leading signs.
+        """
+        kind, symbol = self.peek()
+        if kind == 'symbol' and symbol in '+-':
+            self.take()
+            operand = self.expression(UNARY_PRECEDENCE)
+            return operand if symbol == '+' else _call('subtract', Constant(0.0), operand)
+        return self.primary()
+
+    def primary(self):
+        """
+        Parse a number, a variable, a call or a parenthesized expression.
+        """
+        token = self.take()
+        kind, value = token
+        if kind == 'number':
+            return Constant(value)
+        if kind == 'name':
+            if self.peek()[1] != '(':
+                return Variable(value)
+            self.take('(')
+            left = self.expression(0)
+            self.take(',')
+            right = self.expression(0)
+            self.take(')')
+            return _call(value, left, right)
+        if value == '(':
+            tree = self.expression(0)
+            self.take(')')
+            return tree
+        raise ValueError(f"Unexpected {_describe(token)}")
+
+def _left_chain(tree):
+    """
+    Split an expression tree into its leftmost operand that is not a call, and the
+    calls applied to it in evaluation order.
+    """
+    calls = []
+    while isinstance(tree, Call):
+        calls.append(tree)
+        tree = tree.left
+    calls.reverse()
+    return tree, calls
+
+def _call(operation, left, right):
+    """
+    Build a call node, resolving the strategy and folding constant operands.
+    """
+    strategy = StrategyFactory.create_strategy(operation)
+    if isinstance(left, Constant) and isinstance(right, Constant):
+        try:
+            return Constant(float(strategy.execute(left.value, right.value)))
+        except (ValueError, ArithmeticError, TypeError):
+            # Keep the call, so the error is raised when the expression is evaluated
+            pass
+    return Call(operation, strategy, left, right)
+
+def _scalar_function(tree):
+    """
+    Turn an expression tree into a nested closure taking a dict of variable values.
+    A chain of calls on the left operand is applied in a loop.
+    """
+    tree, calls = _left_chain(tree)
+    if isinstance(tree, Constant):
+        value = tree.value
+        first = lambda values: value  # pylint: disable=unnecessary-lambda-assignment
+    else:
+        name = tree.name
+        first = lambda values: values[name]  # pylint: disable=unnecessary-lambda-assignment
+    if not calls:
+        return first
+    steps = [(call.strategy.execute, _scalar_function(call.right)) for call in calls]
+    if len(steps) == 1:
+        execute, right = steps[0]
+        return lambda values: execute(first(values), right(values))
+
+    def chain(values):
+        result = first(values)
+        for execute, right in steps:
+            result = execute(result, right(values))
+        return result
+    return chain
+
+def _variables(tree):
+    """
+    Collect the variable names of an expression tree, without recursing.
+    """
+    names = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Variable):
+            names.add(node.name)
+        elif isinstance(node, Call):
+            stack.extend((node.left, node.right))
+    return names
+
+class CompiledExpression:
+    """
+    A parsed, constant-folded expression with its strategies resolved.
+    """
+    def __init__(self, text, tree):
+        """
+        Initialize the CompiledExpression.
+
+        Args:
+            text (str): The source of the expression.
+            tree (tuple): The expression tree of Constant, Variable and Call nodes.
+        """
+        self.text = text
+        self.tree = tree
+        self.variables = tuple(sorted(_variables(tree)))
+        self._function = _scalar_function(tree)
+
+    @property
+    def is_constant(self):
+        """
+        Check whether the expression was folded to a single number.
+
+        Returns:
+            bool: True if the expression has no variables and could be folded.
+        """
+        return isinstance(self.tree, Constant)
+
+    def _check(self, values):
+        """
+        Check that a value is given for every variable.
+        """
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise ValueError(f"Missing value for variable(s): {', '.join(missing)}")
+
+    def evaluate(self, **values):
+        """
+        Evaluate the expression on numbers.
+
+        Args:
+            **values: The value of each variable.
+
+        Returns:
+            float: The value of the expression.
+
+        Raises:
+            ValueError: If a variable has no value or an operation fails.
+        """
+        self._check(values)
+        return self._function(values)
+
+    def evaluate_array(self, **values):
+        """
+        Evaluate the expression element-wise on NumPy arrays, with one vectorized
+        call per operation of the expression.
+
+        Args:
+            **values: The array, or number, of each variable. They are broadcast
+            against each other.
+
+        Returns:
+            BatchResult: The results and a mask of the elements where an operation failed.
+
+        Raises:
+            ValueError: If a variable has no value.
+        """
+        self._check(values)
+        arrays = {name: np.asarray(value, dtype=np.float64) for name, value in values.items()}
+        shape = np.broadcast_shapes(*(arrays[name].shape for name in self.variables))
+        result, errors = self._evaluate_array(self.tree, arrays, shape)
+        return vectorized.BatchResult(result, errors)
+
+    def _evaluate_array(self, tree, arrays, shape):
+        """
+        Evaluate a subtree on arrays, returning the flat results and error mask. A
+        chain of calls on the left operand is applied in a loop.
+        """
+        size = int(np.prod(shape))
+        tree, calls = _left_chain(tree)
+        if isinstance(tree, Constant):
+            result = np.full(size, tree.value)
+        else:
+            result = np.broadcast_to(arrays[tree.name], shape).ravel()
+        errors = np.zeros(size, dtype=bool)
+        for call in calls:
+            b, b_errors = self._evaluate_array(call.right, arrays, shape)
+            batch = vectorized.evaluate(call.operation, call.strategy, result, b)
+            errors = batch.errors | errors | b_errors
+            result = batch.result
+            result[errors] = np.nan
+        return result, errors
+
+    def __repr__(self):
+        """
+        Return a string representation of the CompiledExpression.
+        """
+        return f"CompiledExpression({self.text!r})"
+
+@functools.lru_cache(maxsize=256)
+def _compile(text, generation):
+    """
+    Compile an expression for a generation of the strategy registry.
+    """
+    # pylint: disable=unused-argument
+    return CompiledExpression(text, _Parser(tokenize(text)).parse())
+
+def compile_expression(text):
+    """
+    Compile an expression, reusing the cached compiled form of the same text.
+
+    The cache is keyed on the registry generation, so registering or replacing a
+    strategy recompiles the expressions that use it.
+
+    Args:
+        text (str): The expression.
+
+    Returns:
+        CompiledExpression: The compiled expression.
+
+    Raises:
+        ValueError: If the expression is invalid or calls an unsupported operation.
+    """
+    return _compile(text.strip(), StrategyFactory.generation())
@@ -0,0 +1,57 @@
+"""
+This module provides exclusive advisory file locks, which keep processes sharing a
+history file from interleaving appends with each other or with whole-file rewrites.
+
+Locks are taken with flock() on the history file itself, so no lock file is left
+next to it. On platforms without fcntl the locks are no-ops and only in-process
+locking applies.
+"""
+
+import contextlib
+import os
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+@contextlib.contextmanager
+def locked(fd):
+    """
+    Hold an exclusive advisory lock on an open file.
+
+    Args:
+        fd (int): The file descriptor to lock.
+
+    Yields:
+        int: The locked file descriptor.
+    """
+    if fcntl is None:
+        yield fd
+        return
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    try:
+        yield fd
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+@contextlib.contextmanager
+def locked_file(filename):
+    """
+    Hold an exclusive advisory lock on a file while it is truncated or replaced.
+
+    Appenders lock the file before each write and reopen it if it was replaced
+    meanwhile, so rows are never appended to a file that has been renamed over.
+
+    Args:
+        filename (str): The file to lock. It is created if it does not exist.
+
+    Yields:
+        int: A file descriptor of the locked file.
+    """
+    fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        with locked(fd):
+            yield fd
+    finally:
+        os.close(fd)
@@ -0,0 +1,373 @@
+"""
+This module defines the BinaryHistoryFile class, a fixed-width columnar history
+file format that is read through memory maps.
+
+Layout of a binary history file:
+
+    header      HEADER_SIZE bytes: magic, version, capacity, row count and the
+                JSON-encoded table of operation names
+    operand1    capacity float64 values
+    operand2    capacity float64 values
+    result      capacity float64 values
+    codes       capacity int32 operation codes
+
+Only the first `count` rows of each column are in use. Columns are preallocated
+to `capacity` rows and the file is rewritten with double the capacity when full,
+so appends are amortized O(1) and each column can be mapped on its own.
+"""
+
+import json
+import os
+import struct
+import threading
+import numpy as np
+from app.lazy import lazy_import
+from app.history_store import COLUMNS, HistoryStore, factorize_operations
+from app.history_segments import SEGMENTED_EXTENSION
+
+pd = lazy_import('pandas')
+
+MAGIC = b'CALCHIST'
+VERSION = 1
+HEADER_SIZE = 4096
+BINARY_EXTENSION = '.bin'
+_HEADER = struct.Struct('<8sHHIQQ')
+_FLOAT_COLUMNS = ['operand1', 'operand2', 'result']
+
+def is_binary_history(filename):
+    """
+    Check whether a file is a binary history file.
+
+    Args:
+        filename (str): The file to check.
+
+    Returns:
+        bool: True if the file starts with the binary history magic bytes.
+    """
+    try:
+        with open(filename, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except (FileNotFoundError, IsADirectoryError):
+        return False
+
+def history_format_for(filename):
+    """
+    Get the history format implied by a filename.
+
+    Args:
+        filename (str): The history filename.
+
+    Returns:
+        str: 'binary' for files with the binary extension, 'segmented' for the
+        segmented extension, 'csv' otherwise.
+    """
+    if filename.rstrip(os.sep).endswith(SEGMENTED_EXTENSION):
+        return 'segmented'
+    return 'binary' if filename.endswith(BINARY_EXTENSION) else 'csv'
+
+def _offset(column, capacity):
+    """
+    Get the file offset of a column for a given capacity.
+    """
+    if column == 'codes':
+        return HEADER_SIZE + len(_FLOAT_COLUMNS) * 8 * capacity
+    return HEADER_SIZE + _FLOAT_COLUMNS.index(column) * 8 * capacity
+
+def _file_size(capacity):
+    """
+    Get the size of a binary history file with a given capacity.
+    """
+    return HEADER_SIZE + (len(_FLOAT_COLUMNS) * 8 + 4) * capacity
+
+class BinaryHistoryFile:
+    """
+    A binary columnar history file.
+
+    Reads go through read-only memory maps of the columns they need, so opening a
+    large history is O(1). Writes keep the file open, like HistoryLog, and expose
+    the same append, extend, flush and close methods, and may be shared between
+    threads. Unlike HistoryLog, it must not be written by several processes at once.
+    """
+    def __init__(self, filename):
+        """
+        Initialize the BinaryHistoryFile for a file.
+
+        Args:
+            filename (str): The binary history file.
+        """
+        self.filename = filename
+        self._file = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _read_header(file):
+        """
+        Read the header of an open binary history file.
+
+        Returns:
+            tuple: The capacity, the row count and the list of operation names.
+
+        Raises:
+            ValueError: If the file is not a binary history file.
+        """
+        file.seek(0)
+        data = file.read(HEADER_SIZE)
+        if len(data) < _HEADER.size:
+            raise ValueError(f"Not a binary history file: {file.name}")
+        magic, version, _, names_size, capacity, count = _HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a binary history file: {file.name}")
+        names = data[_HEADER.size:_HEADER.size + names_size].decode('utf-8')
+        return capacity, count, json.loads(names)
+
+    @staticmethod
+    def _write_header(file, capacity, count, operations):
+        """
+        Write the header of an open binary history file.
+
+        Raises:
+            ValueError: If the operation names do not fit in the header.
+        """
+        names = json.dumps(operations).encode('utf-8')
+        if _HEADER.size + len(names) > HEADER_SIZE:
+            raise ValueError("Too many distinct operations for a binary history file")
+        file.seek(0)
+        file.write(_HEADER.pack(MAGIC, VERSION, 0, len(names), capacity, count) + names)
+
+    def _open(self):
+        """
+        Open the file for writing, creating it if needed.
+        """
+        if self._file is None:
+            if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
+                self.create()
+            self._file = open(self.filename, 'r+b')  # pylint: disable=consider-using-with
+        return self._file
+
+    def create(self, capacity=1024):
+        """
+        Create an empty binary history file, replacing any existing file.
+
+        Args:
+            capacity (int, optional): The number of rows to preallocate. Defaults to 1024.
+        """
+        with self._lock:
+            self.close()
+            # Replace rather than truncate, so existing memory maps of the file stay valid
+            temporary = self.filename + '.tmp'
+            with open(temporary, 'wb') as file:
+                self._write_header(file, capacity, 0, [])
+                file.truncate(_file_size(capacity))
+            os.replace(temporary, self.filename)
+
+    def header(self):
+        """
+        Read the header of the file.
+
+        Returns:
+            tuple: The capacity, the row count and the list of operation names.
+        """
+        self.flush()
+        with open(self.filename, 'rb') as file:
+            return self._read_header(file)
+
+    def __len__(self):
+        """
+        Get the number of rows in the file.
+
+        Returns:
+            int: The number of rows.
+        """
+        return self.header()[1]
+
+    def columns(self, names=None):
+        """
+        Memory-map columns of the file.
+
+        Args:
+            names (list, optional): The columns to map, from 'operand1', 'operand2',
+            'result' and 'codes'. Defaults to all of them.
+
+        Returns:
+            dict: Read-only arrays keyed by column name.
+        """
+        capacity, count, _ = self.header()
+        columns = {}
+        for name in names or _FLOAT_COLUMNS + ['codes']:
+            dtype = np.int32 if name == 'codes' else np.float64
+            if count == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(self.filename, dtype=dtype, mode='r',
+                                          offset=_offset(name, capacity), shape=(count,))
+        return columns
+
+    def to_store(self):
+        """
+        Get the file contents as a HistoryStore backed by the memory maps.
+
+        The store copies the columns into memory only when it first grows.
+
+        Returns:
+            HistoryStore: The history of operations.
+        """
+        operations = self.header()[2]
+        columns = self.columns()
+        return HistoryStore.from_columns(operations, columns['codes'], columns['operand1'],
+                                         columns['operand2'], columns['result'])
+
+    def iter_chunks(self, chunksize):
+        """
+        Iterate over the file in chunks of rows.
+
+        Args:
+            chunksize (int): The maximum number of rows per chunk.
+
+        Yields:
+            pd.DataFrame: The next chunk of operations.
+        """
+        operations = np.array(self.header()[2], dtype=object)
+        columns = self.columns()
+        count = len(columns['codes'])
+        for start in range(0, count, chunksize):
+            end = min(start + chunksize, count)
+            yield pd.DataFrame({
+                'operation': operations[columns['codes'][start:end]],
+                'operand1': np.array(columns['operand1'][start:end]),
+                'operand2': np.array(columns['operand2'][start:end]),
+                'result': np.array(columns['result'][start:end])
+            }, columns=COLUMNS, index=pd.RangeIndex(start, end))
+
+    def _grow(self, capacity, count):
+        """
+        Rewrite the file with a larger capacity, replacing it atomically.
+        """
+        file = self._open()
+        old_capacity, _, operations = self._read_header(file)
+        temporary = self.filename + '.tmp'
+        with open(temporary, 'wb') as new_file:
+            self._write_header(new_file, capacity, count, operations)
+            new_file.truncate(_file_size(capacity))
+            for name in _FLOAT_COLUMNS + ['codes']:
+                itemsize = 4 if name == 'codes' else 8
+                file.seek(_offset(name, old_capacity))
+                new_file.seek(_offset(name, capacity))
+                new_file.write(file.read(count * itemsize))
+        self.close()
+        os.replace(temporary, self.filename)
+
+    def _append(self, operations, columns):
+        """
+        Append rows given as a dict of column arrays, whose 'codes' index into `operations`.
+        """
+        rows = len(columns['codes'])
+        if rows == 0:
+            return
+        with self._lock:
+            file = self._open()
+            capacity, count, names = self._read_header(file)
+            for operation in operations:
+                if operation not in names:
+                    names.append(operation)
+            mapping = np.array([names.index(operation) for operation in operations], dtype=np.int32)
+            if count + rows > capacity:
+                self._grow(max(capacity * 2, count + rows), count)
+                file = self._open()
+                capacity = self._read_header(file)[0]
+            for name in _FLOAT_COLUMNS + ['codes']:
+                if name == 'codes':
+                    column = mapping[np.asarray(columns['codes'])]
+                else:
+                    column = np.asarray(columns[name], dtype=np.float64)
+                file.seek(_offset(name, capacity) + count * column.itemsize)
+                file.write(column.tobytes())
+            self._write_header(file, capacity, count + rows, names)
+
+    def append(self, row):
+        """
+        Append a single row to the file.
+
+        Args:
+            row (list): The operation, operands and result to record.
+        """
+        self.extend([row])
+
+    def extend(self, rows):
+        """
+        Append several rows to the file.
+
+        Args:
+            rows (list): The rows to record.
+        """
+        if rows:
+            self.extend_frame(pd.DataFrame(rows, columns=COLUMNS))
+
+    def extend_columns(self, operation, a, b, result):
+        """
+        Append a batch of rows given as columns.
+
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results of the operations.
+        """
+        names, codes = factorize_operations(operation, len(result))
+        self._append(names, {'codes': codes, 'operand1': a, 'operand2': b, 'result': result})
+
+    def extend_frame(self, frame):
+        """
+        Append a DataFrame of operations to the file.
+
+        Args:
+            frame (pd.DataFrame): The operations to record.
+        """
+        store = HistoryStore.from_frame(frame)
+        size = len(store)
+        self._append(store.operations, {'codes': store.codes[:size],
+                                        'operand1': store.operand1[:size],
+                                        'operand2': store.operand2[:size],
+                                        'result': store.result[:size]})
+
+    def write_chunks(self, chunks):
+        """
+        Replace the contents of the file with a sequence of DataFrame chunks.
+
+        The new contents are written to a temporary file that then replaces the file,
+        so the chunks may be read from the file being replaced.
+
+        Args:
+            chunks (iterable): The DataFrames to write.
+        """
+        with self._lock:
+            self.close()
+            temporary = BinaryHistoryFile(self.filename + '.new')
+            temporary.create()
+            for chunk in chunks:
+                temporary.extend_frame(chunk)
+            temporary.close()
+            os.replace(temporary.filename, self.filename)
+
+    def clear(self):
+        """
+        Remove all rows from the file.
+        """
+        self.create()
+
+    def flush(self):
+        """
+        Flush written rows to the file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        """
+        Flush written rows and close the file.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,275 @@
+"""
+This module provides transparent gzip, bz2 and xz (lzma) compression of CSV
+history files, chosen by the file extension.
+
+Compressed histories are read and written as streams, one block at a time.
+Appends add a complete compressed member per write, which every supported format
+reads back as one continuous stream, followed by an empty sync member. A writer
+opening the file only has to find the last sync member and check the members
+after it, so a file that ends with one is opened without decompressing anything.
+A member left incomplete by a crash is cut off by the writer before it appends
+again, and readers stop at the last complete line before it.
+"""
+
+import functools
+import importlib
+import io
+import logging
+import lzma
+import os
+import zlib
+
+logger = logging.getLogger('app.history_compression')
+
+# Compression names, as used by pandas, and their file extensions
+EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}
+_MODULES = {'gzip': 'gzip', 'bz2': 'bz2', 'xz': 'lzma'}
+# Level 6 compresses nearly as well as gzip's default of 9 at a fraction of the cost
+_OPTIONS = {'gzip': {'compresslevel': 6}, 'bz2': {}, 'xz': {}}
+# Errors of truncated or damaged compressed data
+DECOMPRESSION_ERRORS = (EOFError, OSError, zlib.error, lzma.LZMAError)
+BLOCK_SIZE = 1 << 18
+# Uncompressed bytes of rows buffered for each appended member, as tiny members
+# compress poorly
+MEMBER_SIZE = 1 << 16
+
+def compression_for(filename):
+    """
+    Get the compression of a history file from its extension.
+
+    Args:
+        filename (str): The history filename.
+
+    Returns:
+        str: 'gzip', 'bz2' or 'xz', or None for an uncompressed file.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    for compression, compressed_extension in EXTENSIONS.items():
+        if extension == compressed_extension:
+            return compression
+    return None
+
+def compressed_path(filename, compression):
+    """
+    Get the filename of a history compressed with a given compression.
+
+    Args:
+        filename (str): The history filename.
+        compression (str): 'gzip', 'bz2' or 'xz', or None for no compression.
+
+    Returns:
+        str: The filename with the extension of the compression, if it does not
+        already have it.
+
+    Raises:
+        ValueError: If the compression is not supported.
+    """
+    if compression is None or compression_for(filename) == compression:
+        return filename
+    if compression not in EXTENSIONS:
+        raise ValueError(f"Unsupported history compression '{compression}', expected one of "
+                         f"{', '.join(EXTENSIONS)}")
+    return filename + EXTENSIONS[compression]
+
+def _module(compression):
+    """
+    Import the module of a compression on first use.
+    """
+    return importlib.import_module(_MODULES[compression])
+
+def open_history(filename, mode='r', compression=None):
+    """
+    Open a CSV history file as a text stream, compressing or decompressing it on
+    the fly.
+
+    Args:
+        filename (str): The history file.
+        mode (str, optional): 'r', 'w' or 'a'. Defaults to 'r'.
+        compression (str, optional): The compression of the file. Defaults to the
+        compression implied by the filename extension.
+
+    Returns:
+        file: The text stream, for use with the csv module.
+    """
+    # pylint: disable=consider-using-with
+    compression = compression or compression_for(filename)
+    if compression is None:
+        return open(filename, mode, newline='', encoding='utf-8')
+    if mode == 'r':
+        reader = _SalvagingReader(_module(compression).open(filename, 'rb'), filename)
+        return io.TextIOWrapper(io.BufferedReader(reader), newline='', encoding='utf-8')
+    return _module(compression).open(filename, mode + 't', newline='', encoding='utf-8',
+                                     **_OPTIONS[compression])
+
+class _SalvagingReader(io.RawIOBase):
+    """
+    A decompressed stream that ends at the last complete line before damaged or
+    truncated data, logging a warning, instead of raising.
+    """
+    def __init__(self, file, filename):
+        """
+        Initialize the reader.
+
+        Args:
+            file (file): The decompressing binary file.
+            filename (str): The filename, for the warning.
+        """
+        self._file = file
+        self._filename = filename
+        self._blocks = self._complete_lines()
+        self._block = memoryview(b'')
+
+    def readable(self):
+        """
+        Report that the stream is readable.
+        """
+        return True
+
+    def _complete_lines(self):
+        """
+        Yield decompressed blocks, holding back a partial last line until the rest
+        of it has been decompressed.
+        """
+        partial = b''
+        try:
+            while True:
+                block = self._file.read1(BLOCK_SIZE)
+                if not block:
+                    yield partial
+                    return
+                block = partial + block
+                end = block.rfind(b'\n') + 1
+                partial = block[end:]
+                yield block[:end]
+        except DECOMPRESSION_ERRORS as error:
+            logger.warning("History file %s is damaged, reading it up to the last complete "
+                           "line: %s", self._filename, error)
+
+    def readinto(self, buffer):
+        """
+        Read decompressed bytes into a buffer.
+
+        Returns:
+            int: The number of bytes read, or 0 at the end of the stream.
+        """
+        while not self._block:
+            block = next(self._blocks, None)
+            if block is None:
+                return 0
+            self._block = memoryview(block)
+        size = min(len(buffer), len(self._block))
+        buffer[:size] = self._block[:size]
+        self._block = self._block[size:]
+        return size
+
+    def close(self):
+        """
+        Close the stream and the decompressing file.
+        """
+        self._file.close()
+        super().close()
+
+def _decompressor(compression):
+    """
+    Create a decompressor for a single compressed member.
+    """
+    if compression == 'gzip':
+        # Expect a gzip header and trailer
+        return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    if compression == 'bz2':
+        return _module(compression).BZ2Decompressor()
+    return lzma.LZMADecompressor()
+
+@functools.lru_cache(maxsize=None)
+def sync_member(compression):
+    """
+    Get the empty compressed member written after every compressed write, which
+    marks the end of complete data.
+
+    Args:
+        compression (str): 'gzip', 'bz2' or 'xz'.
+
+    Returns:
+        bytes: The compressed empty member, the same for every call.
+    """
+    if compression == 'gzip':
+        # A fixed timestamp keeps the member identical between writes
+        return _module(compression).compress(b'', mtime=0)
+    return _module(compression).compress(b'', **_OPTIONS[compression])
+
+def complete_length(file, size, compression):
+    """
+    Get the length of the complete compressed members at the start of a file.
+
+    A file ending with a sync member is complete without reading further. Otherwise
+    only the members after the last sync member are decompressed, so the cost
+    depends on the size of the last write rather than of the file. A file without
+    any sync member is decompressed in full.
+
+    Args:
+        file (file): The compressed file, opened in binary mode.
+        size (int): The size of the file.
+        compression (str): 'gzip', 'bz2' or 'xz'.
+
+    Returns:
+        int: The offset at which the first incomplete or damaged member starts, or
+        the file size if every member is complete.
+    """
+    marker = sync_member(compression)
+    file.seek(max(0, size - len(marker)))
+    if file.read() == marker:
+        return size
+    start = _last_sync_end(file, size, marker)
+    file.seek(start)
+    return start + _complete_members_length(file, compression)
+
+def _last_sync_end(file, size, marker):
+    """
+    Find the offset just after the last sync member of a file, or 0 if it has none.
+    """
+    end = size
+    while end > 0:
+        start = max(0, end - BLOCK_SIZE)
+        file.seek(start)
+        # Overlap the next block by all but one byte, for a marker spanning both
+        found = file.read(min(size, end + len(marker) - 1) - start).rfind(marker)
+        if found != -1:
+            return start + found + len(marker)
+        end = start
+    return 0
+
+def _complete_members_length(file, compression):
+    """
+    Get the length of the complete compressed members from the current position of
+    a file, decompressing them block by block in constant memory.
+    """
+    complete = 0
+    position = 0
+    decompressor = _decompressor(compression)
+    for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+        position += len(block)
+        while block:
+            try:
+                decompressor.decompress(block)
+            except DECOMPRESSION_ERRORS:
+                return complete
+            if not decompressor.eof:
+                break
+            block = decompressor.unused_data
+            complete = position - len(block)
+            decompressor = _decompressor(compression)
+    return complete
+
+def compress(data, compression):
+    """
+    Compress bytes into a complete compressed member followed by the sync member,
+    which can be appended to a compressed file.
+
+    Args:
+        data (bytes): The data to compress.
+        compression (str): 'gzip', 'bz2' or 'xz'.
+
+    Returns:
+        bytes: The compressed data.
+    """
+    return _module(compression).compress(data, **_OPTIONS[compression]) + sync_member(compression)
@@ -0,0 +1,183 @@
+"""
+This module defines the indexes used to query a HistoryStore without scanning it:
+a row-id index per operation and sorted indexes on the result and operands.
+"""
+
+import array
+import bisect
+import math
+import numpy as np
+
+class SortedColumnIndex:
+    """
+    A sorted index of float values to row ids, updated incrementally.
+
+    The index is a sorted main array plus a small sorted buffer of recent rows.
+    Appends go into the buffer, which is merged into the main array once it holds
+    a sixteenth of it, so appends are amortized O(log N) and a range lookup is two
+    binary searches per part plus the matches. NaN values are not indexed.
+    """
+    MIN_BUFFER = 256
+
+    def __init__(self):
+        """
+        Initialize an empty SortedColumnIndex.
+        """
+        self.values = np.empty(0, dtype=np.float64)
+        self.rows = np.empty(0, dtype=np.int64)
+        self._buffer = []
+
+    def __len__(self):
+        """
+        Get the number of indexed values.
+
+        Returns:
+            int: The number of values in the index.
+        """
+        return len(self.values) + len(self._buffer)
+
+    def add(self, value, row):
+        """
+        Index a single value.
+
+        Args:
+            value (float): The value.
+            row (int): The row id of the value.
+        """
+        if math.isnan(value):
+            return
+        bisect.insort(self._buffer, (value, row))
+        if len(self._buffer) > max(self.MIN_BUFFER, len(self.values) // 16):
+            self._merge(np.empty(0), np.empty(0, dtype=np.int64))
+
+    def extend(self, values, rows):
+        """
+        Index a batch of values.
+
+        Args:
+            values (np.ndarray): The values.
+            rows (np.ndarray): The row ids of the values.
+        """
+        keep = ~np.isnan(values)
+        self._merge(values[keep], rows[keep])
+
+    def _merge(self, values, rows):
+        """
+        Merge the buffer and a batch of values into the main array.
+        """
+        if self._buffer:
+            buffered_values, buffered_rows = zip(*self._buffer)
+            values = np.concatenate([values, np.array(buffered_values, dtype=np.float64)])
+            rows = np.concatenate([rows, np.array(buffered_rows, dtype=np.int64)])
+            self._buffer = []
+        if len(values) == 0:
+            return
+        values = np.concatenate([self.values, values])
+        rows = np.concatenate([self.rows, rows])
+        order = np.lexsort((rows, values))
+        self.values, self.rows = values[order], rows[order]
+
+    def range(self, low=None, high=None):
+        """
+        Find the rows whose value lies in a closed range.
+
+        Args:
+            low (float, optional): The lower bound, or None for no bound.
+            high (float, optional): The upper bound, or None for no bound.
+
+        Returns:
+            np.ndarray: The matching row ids, in ascending order.
+        """
+        start = 0 if low is None else np.searchsorted(self.values, low, side='left')
+        end = len(self.values) if high is None else np.searchsorted(self.values, high,
+                                                                    side='right')
+        buffer_start = 0 if low is None else bisect.bisect_left(self._buffer, (low, -1))
+        buffer_end = (len(self._buffer) if high is None
+                      else bisect.bisect_right(self._buffer, (high, float('inf'))))
+        buffered = [row for _, row in self._buffer[buffer_start:buffer_end]]
+        return np.sort(np.concatenate([self.rows[start:end],
+                                       np.array(buffered, dtype=np.int64)]))
+
+class HistoryIndex:
+    """
+    The query indexes of a HistoryStore: row ids per operation code, and sorted
+    indexes on the result and both operands.
+    """
+    COLUMNS = ('operand1', 'operand2', 'result')
+
+    def __init__(self):
+        """
+        Initialize an empty HistoryIndex.
+        """
+        self.size = 0
+        self._operations = {}
+        self.columns = {name: SortedColumnIndex() for name in self.COLUMNS}
+
+    def add(self, code, a, b, result):
+        """
+        Index the next row of the store.
+
+        Args:
+            code (int): The operation code of the row.
+            a (float): The first operand.
+            b (float): The second operand.
+            result (float): The result.
+        """
+        row = self.size
+        self._operations.setdefault(code, array.array('q')).append(row)
+        for name, value in zip(self.COLUMNS, (a, b, result)):
+            self.columns[name].add(value, row)
+        self.size = row + 1
+
+    def extend(self, codes, a, b, result):
+        """
+        Index the next rows of the store.
+
+        Args:
+            codes (np.ndarray): The operation codes of the rows.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results.
+        """
+        start = self.size
+        rows = np.arange(start, start + len(codes), dtype=np.int64)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        boundaries = np.flatnonzero(np.diff(sorted_codes)) + 1
+        for group in np.split(order, boundaries):
+            if len(group):
+                code = int(codes[group[0]])
+                self._operations.setdefault(code, array.array('q')).frombytes(
+                    rows[group].tobytes())
+        for name, values in zip(self.COLUMNS, (a, b, result)):
+            self.columns[name].extend(np.asarray(values, dtype=np.float64), rows)
+        self.size = start + len(codes)
+
+    def operation_rows(self, code):
+        """
+        Find the rows of an operation.
+
+        Args:
+            code (int): The operation code.
+
+        Returns:
+            np.ndarray: The matching row ids, in ascending order.
+        """
+        rows = self._operations.get(code)
+        if rows is None:
+            return np.empty(0, dtype=np.int64)
+        return np.frombuffer(rows, dtype=np.int64).copy()
+
+    def range_rows(self, column, low=None, high=None):
+        """
+        Find the rows whose value of a column lies in a closed range.
+
+        Args:
+            column (str): 'operand1', 'operand2' or 'result'.
+            low (float, optional): The lower bound, or None for no bound.
+            high (float, optional): The upper bound, or None for no bound.
+
+        Returns:
+            np.ndarray: The matching row ids, in ascending order.
+        """
+        return self.columns[column].range(low, high)
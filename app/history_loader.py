@@ -0,0 +1,107 @@
+"""
+This module defines the HistoryLoader class, which loads a history file into a
+HistoryStore either on first use or in a background thread.
+"""
+
+import logging
+import threading
+from app.lazy import lazy_import
+from app.history_binary import BinaryHistoryFile, is_binary_history
+from app.history_compression import compression_for, open_history
+from app.history_segments import SegmentedHistory, is_segmented_history
+from app.history_store import HistoryStore
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger('app.history_loader')
+
+CHUNKSIZE = 100_000
+
+def read_history_store(filename):
+    """
+    Read a CSV, compressed CSV, binary or segmented history into a HistoryStore.
+
+    Compressed files are decompressed as a stream and added to the store one chunk
+    of rows at a time. A damaged or truncated compressed file is read up to its last
+    complete line.
+
+    Args:
+        filename (str): The history file to read.
+
+    Returns:
+        HistoryStore: The history of operations, or None if the file is missing or empty.
+    """
+    try:
+        if is_binary_history(filename):
+            # Memory-mapped, so loading does not depend on the history size
+            store = BinaryHistoryFile(filename).to_store()
+        elif is_segmented_history(filename):
+            store = SegmentedHistory(filename).to_store()
+        elif compression_for(filename) is not None:
+            store = HistoryStore()
+            # The stream stops at the last complete line before damaged data
+            with open_history(filename) as file, pd.read_csv(file, chunksize=CHUNKSIZE) as reader:
+                for chunk in reader:
+                    store.extend_store(HistoryStore.from_frame(chunk))
+        else:
+            store = HistoryStore.from_frame(pd.read_csv(filename))
+        logger.info("Calculator history loaded from file: %s", filename)
+        return store
+    except FileNotFoundError:
+        logger.warning("History file not found: %s", filename)
+    except pd.errors.EmptyDataError:
+        logger.warning("History file is empty: %s", filename)
+    return None
+
+class HistoryLoader:
+    """
+    A deferred load of a history file.
+
+    The file is read the first time result() is called, or straight away in a
+    background thread, so creating the loader costs the same for any file size.
+    """
+    def __init__(self, filename, background=False):
+        """
+        Initialize the HistoryLoader and start the background thread if requested.
+
+        Args:
+            filename (str): The history file to load.
+            background (bool, optional): Whether to load in a background thread.
+            Defaults to False.
+        """
+        self.filename = filename
+        self._store = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._load, name='history-loader', daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        """
+        Load the history file once.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._store = read_history_store(self.filename)
+                self._loaded = True
+
+    def done(self):
+        """
+        Check whether the history file has been loaded.
+
+        Returns:
+            bool: True if the history is available without waiting.
+        """
+        return self._loaded
+
+    def result(self):
+        """
+        Get the loaded history, loading it now or waiting for the background thread.
+
+        Returns:
+            HistoryStore: The history of operations, or None if the file is missing or empty.
+        """
+        self._load()
+        return self._store
@@ -0,0 +1,309 @@
+"""
+This module defines the HistoryLog class, an append-only writer for the CSV
+history file managed by the ManagerHistory class.
+"""
+
+import atexit
+import csv
+import io
+import itertools
+import logging
+import os
+import threading
+import time
+from app.file_lock import locked, locked_file
+from app.history_compression import MEMBER_SIZE, compress, complete_length, compression_for
+from app.instrumentation import timed
+
+logger = logging.getLogger('app.history_log')
+
+HEADER = ['operation', 'operand1', 'operand2', 'result']
+
+class HistoryLog:
+    """
+    An append-only writer that keeps the history file open and buffers new rows.
+
+    Buffered rows are written with a single write on an O_APPEND descriptor once
+    `flush_rows` rows are pending or `flush_interval` seconds have passed since the
+    last flush, so recording a row never re-reads or rewrites the existing file. A
+    daemon timer flushes rows left pending by an idle session.
+
+    The log is safe to share between threads. Appends only hold a lock while they
+    add to the buffer, and flushes use group commit: one thread writes every row
+    buffered so far while the others keep appending or wait for that write. Each
+    write holds an advisory lock on the file, so processes sharing the file never
+    interleave rows, and follows the file if another process replaced it.
+
+    Files with a gzip, bz2 or xz extension are compressed: each write appends the
+    rows as a complete compressed member, and an incomplete last member is cut off
+    when the file is opened. Rows are buffered until MEMBER_SIZE bytes are pending
+    instead of `flush_rows` rows, so members are large enough to compress well.
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, filename, flush_rows=64, flush_interval=1.0, durable=False,
+                 on_flush=None):
+        """
+        Initialize the HistoryLog for a file.
+
+        Args:
+            filename (str): The history file to append to.
+            flush_rows (int, optional): Number of pending rows that triggers a flush
+            of an uncompressed file. Defaults to 64.
+            flush_interval (float, optional): Seconds after which pending rows are
+            flushed, even if nothing else is appended. Defaults to 1.0.
+            durable (bool, optional): Whether each write is synced to disk before the
+            flush returns. Defaults to False.
+            on_flush (callable, optional): Called without arguments after a flush has
+            written rows, including flushes by the timer, with no lock held.
+            Defaults to None.
+        """
+        # pylint: disable=too-many-arguments
+        self.filename = filename
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.durable = durable
+        self.on_flush = on_flush
+        self.compression = compression_for(filename)
+        self.commits = 0
+        self._fd = None
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._pending = 0
+        self._appended = 0
+        self._written = 0
+        # Guards the buffer and counters; the write lock is held while writing
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    @property
+    def pending(self):
+        """
+        Get the number of rows waiting to be flushed.
+
+        Returns:
+            int: The number of buffered rows.
+        """
+        return self._pending
+
+    def open(self):
+        """
+        Open the history file for appending, recovering a truncated last line first.
+        A header is written with the first rows if the file is empty.
+        """
+        with self._lock:
+            self._open()
+
+    def _open(self):
+        """
+        Open the history file while holding the lock.
+        """
+        if self._fd is not None:
+            return
+        self.recover()
+        self._fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._last_flush = time.monotonic()
+        atexit.register(self.close)
+
+    def append(self, row):
+        """
+        Append a single row to the history file.
+
+        Args:
+            row (list): The operation, operands and result to record.
+        """
+        with self._lock:
+            self._open()
+            self._writer.writerow(row)
+            self._pending += 1
+            self._appended += 1
+            if not self._due():
+                self._schedule()
+                return
+        self.flush()
+
+    def extend(self, rows):
+        """
+        Append several rows to the history file.
+
+        Args:
+            rows (list): The rows to record.
+        """
+        with self._lock:
+            self._open()
+            self._writer.writerows(rows)
+            self._pending += len(rows)
+            self._appended += len(rows)
+            if not self._due():
+                self._schedule()
+                return
+        self.flush()
+
+    def extend_columns(self, operation, a, b, result):
+        """
+        Append a batch of rows given as columns.
+
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results of the operations.
+        """
+        operations = itertools.repeat(operation) if isinstance(operation, str) else operation
+        self.extend(list(zip(operations, a.tolist(), b.tolist(), result.tolist())))
+
+    def _due(self):
+        """
+        Check whether the size or time threshold for a flush has been reached.
+        """
+        if self.compression is not None:
+            full = self._buffer.tell() >= MEMBER_SIZE
+        else:
+            full = self._pending >= self.flush_rows
+        return (full or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def _schedule(self):
+        """
+        Start the timer that flushes pending rows after the flush interval, unless it
+        is already running.
+        """
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_interval, self._flush_pending)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_pending(self):
+        """
+        Flush the rows pending when the timer fired.
+        """
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def _take_buffer(self):
+        """
+        Take the buffered rows, leaving an empty buffer for later appends.
+        """
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._pending = 0
+        return data.encode('utf-8')
+
+    @timed('history_log.flush')
+    def flush(self):
+        """
+        Write all rows appended so far to the history file.
+
+        If another thread is already writing, this waits for it and then writes the
+        rows buffered in the meantime, unless that write already included them, so
+        concurrent flushes are grouped into as few writes as possible.
+        """
+        with self._lock:
+            target = self._appended
+        with self._write_lock:
+            with self._lock:
+                if self._written >= target:
+                    return
+                data, rows = self._take_buffer(), self._appended
+            self._write(data)
+            with self._lock:
+                self._written = rows
+                self._last_flush = time.monotonic()
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def _write(self, data):
+        """
+        Append data to the history file under an advisory lock, reopening the file
+        first if it was replaced and writing the header first if it is empty.
+        """
+        if not data or self._fd is None:
+            return
+        while True:
+            with locked(self._fd):
+                opened = os.fstat(self._fd)
+                try:
+                    current = os.stat(self.filename)
+                except FileNotFoundError:
+                    current = None
+                if current is not None and (current.st_ino, current.st_dev) == (
+                        opened.st_ino, opened.st_dev):
+                    if opened.st_size == 0:
+                        data = (','.join(HEADER) + '\r\n').encode('utf-8') + data
+                    if self.compression is not None:
+                        data = compress(data, self.compression)
+                    view = memoryview(data)
+                    while view:
+                        written = os.write(self._fd, view)
+                        view = view[written:]
+                    if self.durable:
+                        os.fsync(self._fd)
+                    self.commits += 1
+                    return
+            # The file was replaced or removed by another writer; append to the new one
+            os.close(self._fd)
+            self._fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def close(self):
+        """
+        Flush buffered rows and close the history file.
+        """
+        with self._write_lock, self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._fd is None:
+                return
+            self._write(self._take_buffer())
+            self._written = self._appended
+            os.close(self._fd)
+            self._fd = None
+        atexit.unregister(self.close)
+
+    def recover(self):
+        """
+        Truncate a partially written last line, or for a compressed file a partially
+        written last member, left behind by a crash. Only the members written after
+        the last sync member of a compressed file are decompressed.
+
+        Returns:
+            bool: True if the file was truncated, False otherwise.
+        """
+        try:
+            size = os.path.getsize(self.filename)
+        except FileNotFoundError:
+            return False
+        if size == 0:
+            return False
+        with locked_file(self.filename), open(self.filename, 'rb+') as file:
+            if self.compression is not None:
+                keep = complete_length(file, size, self.compression)
+            else:
+                keep = _complete_lines_length(file, size)
+            if keep == size:
+                return False
+            file.truncate(keep)
+        logger.warning("Recovered truncated history file %s: dropped %d bytes",
+                       self.filename, size - keep)
+        return True
+
+def _complete_lines_length(file, size):
+    """
+    Get the length of a file up to the end of its last complete line.
+    """
+    file.seek(-1, os.SEEK_END)
+    if file.read(1) == b'\n':
+        return size
+    end = size
+    while end > 0:
+        start = max(0, end - 4096)
+        file.seek(start)
+        newline = file.read(end - start).rfind(b'\n')
+        if newline != -1:
+            return start + newline + 1
+        end = start
+    return 0
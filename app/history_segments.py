@@ -0,0 +1,684 @@
+"""
+This module defines the SegmentedHistory class, a history stored as a directory of
+fixed-size CSV segment files and a manifest.
+
+Layout of a segmented history directory:
+
+    manifest.json       the format version, the next segment id and, for each
+                        segment in order, its file, first row, row count, the
+                        range of its results and its operation names
+    segment-NNNNNN.csv  a CSV history file with a header, holding at most
+                        `segment_rows` rows
+
+Rows are appended to the last segment until it is full or the history is closed,
+when it is sealed and a new segment is started, so an append never rewrites
+existing data and each session starts a segment of its own. Sealed segments are
+never modified: loads, tails and range queries use the manifest to read only the
+segments they need, clearing only rewrites the manifest, and copies hard-link
+sealed segments instead of rewriting them. Small sealed segments, such
+as those of short sessions, are merged in a background thread.
+"""
+
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+from app.history_log import HEADER, HistoryLog
+from app.history_store import HistoryStore
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger('app.history_segments')
+
+SEGMENTED_EXTENSION = '.segments'
+MANIFEST = 'manifest.json'
+VERSION = 1
+SEGMENT_ROWS = 100_000
+
+def is_segmented_history(path):
+    """
+    Check whether a path is a segmented history directory.
+
+    Args:
+        path (str): The path to check.
+
+    Returns:
+        bool: True if the path is a directory with a segment manifest.
+    """
+    return os.path.isfile(os.path.join(path, MANIFEST))
+
+def segments_path(filename):
+    """
+    Get the directory of the segmented history for a history filename.
+
+    Args:
+        filename (str): The history filename, such as 'data/history.csv'.
+
+    Returns:
+        str: The filename itself if it has the segmented extension, otherwise the
+        filename with its extension replaced, such as 'data/history.segments'.
+    """
+    filename = filename.rstrip(os.sep)
+    if filename.endswith(SEGMENTED_EXTENSION):
+        return filename
+    return os.path.splitext(filename)[0] + SEGMENTED_EXTENSION
+
+def _new_entry(file, sealed=False):
+    """
+    Create the manifest entry of an empty segment.
+    """
+    return {'file': file, 'start': 0, 'rows': 0, 'min_result': None, 'max_result': None,
+            'operations': [], 'sealed': sealed}
+
+def _update_entry(entry, rows):
+    """
+    Add the row count, result range and operations of rows to a manifest entry.
+    """
+    results = []
+    for row in rows:
+        try:
+            value = float(row[3])
+        except (TypeError, ValueError):
+            continue
+        if not math.isnan(value):
+            results.append(value)
+    if results:
+        low, high = min(results), max(results)
+        entry['min_result'] = low if entry['min_result'] is None else min(entry['min_result'], low)
+        entry['max_result'] = high if entry['max_result'] is None else max(entry['max_result'],
+                                                                           high)
+    operations = set(entry['operations'])
+    operations.update(str(row[0]) for row in rows)
+    entry['operations'] = sorted(operations)
+    entry['rows'] += len(rows)
+
+def _merge_entries(file, entries):
+    """
+    Create the manifest entry of a sealed segment holding the rows of several segments.
+    """
+    entry = _new_entry(file, sealed=True)
+    entry['rows'] = sum(item['rows'] for item in entries)
+    lows = [item['min_result'] for item in entries if item['min_result'] is not None]
+    highs = [item['max_result'] for item in entries if item['max_result'] is not None]
+    entry['min_result'] = min(lows) if lows else None
+    entry['max_result'] = max(highs) if highs else None
+    entry['operations'] = sorted(set().union(*(item['operations'] for item in entries)))
+    return entry
+
+def _empty_frame():
+    """
+    Create an empty history DataFrame with float64 operand and result columns.
+    """
+    return pd.DataFrame({name: pd.Series(dtype=object if name == 'operation' else 'float64')
+                         for name in HEADER})
+
+def _overlaps(entry, low, high):
+    """
+    Check whether the result range of a segment overlaps a closed range.
+    """
+    if entry['min_result'] is None:
+        return False
+    return ((low is None or entry['max_result'] >= low)
+            and (high is None or entry['min_result'] <= high))
+
+class SegmentedHistory:
+    """
+    A history stored as rotating CSV segment files described by a manifest.
+
+    Appends go through a HistoryLog on the last segment and expose the same append,
+    extend, flush and close methods as HistoryLog and BinaryHistoryFile.
+    """
+    # pylint: disable=too-many-instance-attributes,too-many-public-methods
+    def __init__(self, directory, segment_rows=SEGMENT_ROWS, flush_rows=64,
+                 flush_interval=1.0, compact_segments=4):
+        """
+        Initialize the SegmentedHistory for a directory.
+
+        Args:
+            directory (str): The segmented history directory.
+            segment_rows (int, optional): The number of rows after which a segment is
+            sealed. Defaults to SEGMENT_ROWS.
+            flush_rows (int, optional): Number of pending rows that triggers a flush.
+            Defaults to 64.
+            flush_interval (float, optional): Seconds after which pending rows are
+            flushed, even if nothing else is appended. Defaults to 1.0.
+            compact_segments (int, optional): The number of small sealed segments that
+            starts a background compaction, or 0 to only compact on request.
+            Defaults to 4.
+        """
+        # pylint: disable=too-many-arguments
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compact_segments = compact_segments
+        self._segments = None
+        self._next_id = 1
+        self._log = None
+        self._lock = threading.RLock()
+        self._compactor = None
+
+    def _path(self, entry):
+        """
+        Get the path of a segment file.
+        """
+        return os.path.join(self.directory, entry['file'])
+
+    @property
+    def segments(self):
+        """
+        Get the manifest entries of the segments, loading the manifest if needed.
+
+        Returns:
+            list: The manifest entry of each segment, in row order.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._segments
+
+    def _ensure_loaded(self):
+        """
+        Load the manifest on first use.
+        """
+        if self._segments is None:
+            self._load()
+
+    def _load(self):
+        """
+        Read the manifest and recover the row count of the last segment after a crash.
+        """
+        try:
+            with open(os.path.join(self.directory, MANIFEST), encoding='utf-8') as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            manifest = {'version': VERSION, 'next_id': 1, 'segments': []}
+        if manifest.get('version') != VERSION:
+            raise ValueError(f"Unsupported segmented history version in {self.directory}")
+        self._segments = manifest['segments']
+        self._next_id = manifest['next_id']
+        if self._segments and not self._segments[-1]['sealed']:
+            self._recover(self._segments[-1])
+
+    def _recover(self, entry):
+        """
+        Bring the manifest entry of the open segment up to date with its file, which
+        may hold rows flushed after the manifest was last written.
+        """
+        path = self._path(entry)
+        HistoryLog(path).recover()
+        try:
+            with open(path, 'rb') as file:
+                rows = max(0, sum(chunk.count(b'\n')
+                                  for chunk in iter(lambda: file.read(1 << 20), b'')) - 1)
+        except FileNotFoundError:
+            rows = 0
+        if rows != entry['rows']:
+            frame = self._read_segment(path)
+            recovered = _new_entry(entry['file'])
+            _update_entry(recovered, list(frame.itertuples(index=False, name=None)))
+            entry.update(recovered)
+            self._save_manifest()
+
+    def _save_manifest(self):
+        """
+        Write the manifest through a temporary file renamed over the old one.
+        """
+        start = 0
+        for entry in self._segments:
+            entry['start'] = start
+            start += entry['rows']
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = os.path.join(self.directory, MANIFEST)
+        with open(manifest + '.tmp', 'w', encoding='utf-8') as file:
+            json.dump({'version': VERSION, 'next_id': self._next_id,
+                       'segments': self._segments}, file)
+        os.replace(manifest + '.tmp', manifest)
+
+    def _new_file(self):
+        """
+        Reserve the name of a new segment file.
+        """
+        self._ensure_loaded()
+        name = f"segment-{self._next_id:06d}.csv"
+        self._next_id += 1
+        return name
+
+    def create(self):
+        """
+        Create an empty segmented history, replacing any existing one.
+        """
+        self.clear()
+
+    def __len__(self):
+        """
+        Get the number of rows in the history.
+
+        Returns:
+            int: The number of rows.
+        """
+        return sum(entry['rows'] for entry in self.segments)
+
+    def _active(self):
+        """
+        Get the manifest entry of the open segment, starting a new one if needed.
+        """
+        segments = self.segments
+        if not segments or segments[-1]['sealed']:
+            segments.append(_new_entry(self._new_file()))
+            self._save_manifest()
+            # A file left behind by a crash before its manifest entry was written
+            if os.path.exists(self._path(segments[-1])):
+                os.remove(self._path(segments[-1]))
+        if self._log is None:
+            self._log = HistoryLog(self._path(segments[-1]), flush_rows=self.flush_rows,
+                                   flush_interval=self.flush_interval,
+                                   on_flush=self._flushed)
+            self._maybe_compact()
+        return segments[-1]
+
+    def _flushed(self):
+        """
+        Record rows written by a flush of the open segment, including timed flushes,
+        in the manifest once no rows are left pending.
+        """
+        with self._lock:
+            if self._log is not None and self._log.pending == 0:
+                self._save_manifest()
+
+    def _rotate(self):
+        """
+        Seal the open segment, so the next append starts a new one.
+        """
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self.segments[-1]['sealed'] = True
+        self._save_manifest()
+        self._maybe_compact()
+
+    def append(self, row):
+        """
+        Append a single row to the history.
+
+        Args:
+            row (list): The operation, operands and result to record.
+        """
+        self.extend([row])
+
+    def extend(self, rows):
+        """
+        Append several rows to the history, rotating segments as they fill up.
+
+        Args:
+            rows (list): The rows to record.
+        """
+        with self._lock:
+            rows = list(rows)
+            while rows:
+                entry = self._active()
+                room = self.segment_rows - entry['rows']
+                if room <= 0:
+                    self._rotate()
+                    continue
+                part, rows = rows[:room], rows[room:]
+                self._log.extend(part)
+                _update_entry(entry, part)
+                if entry['rows'] >= self.segment_rows:
+                    self._rotate()
+
+    def extend_columns(self, operation, a, b, result):
+        """
+        Append a batch of rows given as columns.
+
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results of the operations.
+        """
+        operations = [operation] * len(a) if isinstance(operation, str) else operation
+        self.extend(list(zip(operations, a.tolist(), b.tolist(), result.tolist())))
+
+    def flush(self):
+        """
+        Write buffered rows to the open segment and record them in the manifest.
+        """
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+                self._save_manifest()
+
+    def close(self):
+        """
+        Flush buffered rows, seal the open segment if it has rows and wait for a
+        running compaction.
+        """
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+                if self._segments[-1]['rows']:
+                    self._segments[-1]['sealed'] = True
+                self._save_manifest()
+            compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _replace_segments(self, segments):
+        """
+        Switch to a new list of segments and remove the files of the old ones.
+        """
+        old = self.segments
+        self._segments = segments
+        self._save_manifest()
+        kept = {entry['file'] for entry in segments}
+        for entry in old:
+            if entry['file'] not in kept:
+                os.remove(self._path(entry))
+
+    def clear(self):
+        """
+        Remove all rows by emptying the manifest, then deleting the segment files.
+        """
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            self._replace_segments([])
+
+    def _write_segment(self, frame, sealed=True):
+        """
+        Write a DataFrame of rows as a new segment.
+        """
+        entry = _new_entry(self._new_file(), sealed=sealed)
+        frame.to_csv(self._path(entry), columns=HEADER, header=True, index=False)
+        _update_entry(entry, list(frame[HEADER].itertuples(index=False, name=None)))
+        return entry
+
+    def write_chunks(self, chunks):
+        """
+        Replace the contents of the history with chunks of rows.
+
+        The new segments are written before the manifest is switched to them, so a
+        crash leaves either the old or the new history. The last segment is left
+        open, so later appends fill it up.
+
+        Args:
+            chunks (iterable): DataFrames of operations.
+        """
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            os.makedirs(self.directory, exist_ok=True)
+            segments = []
+            pending = []
+            size = 0
+            for chunk in chunks:
+                pending.append(chunk[HEADER])
+                size += len(chunk)
+                while size >= self.segment_rows:
+                    frame = pd.concat(pending, ignore_index=True)
+                    segments.append(self._write_segment(frame.iloc[:self.segment_rows]))
+                    pending, size = [frame.iloc[self.segment_rows:]], len(frame) - self.segment_rows
+            if size:
+                segments.append(self._write_segment(pd.concat(pending, ignore_index=True),
+                                                    sealed=False))
+            self._replace_segments(segments)
+
+    def link_from(self, source):
+        """
+        Replace the contents of the history with those of another segmented history.
+
+        Sealed segments are hard-linked, falling back to a copy across file systems,
+        and only the open segment of the source is copied, so it stays open here.
+
+        Args:
+            source (SegmentedHistory): The history to copy.
+        """
+        source.flush()
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            os.makedirs(self.directory, exist_ok=True)
+            segments = []
+            for entry in list(source.segments):
+                copy = dict(entry, file=self._new_file())
+                path = self._path(copy)
+                try:
+                    if not entry['sealed']:
+                        raise OSError("The open segment is always copied")
+                    os.link(source._path(entry), path)  # pylint: disable=protected-access
+                except OSError:
+                    shutil.copyfile(source._path(entry), path)  # pylint: disable=protected-access
+                segments.append(copy)
+            self._replace_segments(segments)
+
+    @staticmethod
+    def _read_segment(source):
+        """
+        Read a segment file, given by path or open file, into a DataFrame with float64
+        operand and result columns.
+        """
+        try:
+            frame = pd.read_csv(source, dtype={'operation': str}, engine='c')
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            # An open segment whose first rows are not flushed yet
+            return _empty_frame()
+        for name in HEADER[1:]:
+            frame[name] = pd.to_numeric(frame[name], errors='coerce').astype('float64')
+        return frame
+
+    def _open_segments(self, select):
+        """
+        Open the files of the segments chosen by `select`, so that they can be read
+        after the lock is released even if a compaction removes them meanwhile.
+        """
+        self.flush()
+        with self._lock:
+            opened = []
+            for entry in self.segments:
+                if select(entry):
+                    try:
+                        # pylint: disable=consider-using-with
+                        opened.append((dict(entry), open(self._path(entry), 'rb')))
+                    except FileNotFoundError:
+                        opened.append((dict(entry), None))
+            return opened
+
+    def _read_opened(self, opened):
+        """
+        Read and close the segments returned by _open_segments, one at a time.
+        """
+        try:
+            for entry, file in opened:
+                if file is None:
+                    frame = _empty_frame()
+                else:
+                    with file:
+                        frame = self._read_segment(file)
+                frame.index = pd.RangeIndex(entry['start'], entry['start'] + len(frame))
+                yield entry, frame
+        finally:
+            for _, file in opened:
+                if file is not None:
+                    file.close()
+
+    def iter_chunks(self, chunksize=SEGMENT_ROWS, start=0, stop=None):
+        """
+        Iterate over a range of rows in chunks, reading only the segments it covers.
+
+        Args:
+            chunksize (int, optional): The maximum number of rows per chunk.
+            Defaults to SEGMENT_ROWS.
+            start (int, optional): The first row. Defaults to 0.
+            stop (int, optional): The row after the last one. Defaults to None for
+            the end of the history.
+
+        Yields:
+            pd.DataFrame: The next chunk of operations, indexed by row.
+        """
+        def select(entry):
+            # The row count of an open segment may lag behind rows flushed by others
+            first, last = entry['start'], entry['start'] + entry['rows']
+            return ((not entry['sealed'] or last > start)
+                    and (stop is None or first < stop))
+        for entry, frame in self._read_opened(self._open_segments(select)):
+            first = entry['start']
+            frame = frame.iloc[max(0, start - first):None if stop is None else max(0, stop - first)]
+            for offset in range(0, len(frame), chunksize):
+                yield frame.iloc[offset:offset + chunksize]
+
+    def read_rows(self, start=0, stop=None):
+        """
+        Read a range of rows.
+
+        Args:
+            start (int, optional): The first row. Defaults to 0.
+            stop (int, optional): The row after the last one. Defaults to None for
+            the end of the history.
+
+        Returns:
+            pd.DataFrame: The operations, indexed by row.
+        """
+        chunks = list(self.iter_chunks(start=start, stop=stop))
+        if not chunks:
+            return _empty_frame()
+        return pd.concat(chunks)
+
+    def tail(self, count):
+        """
+        Read the last rows of the history from the last segments only.
+
+        Args:
+            count (int): The number of rows.
+
+        Returns:
+            pd.DataFrame: The last operations, indexed by row.
+        """
+        self.flush()
+        return self.read_rows(max(0, len(self) - count))
+
+    def query(self, operation=None, result=None):
+        """
+        Find the operations matching an operation name and a result range, reading
+        only the segments whose manifest entry can match.
+
+        Args:
+            operation (str, optional): The operation performed.
+            result (tuple, optional): The closed (low, high) range of the result, where
+            either bound may be None.
+
+        Returns:
+            pd.DataFrame: The matching operations, indexed by row.
+        """
+        low, high = result if result is not None else (None, None)
+        def select(entry):
+            if not entry['sealed']:
+                return True
+            return ((operation is None or operation in entry['operations'])
+                    and (result is None or _overlaps(entry, low, high)))
+        matches = []
+        for _, frame in self._read_opened(self._open_segments(select)):
+            keep = pd.Series(True, index=frame.index)
+            if operation is not None:
+                keep &= frame['operation'] == operation
+            if low is not None:
+                keep &= frame['result'] >= low
+            if high is not None:
+                keep &= frame['result'] <= high
+            matches.append(frame[keep])
+        if not matches:
+            return _empty_frame()
+        return pd.concat(matches)
+
+    def to_store(self):
+        """
+        Read the whole history into a HistoryStore.
+
+        Returns:
+            HistoryStore: The history of operations.
+        """
+        return HistoryStore.from_frame(self.read_rows())
+
+    def _small_runs(self):
+        """
+        Find runs of adjacent small sealed segments that fit in one segment together.
+        """
+        runs = [[]]
+        for entry in self.segments:
+            if not entry['sealed'] or entry['rows'] >= self.segment_rows // 2:
+                runs.append([])
+                continue
+            if sum(item['rows'] for item in runs[-1]) + entry['rows'] > self.segment_rows:
+                runs.append([])
+            runs[-1].append(entry)
+        return [run for run in runs if len(run) > 1]
+
+    def _maybe_compact(self):
+        """
+        Start a background compaction if there are enough small sealed segments.
+        """
+        if not self.compact_segments or (self._compactor and self._compactor.is_alive()):
+            return
+        if sum(len(run) for run in self._small_runs()) >= self.compact_segments:
+            self._compactor = self.compact(background=True)
+
+    def compact(self, background=False):
+        """
+        Merge runs of adjacent small sealed segments into single segments.
+
+        Segment files are concatenated without parsing them. Appends continue while
+        a background compaction runs, and the manifest is switched to each merged
+        segment only if the segments it replaces are still in the history.
+
+        Args:
+            background (bool, optional): Whether to compact in a background thread.
+            Defaults to False.
+
+        Returns:
+            threading.Thread or int: The compaction thread, or the number of segments
+            removed by merging.
+        """
+        if background:
+            thread = threading.Thread(target=self.compact, name='history-compactor', daemon=True)
+            thread.start()
+            return thread
+        removed = 0
+        with self._lock:
+            runs = self._small_runs()
+        for run in runs:
+            with self._lock:
+                merged = _merge_entries(self._new_file(), run)
+            try:
+                with open(self._path(merged), 'wb') as output:
+                    output.write((','.join(HEADER) + '\n').encode('utf-8'))
+                    for entry in run:
+                        with open(self._path(entry), 'rb') as segment:
+                            segment.readline()
+                            shutil.copyfileobj(segment, output)
+            except FileNotFoundError:
+                # The history was cleared or replaced meanwhile
+                os.remove(self._path(merged))
+                continue
+            with self._lock:
+                files = [entry['file'] for entry in self.segments]
+                names = [entry['file'] for entry in run]
+                position = next((i for i in range(len(files))
+                                 if files[i:i + len(names)] == names), None)
+                if position is None:
+                    os.remove(self._path(merged))
+                    continue
+                segments = list(self.segments)
+                segments[position:position + len(names)] = [merged]
+                self._replace_segments(segments)
+                removed += len(names) - 1
+        if removed:
+            logger.info("Compacted segmented history %s: %d segments removed",
+                        self.directory, removed)
+        return removed
@@ -0,0 +1,437 @@
+"""
+This module defines the HistoryStore class, a columnar in-memory store for the
+history of operations performed by the Calculator class.
+"""
+
+import numbers
+import numpy as np
+from app.history_index import HistoryIndex
+from app.lazy import lazy_import
+
+pd = lazy_import('pandas')
+
+COLUMNS = ['operation', 'operand1', 'operand2', 'result']
+NUMBER_COLUMNS = COLUMNS[1:]
+
+def to_float(value):
+    """
+    Convert a value to float, using NaN for values that cannot be represented.
+
+    Args:
+        value: The value to convert.
+
+    Returns:
+        float: The converted value.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError, OverflowError):
+        return float('nan')
+
+def exact_value(value):
+    """
+    Get a number that cannot be stored as a float64, such as an integer too large
+    for a float or a complex number.
+
+    Args:
+        value: The value to check.
+
+    Returns:
+        numbers.Number: The value if it is such a number, otherwise None.
+    """
+    if isinstance(value, float):
+        return None
+    try:
+        float(value)
+    except (TypeError, ValueError, OverflowError):
+        return value if isinstance(value, numbers.Number) else None
+    return None
+
+def _parse_exact(text):
+    """
+    Parse the CSV text of a number that cannot be stored as a float64, or return None.
+    """
+    try:
+        return exact_value(int(text))
+    except (TypeError, ValueError):
+        pass
+    try:
+        float(text)
+        return None
+    except (TypeError, ValueError):
+        pass
+    try:
+        return exact_value(complex(text))
+    except (TypeError, ValueError):
+        return None
+
+def factorize_operations(operation, rows):
+    """
+    Split the operations of a batch into distinct names and per-row codes.
+
+    Args:
+        operation (str or np.ndarray): One operation for the whole batch, or one
+        operation name per row.
+        rows (int): The number of rows in the batch.
+
+    Returns:
+        tuple: The list of distinct operation names and an int32 array of codes
+        indexing into it.
+    """
+    if isinstance(operation, str):
+        return [operation], np.zeros(rows, dtype=np.int32)
+    names, codes = np.unique(np.asarray(operation, dtype=object), return_inverse=True)
+    return names.tolist(), codes.astype(np.int32)
+
+def _exact_column(name, original, values):
+    """
+    Find the numbers of a column that became NaN when it was converted to float64.
+
+    Returns:
+        dict: {name: {row: number}}, or an empty dict if there are none.
+    """
+    exact = {}
+    for row in np.flatnonzero(np.isnan(values)).tolist():
+        value = original.iat[row]
+        value = exact_value(value) if isinstance(value, numbers.Number) else _parse_exact(value)
+        if value is not None:
+            exact[row] = value
+    return {name: exact} if exact else {}
+
+class HistoryStore:
+    """
+    A history of operations kept in growable typed columns.
+
+    Operands and results are stored in float64 arrays and operation names are
+    interned into an int32 code array. Numbers that a float64 cannot hold, such as
+    exact integer powers too large for a float or complex numbers, are stored as NaN
+    in the arrays and kept exactly in the sparse `exact` side column, which the
+    DataFrame view uses in their place. The arrays grow geometrically, so appends
+    are amortized O(1), and the pandas DataFrame view is only built on request.
+    Query indexes are built on the first query and then kept up to date on every
+    append.
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, capacity=16):
+        """
+        Initialize an empty HistoryStore.
+
+        Args:
+            capacity (int, optional): The initial number of rows to allocate. Defaults to 16.
+        """
+        self.size = 0
+        self.operations = []
+        self._operation_codes = {}
+        self.codes = np.empty(capacity, dtype=np.int32)
+        self.operand1 = np.empty(capacity, dtype=np.float64)
+        self.operand2 = np.empty(capacity, dtype=np.float64)
+        self.result = np.empty(capacity, dtype=np.float64)
+        # The numbers that are NaN in the arrays, by column name and row
+        self.exact = {}
+        self.index = None
+        self._frame = None
+
+    def __len__(self):
+        """
+        Get the number of stored operations.
+
+        Returns:
+            int: The number of rows in the store.
+        """
+        return self.size
+
+    def intern(self, operation):
+        """
+        Get the code for an operation name, assigning a new one if needed.
+
+        Args:
+            operation (str): The operation name.
+
+        Returns:
+            int: The code of the operation.
+        """
+        code = self._operation_codes.get(operation)
+        if code is None:
+            code = len(self.operations)
+            self._operation_codes[operation] = code
+            self.operations.append(operation)
+        return code
+
+    def reserve(self, rows):
+        """
+        Make sure there is room for a number of additional rows, copying read-only
+        columns such as memory maps into writable arrays.
+
+        Args:
+            rows (int): The number of rows about to be appended.
+        """
+        needed = self.size + rows
+        capacity = len(self.codes)
+        if needed <= capacity and self.codes.flags.writeable:
+            return
+        capacity = max(needed, capacity * 2, 16)
+        for name in ('codes', 'operand1', 'operand2', 'result'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def append(self, operation, a, b, result):
+        """
+        Append an operation to the store.
+
+        Args:
+            operation (str): The operation performed.
+            a (float): The first operand.
+            b (float): The second operand.
+            result (float): The result of the operation.
+        """
+        self.reserve(1)
+        row = self.size
+        if not (isinstance(a, float) and isinstance(b, float) and isinstance(result, float)):
+            for name, value in zip(NUMBER_COLUMNS, (a, b, result)):
+                value = exact_value(value)
+                if value is not None:
+                    self.exact.setdefault(name, {})[row] = value
+        code, a, b, result = self.intern(operation), to_float(a), to_float(b), to_float(result)
+        self.codes[row] = code
+        self.operand1[row] = a
+        self.operand2[row] = b
+        self.result[row] = result
+        self.size = row + 1
+        self._frame = None
+        if self.index is not None:
+            self.index.add(code, a, b, result)
+
+    def extend(self, operation, a, b, result):
+        """
+        Append a batch of operations to the store.
+
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results of the operations.
+        """
+        rows = len(result)
+        names, codes = factorize_operations(operation, rows)
+        mapping = np.array([self.intern(name) for name in names], dtype=np.int32)
+        self.reserve(rows)
+        start, end = self.size, self.size + rows
+        self.codes[start:end] = mapping[codes]
+        self.operand1[start:end] = a
+        self.operand2[start:end] = b
+        self.result[start:end] = result
+        self.size = end
+        self._frame = None
+        self._index_rows(start, end)
+
+    def extend_store(self, other):
+        """
+        Append all operations of another store.
+
+        Args:
+            other (HistoryStore): The store whose operations to append.
+        """
+        rows = len(other)
+        if rows == 0:
+            return
+        mapping = np.array([self.intern(operation) for operation in other.operations],
+                           dtype=np.int32)
+        self.reserve(rows)
+        start, end = self.size, self.size + rows
+        self.codes[start:end] = mapping[other.codes[:rows]]
+        self.operand1[start:end] = other.operand1[:rows]
+        self.operand2[start:end] = other.operand2[:rows]
+        self.result[start:end] = other.result[:rows]
+        for name, values in other.exact.items():
+            self.exact.setdefault(name, {}).update(
+                (row + start, value) for row, value in values.items())
+        self.size = end
+        self._frame = None
+        self._index_rows(start, end)
+
+    def _index_rows(self, start, end):
+        """
+        Add rows to the query indexes, if they have been built.
+        """
+        if self.index is not None:
+            self.index.extend(self.codes[start:end], self.operand1[start:end],
+                              self.operand2[start:end], self.result[start:end])
+
+    def clear(self):
+        """
+        Remove all operations from the store.
+        """
+        if not self.codes.flags.writeable:
+            # Release read-only columns, such as memory maps, instead of copying them
+            for name in ('codes', 'operand1', 'operand2', 'result'):
+                setattr(self, name, np.empty(16, dtype=getattr(self, name).dtype))
+        self.size = 0
+        self.operations = []
+        self._operation_codes = {}
+        self.exact = {}
+        self.index = None
+        self._frame = None
+
+    def build_index(self):
+        """
+        Build the query indexes if they do not exist yet.
+
+        Returns:
+            HistoryIndex: The indexes of the store.
+        """
+        if self.index is None:
+            self.index = HistoryIndex()
+            self._index_rows(0, self.size)
+        return self.index
+
+    def query(self, operation=None, result=None, operand1=None, operand2=None):
+        """
+        Find the rows matching all of the given conditions through the indexes.
+
+        Each lookup costs O(log N + k) for k matching rows. The indexes are built on
+        the first query.
+
+        Args:
+            operation (str, optional): The operation of the rows.
+            result (tuple, optional): The closed (low, high) range of the result, where
+            either bound may be None.
+            operand1 (tuple, optional): The closed range of the first operand.
+            operand2 (tuple, optional): The closed range of the second operand.
+
+        Returns:
+            np.ndarray: The matching row ids, in ascending order.
+        """
+        index = self.build_index()
+        code = None
+        if operation is not None:
+            code = self._operation_codes.get(operation)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+        matches = [index.range_rows(name, *bounds) for name, bounds in
+                   (('result', result), ('operand1', operand1), ('operand2', operand2))
+                   if bounds is not None]
+        if not matches:
+            if code is None:
+                return np.arange(self.size, dtype=np.int64)
+            return index.operation_rows(code)
+        matches.sort(key=len)
+        rows = matches[0]
+        for other in matches[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        if code is not None:
+            # Filtering the range matches is cheaper than intersecting with every row
+            # of the operation
+            rows = rows[self.codes[rows] == code]
+        return rows
+
+    def take(self, rows):
+        """
+        Get some rows of the store as a DataFrame indexed by row id.
+
+        Args:
+            rows (np.ndarray): The row ids.
+
+        Returns:
+            pd.DataFrame: The selected operations.
+        """
+        names = np.array(self.operations, dtype=object)
+        return self._with_exact(pd.DataFrame({
+            'operation': names[self.codes[rows]] if len(rows) else np.empty(0, dtype=object),
+            'operand1': self.operand1[rows],
+            'operand2': self.operand2[rows],
+            'result': self.result[rows]
+        }, columns=COLUMNS, index=pd.Index(rows, name='row')), rows)
+
+    def to_frame(self):
+        """
+        Get the stored history as a DataFrame, building it only when it changed.
+
+        Returns:
+            pd.DataFrame: The history of operations.
+        """
+        if self._frame is None:
+            size = self.size
+            names = np.array(self.operations, dtype=object)
+            self._frame = self._with_exact(pd.DataFrame({
+                'operation': names[self.codes[:size]] if size else np.empty(0, dtype=object),
+                'operand1': self.operand1[:size].copy(),
+                'operand2': self.operand2[:size].copy(),
+                'result': self.result[:size].copy()
+            }, columns=COLUMNS), np.arange(size))
+        return self._frame
+
+    def _with_exact(self, frame, rows):
+        """
+        Put the exact numbers of the given rows into a DataFrame of them, turning the
+        columns that have any into object columns.
+        """
+        for name, values in self.exact.items():
+            positions = [(position, values[row]) for position, row in enumerate(rows.tolist())
+                         if row in values]
+            if positions:
+                column = frame[name].astype(object)
+                for position, value in positions:
+                    column.iat[position] = value
+                frame[name] = column
+        return frame
+
+    @classmethod
+    def from_columns(cls, operations, codes, operand1, operand2, result):
+        """
+        Create a HistoryStore that uses existing column arrays without copying them.
+
+        The arrays may be read-only, such as memory maps: they are only replaced by
+        in-memory copies when the store first grows.
+
+        Args:
+            operations (list): The operation names indexed by the codes.
+            codes (np.ndarray): The int32 operation codes.
+            operand1 (np.ndarray): The float64 first operands.
+            operand2 (np.ndarray): The float64 second operands.
+            result (np.ndarray): The float64 results.
+
+        Returns:
+            HistoryStore: A store holding the given operations.
+        """
+        # pylint: disable=too-many-arguments
+        store = cls(capacity=0)
+        for operation in operations:
+            store.intern(operation)
+        store.codes, store.operand1, store.operand2 = codes, operand1, operand2
+        store.result = result
+        store.size = len(codes)
+        return store
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Create a HistoryStore from a DataFrame of operations.
+
+        Missing columns and values that are not numeric are stored as NaN. Numbers
+        that a float64 cannot hold, such as the text of an integer too large for a
+        float, are kept in the exact side column.
+
+        Args:
+            frame (pd.DataFrame): The history of operations.
+
+        Returns:
+            HistoryStore: A store holding the same operations.
+        """
+        frame = frame.reindex(columns=COLUMNS)
+        store = cls(capacity=max(16, len(frame)))
+        codes, uniques = pd.factorize(frame['operation'].fillna('').astype(str))
+        for operation in uniques:
+            store.intern(operation)
+        size = len(frame)
+        store.codes[:size] = codes
+        for name in NUMBER_COLUMNS:
+            column = pd.to_numeric(frame[name], errors='coerce')
+            values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+            getattr(store, name)[:size] = values
+            if frame[name].dtype == object:
+                store.exact.update(_exact_column(name, frame[name], values))
+        store.size = size
+        return store
@@ -0,0 +1,199 @@
+"""
+This module provides lightweight hot-path instrumentation: per-name call counters
+and fixed-bucket latency histograms measured with a monotonic clock.
+
+Instrumentation is disabled by default. While disabled, instrumented code only
+checks the `enabled` flag before running, and no clock is read.
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+# Upper bounds of the latency buckets, in nanoseconds: 1-2-5 steps from 1 us to 1 s
+BUCKET_BOUNDS = [scale * step for scale in (1_000, 10_000, 100_000, 1_000_000,
+                                            10_000_000, 100_000_000)
+                 for step in (1, 2, 5)] + [1_000_000_000]
+
+def _format_bound(bound):
+    """
+    Format a bucket bound in nanoseconds as a short duration label.
+    """
+    if bound >= 1_000_000_000:
+        return f"{bound // 1_000_000_000}s"
+    if bound >= 1_000_000:
+        return f"{bound // 1_000_000}ms"
+    return f"{bound // 1_000}us"
+
+class LatencyHistogram:
+    """
+    A call counter with a fixed-bucket latency histogram.
+    """
+    def __init__(self):
+        """
+        Initialize an empty LatencyHistogram.
+        """
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        # One bucket per bound plus one for longer calls
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def record(self, elapsed_ns, error=False):
+        """
+        Record one call.
+
+        Args:
+            elapsed_ns (int): The duration of the call in nanoseconds.
+            error (bool, optional): Whether the call raised. Defaults to False.
+        """
+        self.count += 1
+        self.errors += error
+        self.total_ns += elapsed_ns
+        self.min_ns = elapsed_ns if self.min_ns is None else min(self.min_ns, elapsed_ns)
+        self.max_ns = max(self.max_ns, elapsed_ns)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, elapsed_ns)] += 1
+
+    def quantile(self, q):
+        """
+        Estimate a latency quantile as the upper bound of the bucket that contains it.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            int: The estimated latency in nanoseconds, capped at the maximum seen.
+        """
+        if self.count == 0:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ns)
+        return self.max_ns
+
+    def snapshot(self):
+        """
+        Get the counters and latency summary.
+
+        Returns:
+            dict: The call and error counts, the total, mean, min, max, p50 and p99
+            latencies in microseconds and the non-empty buckets keyed by upper bound.
+        """
+        labels = [_format_bound(bound) for bound in BUCKET_BOUNDS] + ['inf']
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_us': self.total_ns / 1_000,
+            'mean_us': self.total_ns / self.count / 1_000 if self.count else 0.0,
+            'min_us': (self.min_ns or 0) / 1_000,
+            'max_us': self.max_ns / 1_000,
+            'p50_us': self.quantile(0.5) / 1_000,
+            'p99_us': self.quantile(0.99) / 1_000,
+            'buckets': {label: count for label, count in zip(labels, self.buckets) if count}
+        }
+
+class Instrumentation:
+    """
+    A registry of LatencyHistograms keyed by name, such as 'calculator.execute_operation'.
+    """
+    def __init__(self, enabled=False):
+        """
+        Initialize the Instrumentation.
+
+        Args:
+            enabled (bool, optional): Whether to record timings. Defaults to False.
+        """
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        """
+        Enable or disable recording.
+
+        Args:
+            enabled (bool, optional): Whether to record timings. Defaults to True.
+        """
+        self.enabled = enabled
+
+    def record(self, name, elapsed_ns, error=False):
+        """
+        Record one call of an instrumented code path.
+
+        Args:
+            name (str): The name of the code path.
+            elapsed_ns (int): The duration of the call in nanoseconds.
+            error (bool, optional): Whether the call raised. Defaults to False.
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(elapsed_ns, error)
+
+    def call(self, name, func, *args):
+        """
+        Call a function and record its duration under a name.
+
+        Args:
+            name (str): The name to record the call under.
+            func (callable): The function to call.
+            *args: The arguments of the call.
+
+        Returns:
+            The result of the call.
+        """
+        start = time.perf_counter_ns()
+        try:
+            result = func(*args)
+        except Exception:
+            self.record(name, time.perf_counter_ns() - start, error=True)
+            raise
+        self.record(name, time.perf_counter_ns() - start)
+        return result
+
+    def snapshot(self):
+        """
+        Get the counters and latency summaries of every instrumented code path.
+
+        Returns:
+            dict: LatencyHistogram snapshots keyed by name, sorted by name.
+        """
+        with self._lock:
+            return {name: self._histograms[name].snapshot()
+                    for name in sorted(self._histograms)}
+
+    def reset(self):
+        """
+        Remove all recorded timings.
+        """
+        with self._lock:
+            self._histograms.clear()
+
+instrumentation = Instrumentation()
+
+def timed(name):
+    """
+    Decorate a function so that its calls are recorded under a name while
+    instrumentation is enabled.
+
+    Args:
+        name (str): The name to record the calls under.
+
+    Returns:
+        callable: The decorator.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            return instrumentation.call(name, functools.partial(func, *args, **kwargs))
+        return wrapper
+    return decorator
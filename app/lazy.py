@@ -0,0 +1,57 @@
+"""
+This module provides lazy imports for heavy dependencies such as pandas, so that
+importing the app package does not pay for them until they are used.
+"""
+
+import importlib
+
+class LazyModule:
+    """
+    A stand-in for a module that imports it on first attribute access.
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(self, name):
+        """
+        Initialize the LazyModule with the name of the module to import.
+
+        Args:
+            name (str): The fully qualified module name.
+        """
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        """
+        Import the module if needed and get one of its attributes.
+
+        Args:
+            attr (str): The attribute name.
+
+        Returns:
+            The attribute of the imported module.
+        """
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        """
+        Return a string representation of the LazyModule.
+
+        Returns:
+            str: A string representation of the LazyModule.
+        """
+        state = 'imported' if self._module is not None else 'not imported'
+        return f"<LazyModule '{self._name}' ({state})>"
+
+def lazy_import(name):
+    """
+    Get a module that is imported on first use.
+
+    Args:
+        name (str): The fully qualified module name.
+
+    Returns:
+        LazyModule: The lazily imported module.
+    """
+    return LazyModule(name)
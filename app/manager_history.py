@@ -5,35 +5,309 @@ arithmetic operations performed by the Calculator class.
 
 import os
 import csv
-import pandas as pd
-from .history import History
+import itertools
+import warnings
+from .file_lock import locked_file
+from .history_compression import (compress, compressed_path, compression_for, open_history,
+                                  sync_member)
+from .instrumentation import timed
+from .lazy import lazy_import
+from .history_log import HistoryLog, HEADER
+from .history_binary import BinaryHistoryFile, is_binary_history, history_format_for
+from .history_segments import (SEGMENT_ROWS, SegmentedHistory, is_segmented_history,
+                               segments_path)
+
+pd = lazy_import('pandas')
+
+CHUNKSIZE = 100_000
+
+def _typed(chunk):
+    """
+    Convert the operand and result columns of a chunk to float64, using NaN for
+    missing or invalid values.
+    """
+    for name in HEADER[1:]:
+        chunk[name] = pd.to_numeric(chunk[name], errors='coerce').astype('float64')
+    return chunk
+
+def _parse_chunks(filename, chunksize):
+    """
+    Parse a history file in chunks with the pandas C parser.
+    """
+    if compression_for(filename) is None:
+        yield from _parse_csv_chunks(filename, chunksize)
+        return
+    # Compressed files are read through a stream that stops at damaged data
+    try:
+        file = open_history(filename)
+    except FileNotFoundError:
+        return
+    with file:
+        yield from _parse_csv_chunks(file, chunksize)
+
+def _parse_csv_chunks(source, chunksize):
+    """
+    Parse a CSV history file or stream in chunks with the pandas C parser.
+    """
+    try:
+        reader = pd.read_csv(source, header=None, skiprows=1, names=HEADER, index_col=False,
+                             dtype={'operation': str}, chunksize=chunksize, engine='c')
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return
+    with reader:
+        while True:
+            with warnings.catch_warnings():
+                # Extra columns are dropped on purpose
+                warnings.simplefilter('ignore', pd.errors.ParserWarning)
+                chunk = next(reader, None)
+            if chunk is None:
+                return
+            yield _typed(chunk)
+
+def _parse_ragged_chunks(filename, chunksize, skip):
+    """
+    Parse a history file whose rows have varying numbers of fields with the csv module,
+    keeping the first four fields of each row and skipping rows already parsed.
+    """
+    with open_history(filename) as file:
+        rows = (row for row in csv.reader(file) if row)
+        next(rows, None)  # Skip header
+        for _ in itertools.islice(rows, skip):
+            pass
+        while True:
+            chunk = [(row + [None] * len(HEADER))[:len(HEADER)]
+                     for row in itertools.islice(rows, chunksize)]
+            if not chunk:
+                return
+            yield _typed(pd.DataFrame(chunk, columns=HEADER))
+
+def _frame_rows(frame, chunksize=CHUNKSIZE):
+    """
+    Iterate over the rows of a history DataFrame as tuples, converting one chunk of
+    columns at a time to Python lists instead of building a Series per row.
+    """
+    columns = [frame[name] for name in HEADER]
+    for start in range(0, len(frame), chunksize):
+        yield from zip(*(column.iloc[start:start + chunksize].tolist() for column in columns))
+
+def _same_file(first, second):
+    """
+    Check whether two filenames refer to the same file, however they are spelled.
+    Files that exist are compared by inode, so links to the same file match too.
+    """
+    try:
+        return os.path.samefile(first, second)
+    except OSError:
+        return os.path.realpath(first) == os.path.realpath(second)
+
+def write_csv_history(filename, rows, atomic=True):
+    """
+    Write a CSV history file with its header.
+
+    In atomic mode the rows are written to a temporary file in the same directory,
+    synced to disk and renamed over the destination, so a crash never leaves a
+    partially written history file. The destination is locked while it is
+    rewritten, so appenders in other processes wait and then follow the new file.
+    Files with a gzip, bz2 or xz extension are compressed as they are written.
+
+    Args:
+        filename (str): The history file to write.
+        rows (iterable): The operation, operands and result of each row.
+        atomic (bool, optional): Whether to write through a temporary file. Defaults to True.
+    """
+    target = filename + '.tmp' if atomic else filename
+    compression = compression_for(filename)
+    try:
+        with locked_file(filename):
+            with open_history(target, 'w', compression) as file:
+                writer = csv.writer(file)
+                writer.writerow(HEADER)
+                writer.writerows(rows)
+            if compression is not None:
+                with open(target, 'ab') as file:
+                    file.write(sync_member(compression))
+            if atomic:
+                # Synced once closed, so a compressed file includes its trailer
+                fd = os.open(target, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                os.replace(target, filename)
+    except BaseException:
+        if atomic and os.path.exists(target):
+            os.remove(target)
+        raise
 
 class ManagerHistory:
     """
     A class to manage the history of arithmetic operations.
     """
-    def __init__(self, filename='data/test_history.csv'):
+    def __init__(self, filename='data/test_history.csv', flush_rows=64, flush_interval=1.0,
+                 history_format=None, atomic_writes=True, segment_rows=SEGMENT_ROWS,
+                 compression=None):
         """
         Initialize the ManagerHistory with an optional filename.
 
         Args:
             filename (str, optional): The file to store calculator history. 
             Defaults to 'data/test_history.csv'.
+            flush_rows (int, optional): Number of appended rows buffered before they are
+            written to the file. Defaults to 64.
+            flush_interval (float, optional): Maximum age in seconds of buffered rows
+            before they are flushed. Defaults to 1.0.
+            history_format (str, optional): 'csv', 'binary' or 'segmented'. Defaults to
+            the format implied by the filename extension.
+            atomic_writes (bool, optional): Whether whole-file CSV writes go through a
+            temporary file that is renamed over the destination. Defaults to True.
+            segment_rows (int, optional): The number of rows per segment in segmented
+            format. Defaults to SEGMENT_ROWS.
+            compression (str, optional): 'gzip', 'bz2' or 'xz' to compress a CSV history,
+            whose filename then gets the extension of the compression. Defaults to the
+            compression implied by the filename extension.
+
+        Raises:
+            ValueError: If the compression is unknown or the format is not CSV.
         """
+        # pylint: disable=too-many-arguments
         self.filename = filename
+        self.atomic_writes = atomic_writes
+        self.history_format = history_format or history_format_for(filename)
+        self._legacy_filename = None
+        if compression is not None:
+            if self.history_format != 'csv':
+                raise ValueError("Compression is only supported for CSV history files")
+            # An uncompressed history with the same name is imported on creation
+            self.filename = compressed_path(filename, compression)
+            self._legacy_filename = filename if filename != self.filename else None
+        if self.history_format == 'segmented':
+            # The history is a directory next to the file it replaces
+            self.filename = segments_path(filename)
+            self.log = SegmentedHistory(self.filename, segment_rows=segment_rows,
+                                        flush_rows=flush_rows, flush_interval=flush_interval)
+            self._legacy_filename = filename if filename != self.filename else None
+        elif self.history_format == 'binary':
+            self.log = BinaryHistoryFile(filename)
+        else:
+            self.log = HistoryLog(self.filename, flush_rows=flush_rows,
+                                  flush_interval=flush_interval)
         self.ensure_history_file_exists()
 
     def ensure_history_file_exists(self):
         """
         Ensure the history file exists. Create it if it does not exist.
+
+        In binary format, an existing CSV history file is converted to binary. In
+        segmented format, or for a compressed history, an existing history file with
+        the same name and another extension is imported into the new history.
         """
         # Ensure the directory exists
         os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        if self.history_format == 'segmented':
+            if not is_segmented_history(self.filename):
+                legacy = self._legacy_filename
+                if legacy and os.path.isfile(legacy):
+                    self.log.write_chunks(self.iter_history(filename=legacy))
+                else:
+                    self.log.create()
+            return
+        if self.history_format == 'binary':
+            if not os.path.exists(self.filename):
+                self.log.create()
+            elif not is_binary_history(self.filename):
+                self.log.write_chunks(self.iter_history())
+            return
+        legacy = self._legacy_filename
+        if not os.path.exists(self.filename) and legacy and os.path.isfile(legacy):
+            self.copy_history(legacy, self.filename)
         # Create the file if it does not exist
         if not os.path.exists(self.filename):
-            with open(self.filename, 'w', encoding='utf-8') as file:
-                file.write('operation,operand1,operand2,result\n')  # Write header for CSV
+            header = b'operation,operand1,operand2,result\n'  # Write header for CSV
+            compression = compression_for(self.filename)
+            if compression is not None:
+                header = compress(header, compression)
+            with locked_file(self.filename) as fd:
+                # Another process may have created the file meanwhile
+                if os.fstat(fd).st_size == 0:
+                    os.write(fd, header)
+
+    def format_of(self, filename):
+        """
+        Get the format used to write a history file.
+
+        Args:
+            filename (str): The history filename.
 
+        Returns:
+            str: The format of this manager for its own file, otherwise the format
+            implied by the filename extension.
+        """
+        if _same_file(filename, self.filename):
+            return self.history_format
+        return history_format_for(filename)
+
+    def iter_history(self, chunksize=CHUNKSIZE, filename=None):
+        """
+        Iterate over the history file in chunks of rows.
+
+        The file is parsed in bulk by the pandas C parser, so memory use is bounded by
+        the chunk size rather than the file size. Only the first four columns are
+        read, and missing or invalid numbers become NaN.
+
+        Args:
+            chunksize (int, optional): The maximum number of rows per chunk.
+            Defaults to CHUNKSIZE.
+            filename (str, optional): The filename to read the history from. Defaults to None.
+
+        Yields:
+            pd.DataFrame: The next chunk of operations.
+        """
+        if filename is None:
+            filename = self.filename
+        self.flush()
+        if is_segmented_history(filename):
+            yield from self._segments(filename).iter_chunks(chunksize)
+            return
+        if is_binary_history(filename):
+            yield from BinaryHistoryFile(filename).iter_chunks(chunksize)
+            return
+        rows = 0
+        try:
+            for chunk in _parse_chunks(filename, chunksize):
+                rows += len(chunk)
+                yield chunk
+        except pd.errors.ParserError:
+            # Rows with a varying number of extra fields; finish with the csv module
+            yield from _parse_ragged_chunks(filename, chunksize, rows)
+
+    def _segments(self, filename):
+        """
+        Get the SegmentedHistory of a directory, sharing the open one for this
+        manager's own history.
+        """
+        if self.history_format == 'segmented' and _same_file(filename, self.filename):
+            return self.log
+        return SegmentedHistory(filename)
+
+    @timed('history_file.tail')
+    def tail(self, count):
+        """
+        Get the last operations of the history.
+
+        In segmented format, only the last segments are read.
+
+        Args:
+            count (int): The number of operations.
+
+        Returns:
+            pd.DataFrame: The last operations of the history.
+        """
+        if self.history_format == 'segmented':
+            return self.log.tail(count)
+        history = self.load_history()
+        return history.iloc[max(0, len(history) - count):]
+
+    @timed('history_file.load_history')
     def load_history(self, filename=None):
         """
         Load the history from a file.
@@ -44,34 +318,12 @@ class ManagerHistory:
         Returns:
             pd.DataFrame: The history of operations.
         """
-        if filename is None:
-            filename = self.filename
-        history_list = []
-        try:
-            with open(filename, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                try:
-                    next(reader)  # Skip header
-                except StopIteration:
-                    # Handle empty file
-                    return pd.DataFrame(columns=['operation', 'operand1', 'operand2', 'result'])
-                for row in reader:
-                    if len(row) >= 4:
-                        try:
-                            history_list.append(History(row[0], float(row[1]),
-                                                        float(row[2]), float(row[3])))
-                        except ValueError:
-                            # Handle rows with invalid data
-                            history_list.append(History(row[0], float(row[1]),
-                                                        float(row[2]), float('nan')))
-                    else:
-                        # Handle rows with missing data
-                        history_list.append(History(row[0], float(row[1]),
-                                                    float(row[2]), float('nan')))
-        except FileNotFoundError:
-            pass
-        return pd.DataFrame([vars(h) for h in history_list])
+        chunks = list(self.iter_history(filename=filename))
+        if not chunks:
+            return pd.DataFrame(columns=HEADER)
+        return pd.concat(chunks, ignore_index=True)
 
+    @timed('history_file.save_history')
     def save_history(self, history_list, filename=None):
         """
         Save the history to a file.
@@ -82,44 +334,118 @@ class ManagerHistory:
         """
         if filename is None:
             filename = self.filename
-        with open(filename, mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.writer(file)
-            writer.writerow(['operation', 'operand1', 'operand2', 'result'])  # Write header
+        if _same_file(filename, self.filename):
+            self.log.close()
+        if self.format_of(filename) in ('binary', 'segmented'):
             if isinstance(history_list, list):
-                for history in history_list:
-                    writer.writerow([history.operation, history.operand1,
-                                     history.operand2, history.result])
+                history_list = pd.DataFrame([history.to_dict() for history in history_list],
+                                            columns=HEADER)
+            if self.format_of(filename) == 'segmented':
+                self._segments(filename).write_chunks([history_list])
             else:
-                for _, row in history_list.iterrows():
-                    writer.writerow([row['operation'], row['operand1'],
-                                     row['operand2'], row['result']])
+                BinaryHistoryFile(filename).write_chunks([history_list])
+            return
+        if isinstance(history_list, list):
+            rows = ((history.operation, history.operand1, history.operand2, history.result)
+                    for history in history_list)
+        else:
+            rows = _frame_rows(history_list)
+        write_csv_history(filename, rows, atomic=self.atomic_writes)
 
+    @timed('history_file.clear_history')
     def clear_history(self):
         """
         Clear the history file.
+
+        In segmented format, only the manifest is rewritten before the segment files
+        are deleted.
         """
-        with open(self.filename, 'w', encoding='utf-8'):
-            pass
+        if self.history_format in ('binary', 'segmented'):
+            self.log.clear()
+            return
+        self.log.close()
+        with locked_file(self.filename) as fd:
+            os.ftruncate(fd, 0)
 
+    @timed('history_file.add_history')
     def add_history(self, history):
         """
-        Add a history record.
+        Add a history record by appending it to the history file.
 
         Args:
             history (History): The history record to add.
         """
-        history_list = self.load_history()
-        new_record = pd.DataFrame([vars(history)])
-        history_list = pd.concat([history_list, new_record], ignore_index=True)
-        self.save_history(history_list)
+        self.log.append([history.operation, history.operand1,
+                         history.operand2, history.result])
+
+    @timed('history_file.add_history_batch')
+    def add_history_batch(self, operation, operands1, operands2, results):
+        """
+        Add a batch of history records in a single append.
 
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            operands1 (np.ndarray): The first operands.
+            operands2 (np.ndarray): The second operands.
+            results (np.ndarray): The results of the operations.
+        """
+        self.log.extend_columns(operation, operands1, operands2, results)
+
+    @timed('history_file.flush')
+    def flush(self):
+        """
+        Write any buffered history records to the history file.
+        """
+        self.log.flush()
+
+    def close(self):
+        """
+        Flush buffered history records and close the history file.
+        """
+        self.log.close()
+
+    @timed('history_file.print_history')
     def print_history(self):
         """
         Print the history to the console.
         """
-        history_list = self.load_history()
-        for _, row in history_list.iterrows():
-            print(f"{row['operation']},{row['operand1']},{row['operand2']},{row['result']}")
+        for chunk in self.iter_history():
+            if not chunk.empty:
+                print("\n".join(f"{operation},{a},{b},{result}"
+                                for operation, a, b, result in _frame_rows(chunk)))
+
+    @timed('history_file.copy_history')
+    def copy_history(self, source, destination, chunksize=CHUNKSIZE):
+        """
+        Copy history from one file to another, one chunk at a time.
+
+        Either file may be in CSV, binary or segmented format. Between segmented
+        histories, sealed segments are hard-linked rather than rewritten.
+
+        Args:
+            source (str): The filename to read the history from.
+            destination (str): The filename to write the history to.
+            chunksize (int, optional): The number of rows copied at a time.
+            Defaults to CHUNKSIZE.
+        """
+        if _same_file(source, destination):
+            return
+        if _same_file(destination, self.filename):
+            self.log.close()
+        if self.format_of(destination) == 'segmented':
+            if is_segmented_history(source):
+                self._segments(destination).link_from(self._segments(source))
+            else:
+                self._segments(destination).write_chunks(
+                    self.iter_history(chunksize, filename=source))
+            return
+        chunks = self.iter_history(chunksize, filename=source)
+        if self.format_of(destination) == 'binary':
+            BinaryHistoryFile(destination).write_chunks(chunks)
+            return
+        rows = itertools.chain.from_iterable(_frame_rows(chunk, chunksize) for chunk in chunks)
+        write_csv_history(destination, rows, atomic=self.atomic_writes)
 
     def save_to(self, filename):
         """
@@ -128,8 +454,7 @@ class ManagerHistory:
         Args:
             filename (str): The filename to save the history to.
         """
-        history_list = self.load_history()
-        self.save_history(history_list, filename)
+        self.copy_history(self.filename, filename)
 
     def load_from(self, filename):
         """
@@ -138,5 +463,21 @@ class ManagerHistory:
         Args:
             filename (str): The filename to load the history from.
         """
-        history_list = self.load_history(filename)
-        self.save_history(history_list)
+        self.copy_history(filename, self.filename)
+
+def convert_history(source, destination, chunksize=CHUNKSIZE):
+    """
+    Convert a history file between the CSV and binary formats.
+
+    The format of the source is detected from its contents and the format of the
+    destination is chosen by its extension.
+
+    Args:
+        source (str): The history file to read.
+        destination (str): The history file to write.
+        chunksize (int, optional): The number of rows converted at a time.
+        Defaults to CHUNKSIZE.
+    """
+    manager = ManagerHistory(destination)
+    manager.copy_history(source, destination, chunksize)
+    manager.close()
@@ -0,0 +1,209 @@
+"""
+This module defines the ObserverDispatcher class, which delivers observer updates
+from a bounded queue on a worker thread so that calculations do not wait for
+observer I/O.
+"""
+
+import collections
+import logging
+import threading
+import numpy as np
+from app.history_store import exact_value, to_float
+
+logger = logging.getLogger('app.observer_dispatch')
+
+POLICIES = ('block', 'drop', 'coalesce')
+
+def _column(value):
+    """
+    Convert a single value to a column, keeping numbers a float64 cannot hold.
+    """
+    if exact_value(value) is not None:
+        return np.array([value], dtype=object)
+    return np.array([to_float(value)])
+
+def _as_batch(event):
+    """
+    Convert a queued event to the columns of a batch.
+    """
+    operation, a, b, result, is_batch = event
+    if not is_batch:
+        return (np.array([operation], dtype=object), _column(a), _column(b), _column(result))
+    if isinstance(operation, str):
+        operation = np.full(len(result), operation, dtype=object)
+    return operation, a, b, result
+
+def coalesce(events):
+    """
+    Merge queued events into a single batch event.
+
+    Args:
+        events (list): The events, in the order they were submitted.
+
+    Returns:
+        tuple: A batch event holding the operations of all events, in order.
+    """
+    columns = zip(*(_as_batch(event) for event in events))
+    operation, a, b, result = (np.concatenate(column) for column in columns)
+    return operation, a, b, result, True
+
+class ObserverDispatcher:
+    """
+    A bounded queue of observer updates drained by a worker thread.
+
+    When the queue is full, `policy` decides what happens to a new update:
+    'block' waits for room, 'drop' discards it and 'coalesce' merges it into the
+    last queued update, so observers receive the operations as one batch. Coalesced
+    updates are collected in a list and only concatenated by the worker thread.
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, deliver, deliver_batch, maxsize=1024, policy='block'):
+        """
+        Initialize the ObserverDispatcher and start its worker thread.
+
+        Args:
+            deliver (callable): Delivers a single update to the observers.
+            deliver_batch (callable): Delivers a batch of updates to the observers.
+            maxsize (int, optional): The maximum number of queued updates. Defaults to 1024.
+            policy (str, optional): 'block', 'drop' or 'coalesce'. Defaults to 'block'.
+
+        Raises:
+            ValueError: If maxsize is not positive or the policy is unknown.
+        """
+        # pylint: disable=too-many-arguments
+        if maxsize < 1:
+            raise ValueError("Observer queue size must be at least 1")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{policy}'")
+        self.deliver = deliver
+        self.deliver_batch = deliver_batch
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._queue = collections.deque()
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='observer-dispatch', daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        """
+        Get the number of queued updates.
+
+        Returns:
+            int: The number of updates waiting to be delivered.
+        """
+        with self._condition:
+            return len(self._queue)
+
+    def submit(self, operation, a, b, result):
+        """
+        Queue a single update.
+
+        Args:
+            operation (str): The operation performed.
+            a (float): The first operand.
+            b (float): The second operand.
+            result (float): The result of the operation.
+        """
+        self._put((operation, a, b, result, False))
+
+    def submit_batch(self, operation, a, b, result):
+        """
+        Queue a batch of updates. The arrays are copied, so the caller may reuse them.
+
+        Args:
+            operation (str or np.ndarray): The operation performed, or one operation
+            name per row.
+            a (np.ndarray): The first operands.
+            b (np.ndarray): The second operands.
+            result (np.ndarray): The results of the operations.
+        """
+        if not isinstance(operation, str):
+            operation = np.array(operation, dtype=object)
+        self._put((operation, np.array(a), np.array(b), np.array(result), True))
+
+    def _put(self, event):
+        """
+        Queue an event, applying the backpressure policy if the queue is full. An
+        event waiting for room when the dispatcher is closed is delivered by the
+        calling thread once the worker has delivered the queued ones.
+
+        Raises:
+            ValueError: If the dispatcher is closed.
+        """
+        with self._condition:
+            if self._closed:
+                raise ValueError("Observer dispatcher is closed")
+            if len(self._queue) >= self.maxsize:
+                if self.policy == 'drop':
+                    self.dropped += 1
+                    return
+                if self.policy == 'coalesce':
+                    if isinstance(self._queue[-1], list):
+                        self._queue[-1].append(event)
+                    else:
+                        self._queue[-1] = [self._queue[-1], event]
+                    return
+                while len(self._queue) >= self.maxsize and not self._closed:
+                    self._condition.wait()
+            if not self._closed:
+                self._queue.append(event)
+                self._condition.notify_all()
+                return
+        # The worker may stop before taking an event queued now, which would be lost
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._deliver(event)
+
+    def _run(self):
+        """
+        Deliver queued events until the dispatcher is closed and the queue is empty.
+        """
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                event = self._queue.popleft()
+                self._busy = True
+                self._condition.notify_all()
+            if isinstance(event, list):
+                event = coalesce(event)
+            self._deliver(event)
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
+
+    def _deliver(self, event):
+        """
+        Deliver an event to the observers, logging any error they raise.
+        """
+        operation, a, b, result, is_batch = event
+        try:
+            if is_batch:
+                self.deliver_batch(operation, a, b, result)
+            else:
+                self.deliver(operation, a, b, result)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Observer failed to handle %s", operation)
+
+    def flush(self):
+        """
+        Wait until every queued update has been delivered.
+        """
+        with self._condition:
+            while self._queue or self._busy:
+                self._condition.wait()
+
+    def close(self):
+        """
+        Deliver the remaining updates and stop the worker thread.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
@@ -3,12 +3,38 @@ This module defines observer classes for logging and auto-saving the history
 of arithmetic operations performed by the Calculator class.
 """
 
+import threading
+import time
 from app.history import History
 
 class LoggingObserver:
     """
     An observer class that logs arithmetic operations.
+
+    In buffered mode, operations are kept unformatted and written with a single
+    write once `flush_lines` are pending, `flush_interval` seconds have passed since
+    the last write, or flush() or close() is called.
     """
+    def __init__(self, buffered=False, stream=None, flush_lines=64, flush_interval=1.0):
+        """
+        Initialize the LoggingObserver.
+
+        Args:
+            buffered (bool, optional): Whether output is buffered. Defaults to False.
+            stream (file, optional): The stream to write to. Defaults to sys.stdout.
+            flush_lines (int, optional): The number of pending lines that triggers a
+            write in buffered mode. Defaults to 64.
+            flush_interval (float, optional): The longest time in seconds lines stay
+            pending while new operations arrive. Defaults to 1.0.
+        """
+        self.buffered = buffered
+        self.stream = stream
+        self.flush_lines = flush_lines
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
     def update(self, operation, operand1, operand2, result):
         """
         Update the observer with the details of an arithmetic operation.
@@ -19,8 +45,57 @@ class LoggingObserver:
             operand2 (float): The second operand.
             result (float): The result of the operation.
         """
-        history = History(operation, operand1, operand2, result)
-        print(f"Logging: {history}")
+        if not self.buffered:
+            self._write(f"Logging: {History(operation, operand1, operand2, result)}")
+            return
+        with self._lock:
+            self._pending.append((operation, operand1, operand2, result))
+            due = (len(self._pending) >= self.flush_lines
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the pending lines of buffered mode.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            self._write('\n'.join(f"Logging: {History(*row)}" for row in pending))
+
+    def _write(self, text):
+        """
+        Print text to the stream of the observer.
+        """
+        if self.stream is None:
+            print(text)
+        else:
+            print(text, file=self.stream)
+
+    def close(self):
+        """
+        Write the pending lines of buffered mode.
+        """
+        self.flush()
+
+    def update_batch(self, operation, operands1, operands2, results):
+        """
+        Update the observer with a batch of arithmetic operations.
+
+        Args:
+            operation (str or np.ndarray): The arithmetic operation performed, or one
+            operation name per row.
+            operands1 (np.ndarray): The first operands.
+            operands2 (np.ndarray): The second operands.
+            results (np.ndarray): The results of the operations.
+        """
+        # pylint: disable=unused-argument
+        label = operation if isinstance(operation, str) else 'mixed'
+        self.flush()
+        self._write(f"Logging: {label} batch of {len(results)} operations")
 
     def notify(self, message):
         """
@@ -57,6 +132,19 @@ class AutoSaveObserver:
         history = History(operation, operand1, operand2, result)
         self.manager_history.add_history(history)
 
+    def update_batch(self, operation, operands1, operands2, results):
+        """
+        Update the observer with a batch of arithmetic operations and save them to the history.
+
+        Args:
+            operation (str or np.ndarray): The arithmetic operation performed, or one
+            operation name per row.
+            operands1 (np.ndarray): The first operands.
+            operands2 (np.ndarray): The second operands.
+            results (np.ndarray): The results of the operations.
+        """
+        self.manager_history.add_history_batch(operation, operands1, operands2, results)
+
     def notify(self, message):
         """
         Notify the observer with a custom message.
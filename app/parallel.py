@@ -0,0 +1,164 @@
+"""
+This module provides the parallel batch engine, which evaluates a large file of
+operations on several cores.
+
+The file is split into shards of whole lines by byte offset. Each shard is read,
+parsed and evaluated in a worker process with the same strategies and plugins as
+the batch mode. The main process writes the results, records the successful
+operations in the history and counts the failed ones in the statistics shard by
+shard, in input order.
+
+Worker processes only pay off on a machine with several cores and for files of
+many shards: on a single core, the parallel engine is slower than the sequential
+batch mode, so `worth_parallel` decides whether to use it.
+"""
+
+import collections
+import concurrent.futures
+import io
+import os
+import numpy as np
+from app import vectorized
+from app.batch import CHUNKSIZE, format_results, iter_chunks, parse_chunk
+from app.calculator import Calculator
+from app.plugins import register_plugins
+from app.strategy_factory import StrategyFactory
+
+SHARD_SIZE = 4 << 20
+# Smaller files are evaluated faster in-process than by starting a pool
+MIN_PARALLEL_SIZE = 4 * SHARD_SIZE
+
+def worth_parallel(filename, workers=None):
+    """
+    Check whether a file is worth evaluating in worker processes.
+
+    Args:
+        filename (str): The file of operations.
+        workers (int, optional): The number of worker processes. Defaults to the
+        number of CPUs.
+
+    Returns:
+        bool: True if more than one worker and CPU are available and the file has at
+        least MIN_PARALLEL_SIZE bytes.
+    """
+    cpus = os.cpu_count() or 1
+    return (min(workers or cpus, cpus) > 1
+            and os.path.getsize(filename) >= MIN_PARALLEL_SIZE)
+
+def shard_file(filename, shard_size=SHARD_SIZE):
+    """
+    Split a file into byte ranges of about `shard_size` bytes that end at line ends.
+
+    Args:
+        filename (str): The file to split.
+        shard_size (int, optional): The target size of a shard in bytes.
+        Defaults to SHARD_SIZE.
+
+    Returns:
+        list: The (start, end) byte offsets of each shard.
+    """
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as file:
+        while bounds[-1] + shard_size < size:
+            file.seek(bounds[-1] + shard_size)
+            file.readline()
+            if file.tell() >= size:
+                break
+            bounds.append(file.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+def _evaluate_lines(lines):
+    """
+    Evaluate a chunk of input lines, returning the output text, the number of
+    failures of each operation and the columns of the successful operations.
+    """
+    operations, a, b, invalid = parse_chunk(lines)
+    batch = vectorized.evaluate_many(operations, a, b, StrategyFactory.create_strategy)
+    valid = ~batch.errors
+    return (format_results(operations, batch, invalid),
+            vectorized.count_by_operation(operations[batch.errors]),
+            (operations[valid], a[valid], b[valid], batch.result[valid]))
+
+def evaluate_shard(filename, start, end, chunksize=CHUNKSIZE):
+    """
+    Evaluate the operations of one shard of a file.
+
+    Args:
+        filename (str): The file of operations.
+        start (int): The offset of the first byte of the shard.
+        end (int): The offset after the last byte of the shard.
+        chunksize (int, optional): The number of lines evaluated at a time.
+        Defaults to CHUNKSIZE.
+
+    Returns:
+        tuple: The output text, the number of operations, the number of failures of
+        each operation, including malformed lines and unsupported operations, and
+        the operations, operands and results of the successful ones.
+    """
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start).decode('utf-8')
+    output = []
+    total = 0
+    failed = collections.Counter()
+    parts = [(np.empty(0, dtype=object), np.empty(0), np.empty(0), np.empty(0))]
+    for lines in iter_chunks(io.StringIO(data), chunksize):
+        text, errors, valid = _evaluate_lines(lines)
+        output.append(text)
+        total += len(lines)
+        failed.update(errors)
+        parts.append(valid)
+    return ''.join(output), total, dict(failed), tuple(np.concatenate(column)
+                                                       for column in zip(*parts))
+
+def run_parallel(filename, outfile, calculator=None, workers=None, shard_size=SHARD_SIZE,
+                 chunksize=CHUNKSIZE):
+    """
+    Evaluate every operation of a file in a pool of worker processes.
+
+    Results are written and successful operations are saved to the calculator, and
+    so to its observers such as an AutoSaveObserver, in input order. Failed
+    operations are counted in the calculator's statistics, as by execute_many.
+
+    Args:
+        filename (str): The file of operations.
+        outfile (file): The output stream for results.
+        calculator (Calculator, optional): The calculator recording the operations.
+        Defaults to a new Calculator.
+        workers (int, optional): The number of worker processes. Defaults to the
+        number of CPUs.
+        shard_size (int, optional): The size of a shard in bytes. Defaults to SHARD_SIZE.
+        chunksize (int, optional): The number of lines evaluated at a time in a worker.
+        Defaults to CHUNKSIZE.
+
+    Returns:
+        tuple: The number of operations processed and the number that failed.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    calculator = calculator or Calculator()
+    workers = workers or os.cpu_count() or 1
+    total = failed = 0
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=register_plugins) as pool:
+        pending = collections.deque()
+        shards = iter(shard_file(filename, shard_size))
+        while True:
+            # Keep a bounded number of shards in flight so results are not buffered
+            # faster than they are written
+            while len(pending) < 2 * workers:
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                pending.append(pool.submit(evaluate_shard, filename, *shard, chunksize))
+            if not pending:
+                break
+            text, count, errors, (operations, a, b, result) = pending.popleft().result()
+            outfile.write(text)
+            total += count
+            failed += sum(errors.values())
+            calculator.record_errors(errors)
+            if len(result):
+                calculator.save_batch(operations, a, b, result)
+    outfile.flush()
+    return total, failed
@@ -1,22 +1,197 @@
 """
-This module provides functionality to load plugins dynamically.
+This module provides functionality to discover and load plugins.
+
+Plugins are the public top-level functions of the modules in a plugin directory.
+They are discovered by parsing the modules rather than importing them, and the
+result is cached in a manifest keyed on each file's modification time and hash,
+so unchanged plugins are not even parsed again. Each plugin is returned as a
+LazyPlugin stub that imports its module only when it is first called.
 """
 
+import ast
+import hashlib
 import importlib
-import pkgutil
+import importlib.util
+import json
+import logging
+import os
+import sys
 
-def load_plugins():
+logger = logging.getLogger('app.plugins')
+
+PLUGINS_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_VERSION = 1
+
+class LazyPlugin:
+    """
+    A stub for a plugin function that imports the plugin module on first call.
+    """
+    def __init__(self, name, module, filename=None):
+        """
+        Initialize the LazyPlugin.
+
+        Args:
+            name (str): The name of the plugin function.
+            module (str): The name of the module defining the function.
+            filename (str, optional): The module file, for plugins outside a package.
+            Defaults to None, which imports the module by name.
+        """
+        self.__name__ = name
+        self.module = module
+        self.filename = filename
+        self._func = None
+
+    def load(self):
+        """
+        Import the plugin module if needed and get the plugin function.
+
+        Returns:
+            callable: The plugin function.
+        """
+        if self._func is None:
+            module = sys.modules.get(self.module)
+            if module is None and self.filename is not None:
+                spec = importlib.util.spec_from_file_location(self.module, self.filename)
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+            elif module is None:
+                module = importlib.import_module(self.module)
+            self._func = getattr(module, self.__name__)
+        return self._func
+
+    @property
+    def loaded(self):
+        """
+        Check whether the plugin module has been imported.
+
+        Returns:
+            bool: True if the plugin function has been loaded.
+        """
+        return self._func is not None
+
+    def __call__(self, a, b):
+        """
+        Call the plugin function, importing it first if needed.
+        """
+        return self.load()(a, b)
+
+    def __repr__(self):
+        """
+        Return a string representation of the LazyPlugin.
+        """
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<LazyPlugin {self.module}.{self.__name__} ({state})>"
+
+def _public_functions(source, filename):
+    """
+    List the public top-level functions defined in a module's source.
+    """
+    tree = ast.parse(source, filename=filename)
+    return [node.name for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and not node.name.startswith('_')]
+
+def _read_manifest(manifest_file):
+    """
+    Read a plugin manifest, returning an empty one if it is missing or invalid.
+    """
+    try:
+        with open(manifest_file, encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('plugins', {})
+
+def _write_manifest(manifest_file, entries):
+    """
+    Write a plugin manifest. Failures, such as a read-only install, are only logged.
     """
-    Load plugins dynamically from the current package.
+    try:
+        os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+        temporary = manifest_file + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump({'version': MANIFEST_VERSION, 'plugins': entries}, file, indent=1)
+        os.replace(temporary, manifest_file)
+    except OSError as e:
+        logger.debug("Could not write plugin manifest %s: %s", manifest_file, e)
+
+def _manifest_entry(path, stat, cached):
+    """
+    Get the manifest entry of a plugin file, reusing the cached entry when the file's
+    modification time or content hash is unchanged.
+    """
+    if cached and cached.get('mtime_ns') == stat.st_mtime_ns and cached.get('size') == stat.st_size:
+        return cached
+    with open(path, 'rb') as file:
+        source = file.read()
+    digest = hashlib.sha256(source).hexdigest()
+    if cached and cached.get('sha256') == digest:
+        functions = cached['functions']
+    else:
+        functions = _public_functions(source, path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest,
+            'functions': functions}
+
+def discover_plugins(directory=PLUGINS_DIR, package=__name__, manifest_file=None):
+    """
+    Discover the plugin functions of a directory without importing any plugin module.
+
+    Args:
+        directory (str, optional): The plugin directory. Defaults to this package.
+        package (str, optional): The package the directory is imported as, or None to
+        load plugin modules from their files. Defaults to this package.
+        manifest_file (str, optional): The manifest cache file. Defaults to
+        'plugins.json' in the directory's __pycache__.
 
     Returns:
-        dict: A dictionary of plugin names and their corresponding callable objects.
+        dict: LazyPlugin stubs keyed by plugin name, in file name order.
     """
+    manifest_file = manifest_file or os.path.join(directory, '__pycache__', 'plugins.json')
+    cached = _read_manifest(manifest_file)
+    entries = {}
     plugins = {}
-    package = __package__
-    for _, name, _ in pkgutil.iter_modules(__path__):
-        module = importlib.import_module(f"{package}.{name}")
-        for attr in dir(module):
-            if callable(getattr(module, attr)):
-                plugins[attr] = getattr(module, attr)
+    with os.scandir(directory) as scan:
+        files = sorted((entry.name, entry) for entry in scan
+                       if entry.is_file() and entry.name.endswith('.py')
+                       and not entry.name.startswith('_'))
+    for name, entry in files:
+        try:
+            entries[name] = _manifest_entry(entry.path, entry.stat(), cached.get(name))
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.warning("Skipping plugin %s: %s", entry.path, e)
+            continue
+        stem = name[:-3]
+        module = f"{package}.{stem}" if package else stem
+        filename = None if package else entry.path
+        for function in entries[name]['functions']:
+            plugins[function] = LazyPlugin(function, module, filename)
+    if entries != cached:
+        _write_manifest(manifest_file, entries)
+    return plugins
+
+def register_plugins():
+    """
+    Register the plugins of the current package as calculator strategies. Operations
+    that already have a strategy keep it.
+
+    Returns:
+        dict: The plugins keyed by name, as returned by load_plugins.
+    """
+    # Imported here so that discovering plugins does not load the strategies
+    from app.strategy_factory import StrategyFactory  # pylint: disable=import-outside-toplevel
+    plugins = load_plugins()
+    for name, plugin in plugins.items():
+        StrategyFactory.register_strategy(name, plugin)
     return plugins
+
+def load_plugins():
+    """
+    Load plugins from the current package.
+
+    Returns:
+        dict: A dictionary of plugin names and their corresponding callable objects.
+        The plugin modules are imported on the first call of each plugin.
+    """
+    return discover_plugins()
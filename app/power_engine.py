@@ -0,0 +1,215 @@
+"""
+This module provides cost-bounded exponentiation and roots for the power and root
+strategies.
+
+Exact integer powers are only computed when their estimated size fits within a
+bit budget, which also bounds their CPU time, and roots of integral numbers are
+computed exactly with an integer Newton iteration under a time budget. Inputs
+that would exceed a budget raise a ValueError instead of stalling the session.
+
+The default budgets can be set with the POWER_MAX_BITS and POWER_TIME_LIMIT
+environment variables.
+"""
+
+import math
+import os
+import time
+
+MAX_BITS = 1 << 20
+TIME_LIMIT = 1.0
+# Significant bits computed for a root that is not an exact integer
+ROOT_PRECISION = 64
+
+class PowerLimits:
+    """
+    The size and time budgets of a power or root computation.
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(self, max_bits=MAX_BITS, time_limit=TIME_LIMIT):
+        """
+        Initialize the PowerLimits.
+
+        Args:
+            max_bits (int, optional): The largest number of bits of an integer operand
+            or result. Defaults to MAX_BITS.
+            time_limit (float, optional): The longest time in seconds an iterative root
+            computation may take. Defaults to TIME_LIMIT.
+        """
+        self.max_bits = max_bits
+        self.time_limit = time_limit
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create PowerLimits from the POWER_MAX_BITS and POWER_TIME_LIMIT environment
+        variables, using the defaults for variables that are not set.
+
+        Returns:
+            PowerLimits: The limits.
+        """
+        return cls(int(os.getenv('POWER_MAX_BITS', str(MAX_BITS))),
+                   float(os.getenv('POWER_TIME_LIMIT', str(TIME_LIMIT))))
+
+    def check_bits(self, bits, what):
+        """
+        Check that a number of bits fits within the size budget.
+
+        Args:
+            bits (float): The estimated number of bits.
+            what (str): A description of the number for the error message.
+
+        Raises:
+            ValueError: If the number has more than `max_bits` bits.
+        """
+        if bits > self.max_bits:
+            raise ValueError(f"{what} would have about {bits:.3g} bits, over the limit of "
+                             f"{self.max_bits} bits")
+
+limits = PowerLimits.from_env()
+
+def _is_integral(value):
+    """
+    Check whether a number is an int or a finite float with an integer value.
+    """
+    if isinstance(value, int):
+        return True
+    return isinstance(value, float) and value.is_integer()
+
+def integer_root(a, n, deadline=None):
+    """
+    Compute the integer nth root of a non-negative integer with Newton's method.
+
+    Args:
+        a (int): The number.
+        n (int): The root, at least 1.
+        deadline (float, optional): The time.perf_counter() value after which the
+        computation is abandoned. Defaults to None for no deadline.
+
+    Returns:
+        int: The largest integer r such that r ** n <= a.
+
+    Raises:
+        ValueError: If the deadline passes.
+    """
+    if a < 2 or n == 1:
+        return a
+    bits = a.bit_length()
+    if n >= bits:
+        return 1
+    root_bits = bits // n + 1
+    if root_bits <= 52:
+        # Start just above the root, from a floating-point estimate
+        x = int(2 ** (math.log2(a) / n) * (1 + 2 ** -30)) + 1
+    else:
+        # Start just above the root, from the root of the top half of its bits, so
+        # only the last Newton steps run at full precision
+        shift = root_bits // 2
+        x = (integer_root(a >> (shift * n), n, deadline) + 1) << shift
+    # From above the root, Newton steps decrease to the integer root, and checking
+    # for it with a power is cheaper than another step's division
+    while x ** n > a:
+        if deadline is not None and time.perf_counter() > deadline:
+            raise ValueError("Root computation exceeded the time limit")
+        x = ((n - 1) * x + a // x ** (n - 1)) // n
+    return x
+
+def bounded_power(a, b, power_limits=None):
+    """
+    Raise a number to a power within the size budget.
+
+    Integer powers are exact when their estimated size fits within the budget.
+    Other powers are computed in floating point.
+
+    Args:
+        a (int or float): The base.
+        b (int or float): The exponent.
+        power_limits (PowerLimits, optional): The budgets. Defaults to the module limits.
+
+    Returns:
+        int or float: The result of the exponentiation.
+
+    Raises:
+        ValueError: If the result would exceed the size budget or the float range, zero
+        is raised to a negative power or a negative number to a fractional power.
+    """
+    power_limits = power_limits or limits
+    if isinstance(a, int) and isinstance(b, int) and b >= 0:
+        if abs(a) > 1:
+            power_limits.check_bits(b * math.log2(abs(a)), f"Result of {a} ** {b}")
+        return a ** b
+    if a == 0 and b < 0:
+        raise ValueError("Cannot raise zero to a negative power")
+    if a < 0 and not _is_integral(b):
+        raise ValueError("Cannot raise a negative number to a fractional power")
+    if isinstance(a, int):
+        power_limits.check_bits(a.bit_length(), "Base")
+    try:
+        return a ** b
+    except OverflowError:
+        raise ValueError("Result of power is too large for a float") from None
+
+def _integral_root(a, n, power_limits):
+    """
+    Compute the nth root of a non-negative integer: exactly if it is an integer,
+    otherwise as a correctly rounded float of a scaled integer root.
+    """
+    power_limits.check_bits(a.bit_length(), "Root operand")
+    deadline = time.perf_counter() + power_limits.time_limit
+    try:
+        root = integer_root(a, n, deadline)
+        if root ** n == a:
+            return root
+        # Scale so that the integer root has ROOT_PRECISION significant bits
+        shift = max(0, -(-(ROOT_PRECISION * n - a.bit_length()) // n))
+        if shift == 0:
+            return float(root)
+        if shift * n > power_limits.max_bits:
+            return 2 ** (math.log2(a) / n)
+        return integer_root(a << (shift * n), n, deadline) / (1 << shift)
+    except OverflowError:
+        raise ValueError("Result of root is too large for a float") from None
+    except ValueError:
+        raise ValueError(f"Root of a {a.bit_length()}-bit number exceeded the time limit of "
+                         f"{power_limits.time_limit:g}s") from None
+
+def bounded_root(a, b, power_limits=None):
+    """
+    Take the root of a number within the size and time budgets.
+
+    Integer roots of integral numbers are computed with an integer Newton iteration,
+    so exact roots are exact. Odd roots of negative numbers are negative.
+
+    Args:
+        a (int or float): The number.
+        b (int or float): The root.
+        power_limits (PowerLimits, optional): The budgets. Defaults to the module limits.
+
+    Returns:
+        int or float: The root, an int if both inputs are ints and the root is exact.
+
+    Raises:
+        ValueError: If the root is zero, the root is not real or a budget is exceeded.
+    """
+    power_limits = power_limits or limits
+    if b == 0:
+        raise ValueError("Cannot take root with zero")
+    if not _is_integral(b):
+        if a < 0:
+            raise ValueError("Cannot take a fractional root of a negative number")
+        return bounded_power(float(a), 1 / b, power_limits)
+    n = int(b)
+    if n < 0:
+        root = bounded_root(a, -n, power_limits)
+        if root == 0:
+            raise ValueError("Cannot take a negative root of zero")
+        return 1 / root
+    if a < 0:
+        if n % 2 == 0:
+            raise ValueError("Cannot take an even root of a negative number")
+        return -bounded_root(-a, n, power_limits)
+    if not _is_integral(a):
+        return bounded_power(float(a), 1 / n, power_limits)
+    root = _integral_root(int(a), n, power_limits)
+    if isinstance(root, int) and not (isinstance(a, int) and isinstance(b, int)):
+        return float(root)
+    return root
@@ -5,11 +5,12 @@ for the Calculator application.
 
 import logging
 import os
-import importlib.util
-import pandas as pd
 from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.instrumentation import instrumentation
 from app.observers import LoggingObserver, AutoSaveObserver
-from app.manager_history import ManagerHistory
+from app.manager_history import ManagerHistory, convert_history
+from app.plugins import register_plugins
 
 logger = logging.getLogger('app.repl')
 
@@ -22,70 +23,124 @@ class REPL:
         """
         Initialize the REPL with calculator and plugin commands.
         """
-        self.calculator = Calculator()
-        self.history_manager = ManagerHistory()
-        self.logging_observer = LoggingObserver()
+        self.calculator = Calculator(CalculatorConfig.from_env())
+        self.history_manager = ManagerHistory(
+            history_format=self.calculator.config.history_format,
+            compression=self.calculator.config.history_compression)
+        # In asynchronous log mode, operation logs are buffered until the command ends
+        self.logging_observer = LoggingObserver(
+            buffered=os.getenv('LOG_MODE', '').lower() == 'async')
         self.auto_save_observer = AutoSaveObserver(self.history_manager)
         self.calculator.add_observer(self.logging_observer)
         self.calculator.add_observer(self.auto_save_observer)
         self.commands = {
             'history': self.show_history,
+            'eval': self.evaluate_expression,
+            'query': self.query_history,
+            'summary': self.show_summary,
             'clear': self.clear_history,
             'save_to': self.save_to,
             'load_from': self.load_from,
+            'convert': self.convert,
+            'cache': self.show_cache,
+            'stats': self.show_stats,
             'menu': self.menu,
             'exit': self.exit
         }
         self.load_plugins()
+        if os.getenv('INSTRUMENTATION', '').lower() in ('1', 'true', 'yes'):
+            instrumentation.enable()
         logger.info("REPL initialized with commands: %s", ", ".join(self.commands.keys()))
 
-        # Load calculator history from file
-        self.calculator.load_history()
+        # Load calculator history from file, deferred so startup does not depend on its size
+        self.calculator.load_history(mode=self.calculator.config.history_loading)
 
     def load_plugins(self):
         """
-        Load plugins from the plugins directory and register their commands.
+        Register the plugins of the plugins directory as strategies and commands.
+
+        Plugins are registered as lazy stubs from the cached plugin manifest, so a
+        plugin module is only imported when its command is first used.
         """
-        plugins_dir = os.path.join(os.path.dirname(__file__), 'plugins')
-        for filename in os.listdir(plugins_dir):
-            if filename.endswith('.py'):
-                plugin_name = filename[:-3]
-                plugin_path = os.path.join(plugins_dir, filename)
-                spec = importlib.util.spec_from_file_location(plugin_name, plugin_path)
-                module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(module)
-                if hasattr(module, plugin_name):
-                    self.commands[plugin_name] = self.create_plugin_command(getattr(module,
-                                                                                    plugin_name))
+        for plugin_name, func in register_plugins().items():
+            self.commands[plugin_name] = self.create_plugin_command(func, plugin_name)
 
-    def create_plugin_command(self, func):
+    def create_plugin_command(self, func, name=None):
         """
         Create a plugin command that takes two numeric inputs and returns the result.
+
+        The operation is executed by the calculator under the plugin name, so it goes
+        through the registered strategy and the result cache.
         """
+        name = name or func.__name__
         def command():
             try:
                 a = float(input("Enter first number: "))
                 b = float(input("Enter second number: "))
-                result = func(a, b)
+                result = self.calculator.execute_operation(name, a, b)
                 print(f"Result: {result}")
-                self.calculator.save_operation(func.__name__, a, b, result)
             except ValueError as e:
                 print(f"Error: {e}")
         return command
 
+    def evaluate_expression(self):
+        """
+        Evaluate an infix expression of numbers, operators and operations.
+        """
+        try:
+            result = self.calculator.evaluate_expression(input("Enter expression: "))
+            print(f"Result: {result}")
+        except ValueError as e:
+            print(f"Error: {e}")
+
     def show_history(self):
         """
         Show the history of operations.
         """
         self.history_manager.print_history()
 
+    def query_history(self):
+        """
+        Show the operations matching an operation name and a result range.
+        """
+        try:
+            operation = input("Enter operation (blank for any): ").strip() or None
+            bounds = input("Enter result range as 'min max' (blank for any): ").split()
+            if bounds and len(bounds) != 2:
+                raise ValueError("Enter two numbers for the result range")
+            result = tuple(float(bound) for bound in bounds) if bounds else None
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        matches = self.calculator.query_history(operation, result)
+        if matches.empty:
+            print("No matching operations")
+            return
+        print("\n".join(f"{operation},{a},{b},{value}" for operation, a, b, value in zip(
+            matches['operation'], matches['operand1'].tolist(), matches['operand2'].tolist(),
+            matches['result'].tolist())))
+
+    def show_summary(self):
+        """
+        Show the running summary statistics of each operation.
+        """
+        summary = self.calculator.get_statistics()
+        if not summary:
+            print("No operations recorded yet")
+            return
+        print(f"{'operation':<12}{'count':>8}{'errors':>8}{'sum':>14}{'mean':>14}"
+              f"{'variance':>14}{'min':>14}{'max':>14}")
+        for operation, stats in summary.items():
+            print(f"{operation:<12}{stats['count']:>8}{stats['errors']:>8}{stats['sum']:>14.6g}"
+                  f"{stats['mean']:>14.6g}{stats['variance']:>14.6g}{stats['min']:>14.6g}"
+                  f"{stats['max']:>14.6g}")
+
     def clear_history(self):
         """
         Clear the history of operations.
         """
         self.history_manager.clear_history()
-        self.calculator.history = pd.DataFrame(columns=['operation', 'operand1',
-                                                        'operand2', 'result'])
+        self.calculator.clear_history()
 
     def save_history(self):
         """
@@ -124,6 +179,45 @@ class REPL:
         self.calculator.history = self.history_manager.load_history()
         print(f"History loaded from {filepath}")
 
+    def convert(self):
+        """
+        Convert a history file between CSV and the binary format.
+        """
+        source = os.path.join('data', input("Enter filename to convert from data folder: "))
+        destination = os.path.join('data', input("Enter filename to convert to "
+                                                 "(.csv for CSV, .bin for binary): "))
+        convert_history(source, destination)
+        print(f"History converted from {source} to {destination}")
+
+    def show_cache(self):
+        """
+        Show the counters of the result cache.
+        """
+        cache = self.calculator.cache
+        if cache is None:
+            print("Result cache is disabled")
+            return
+        stats = cache.stats()
+        print(f"Result cache: {stats.size} results, {stats.memory} bytes, "
+              f"{stats.hits} hits, {stats.misses} misses, {stats.evictions} evictions")
+
+    def show_stats(self):
+        """
+        Show the call counts and latencies of the instrumented code paths.
+        """
+        if not instrumentation.enabled:
+            print("Instrumentation is disabled; set INSTRUMENTATION=true to enable it")
+            return
+        snapshot = instrumentation.snapshot()
+        if not snapshot:
+            print("No calls recorded yet")
+            return
+        print(f"{'name':<36}{'count':>8}{'errors':>8}{'mean us':>10}"
+              f"{'p50 us':>10}{'p99 us':>10}{'max us':>10}")
+        for name, stats in snapshot.items():
+            print(f"{name:<36}{stats['count']:>8}{stats['errors']:>8}{stats['mean_us']:>10.1f}"
+                  f"{stats['p50_us']:>10.1f}{stats['p99_us']:>10.1f}{stats['max_us']:>10.1f}")
+
     def menu(self):
         """
         Display the available commands.
@@ -138,6 +232,9 @@ class REPL:
         Exit the REPL.
         """
         logger.info("Exiting REPL.")
+        self.calculator.close_observers()
+        self.logging_observer.close()
+        self.history_manager.close()
         print("Exiting...")
         raise SystemExit
 
@@ -148,7 +245,10 @@ class REPL:
         while True:
             command = input("Enter command: ").strip().lower()
             if command in self.commands:
+                # Let queued observer updates reach the history before it is used
+                self.calculator.flush_observers()
                 self.commands[command]()
+                self.logging_observer.flush()
             else:
                 print("Unknown command")
 
@@ -0,0 +1,155 @@
+"""
+This module defines the ResultCache class, a bounded LRU cache of operation
+results used by the Calculator class.
+"""
+
+from collections import OrderedDict, namedtuple
+import math
+import struct
+import sys
+import threading
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'evictions', 'size', 'memory'])
+CacheStats.__doc__ = """
+Counters of a ResultCache.
+
+Attributes:
+    hits (int): Lookups answered from the cache.
+    misses (int): Lookups that executed the strategy.
+    evictions (int): Entries removed to respect the size or memory limit.
+    size (int): The number of cached results.
+    memory (int): The estimated memory used by the cached entries, in bytes.
+"""
+
+def _entry_size(a, b, result):
+    """
+    Estimate the memory used by a cache entry, in bytes.
+    """
+    # The key tuples, the operands and the result; the strategy and types are shared
+    return (sys.getsizeof((None,) * 3) + 2 * sys.getsizeof((None,) * 2) + sys.getsizeof(a)
+            + sys.getsizeof(b) + sys.getsizeof(result))
+
+def _operand_key(value):
+    """
+    Get the part of a cache key for an operand: its type and value, with floats and
+    complex numbers as their bit patterns so that 0.0 and -0.0 are kept apart.
+    Returns None for NaN, which is never equal to itself and so never found again.
+    """
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        return type(value), struct.pack('<d', value)
+    if isinstance(value, complex):
+        if math.isnan(value.real) or math.isnan(value.imag):
+            return None
+        return type(value), struct.pack('<dd', value.real, value.imag)
+    return type(value), value
+
+class ResultCache:
+    """
+    A least-recently-used cache of operation results bounded by entry count and memory.
+
+    Results are keyed by the strategy instance and the operands with their types,
+    so 1 and 1.0, or 0.0 and -0.0, are cached separately and replacing a registered
+    strategy never returns results of the old one. Calls that raise or have a NaN
+    operand are never cached.
+
+    The cache may be shared between threads. Strategies run outside its lock, so a
+    result missed by several threads at once may be computed more than once.
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, maxsize=1024, max_memory=1 << 20):
+        """
+        Initialize an empty ResultCache.
+
+        Args:
+            maxsize (int, optional): The maximum number of cached results. Defaults to 1024.
+            max_memory (int, optional): The maximum estimated memory of the cached
+            entries, in bytes. Defaults to 1 MiB.
+
+        Raises:
+            ValueError: If a limit is not positive.
+        """
+        if maxsize < 1 or max_memory < 1:
+            raise ValueError("Result cache limits must be positive")
+        self.maxsize = maxsize
+        self.max_memory = max_memory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Get the number of cached results.
+
+        Returns:
+            int: The number of entries in the cache.
+        """
+        return len(self._entries)
+
+    def execute(self, strategy, a, b):
+        """
+        Execute a strategy, returning a cached result when the same call was seen before.
+
+        Args:
+            strategy (OperationStrategy): The strategy to execute.
+            a: The first operand.
+            b: The second operand.
+
+        Returns:
+            The result of the operation.
+        """
+        a_key, b_key = _operand_key(a), _operand_key(b)
+        if a_key is None or b_key is None:
+            return strategy.execute(a, b)
+        key = (strategy, a_key, b_key)
+        try:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                self.misses += 1
+        except TypeError:
+            # Operands that cannot be hashed are never cached
+            return strategy.execute(a, b)
+        result = strategy.execute(a, b)
+        with self._lock:
+            self._store(key, result, _entry_size(a, b, result))
+        return result
+
+    def _store(self, key, result, size):
+        """
+        Add an entry, evicting the least recently used ones to respect the limits.
+        """
+        if size > self.max_memory or key in self._entries:
+            return
+        self._entries[key] = (result, size)
+        self.memory += size
+        while len(self._entries) > self.maxsize or self.memory > self.max_memory:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.memory -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Remove all cached results. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.memory = 0
+
+    def stats(self):
+        """
+        Get the counters of the cache.
+
+        Returns:
+            CacheStats: The hits, misses, evictions, size and memory of the cache.
+        """
+        with self._lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self._entries),
+                              self.memory)
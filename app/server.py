@@ -0,0 +1,357 @@
+"""
+This module provides the calculation service, an asyncio server that shares one
+warm Calculator and its history between many clients over a Unix socket or a
+localhost TCP port.
+
+Clients send newline-delimited JSON requests and receive one JSON response line
+per request, in order, so requests can be pipelined without waiting for each
+response:
+
+    {"id": 1, "op": "add", "a": 1, "b": 2}              -> {"id": 1, "result": 3.0}
+    {"id": 2, "op": "divide", "a": 1, "b": 0}           -> {"id": 2, "error": "..."}
+    {"id": 3, "op": "add", "a": [1, 2], "b": 3}         -> {"id": 3, "result": [4.0, 5.0],
+                                                            "error": [null, null]}
+    {"id": 4, "op": ["add", "root"], "a": [1, 8], "b": [2, 3]}
+    {"id": 5, "command": "statistics"}                  -> {"id": 5, "statistics": {...}}
+
+Results that are not finite, such as an overflowing sum, are reported as the error
+"Result is not a finite number", since JSON cannot represent them.
+
+Operations queued by all clients are coalesced into batches, each evaluated with
+a single Calculator.execute_many call on a worker thread, so the event loop keeps
+reading requests while a batch runs. Queues are bounded: when the batch queue or
+a connection's queue of unanswered requests is full, the server stops reading
+from that connection until there is room again.
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import logging
+import math
+import os
+import numpy as np
+from app.batch import error_message
+from app.calculator import Calculator
+
+logger = logging.getLogger('app.server')
+
+MAX_BATCH = 65_536
+QUEUE_SIZE = 1024
+MAX_PENDING = 1024
+MAX_LINE = 16 << 20
+
+COMMANDS = ('statistics', 'history_size')
+NOT_FINITE = "Result is not a finite number"
+
+Work = collections.namedtuple('Work', ['request_id', 'single', 'operations', 'a', 'b',
+                                       'future'])
+
+def parse_operations(request):
+    """
+    Get the operations and operands of a request as flat arrays of equal length.
+
+    Args:
+        request (dict): The decoded request, with 'op', 'a' and 'b'.
+
+    Returns:
+        tuple: Whether the request is a single operation, the operations (object
+        array) and the first and second operands (float64 arrays).
+
+    Raises:
+        ValueError: If the operation or operands are missing or malformed, or an
+        operation is not a string.
+    """
+    try:
+        operations = np.asarray(request['op'], dtype=object)
+        a = np.asarray(request['a'], dtype=np.float64)
+        b = np.asarray(request['b'], dtype=np.float64)
+        operations, a, b = np.broadcast_arrays(operations, a, b)
+    except (KeyError, TypeError, ValueError, OverflowError):
+        raise ValueError("Malformed request") from None
+    if not all(isinstance(operation, str) for operation in operations.flat):
+        raise ValueError("Malformed request")
+    single = operations.ndim == 0
+    return single, operations.ravel(), a.ravel(), b.ravel()
+
+def _finite(value):
+    """
+    Replace a NaN or infinite statistic, which JSON cannot represent, with None.
+    """
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+class CalculationServer:
+    """
+    An asyncio server evaluating newline-delimited JSON requests with a shared
+    Calculator.
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, calculator=None, max_batch=MAX_BATCH, queue_size=QUEUE_SIZE,
+                 max_pending=MAX_PENDING, max_line=MAX_LINE):
+        """
+        Initialize the CalculationServer.
+
+        Args:
+            calculator (Calculator, optional): The calculator shared by all clients.
+            Defaults to a new Calculator.
+            max_batch (int, optional): The number of operations after which no more
+            requests are added to a batch. Defaults to MAX_BATCH.
+            queue_size (int, optional): The maximum number of requests waiting for a
+            batch. Defaults to QUEUE_SIZE.
+            max_pending (int, optional): The maximum number of unanswered requests of a
+            connection. Defaults to MAX_PENDING.
+            max_line (int, optional): The maximum length of a request line in bytes.
+            Defaults to MAX_LINE.
+
+        Raises:
+            ValueError: If a limit is not positive.
+        """
+        # pylint: disable=too-many-arguments
+        if min(max_batch, queue_size, max_pending, max_line) < 1:
+            raise ValueError("Server limits must be positive")
+        self.calculator = calculator or Calculator()
+        self.max_batch = max_batch
+        self.queue_size = queue_size
+        self.max_pending = max_pending
+        self.max_line = max_line
+        self.batches = 0
+        self.requests = 0
+        self.path = None
+        self._queue = None
+        self._batcher = None
+        self._executor = None
+        self._server = None
+        self._connections = {}
+
+    @property
+    def address(self):
+        """
+        Get the address the server listens on.
+
+        Returns:
+            str or tuple: The socket path, or the host and port.
+        """
+        if self.path is not None:
+            return self.path
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def start(self, path=None, host='127.0.0.1', port=0):
+        """
+        Start listening on a Unix socket, or on a TCP port if no path is given.
+
+        Args:
+            path (str, optional): The Unix socket path. Defaults to None.
+            host (str, optional): The TCP host. Defaults to '127.0.0.1'.
+            port (int, optional): The TCP port, or 0 for any free port. Defaults to 0.
+
+        Returns:
+            CalculationServer: The started server.
+        """
+        self._queue = asyncio.Queue(self.queue_size)
+        # A single worker keeps batches, and so the history, in arrival order
+        self._executor = concurrent.futures.ThreadPoolExecutor(1, 'calculation-server')
+        self._batcher = asyncio.create_task(self._run_batches())
+        if path is not None:
+            self.path = path
+            self._server = await asyncio.start_unix_server(self._handle, path,
+                                                           limit=self.max_line)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port,
+                                                      limit=self.max_line)
+        logger.info("Calculation server listening on %s", self.address)
+        return self
+
+    async def serve_forever(self):
+        """
+        Serve clients until the server is closed or the task is cancelled.
+        """
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """
+        Stop accepting clients, close the connections, finish the queued batches
+        and release the socket.
+        """
+        if self._server is None:
+            return
+        server, self._server = self._server, None
+        server.close()
+        await server.wait_closed()
+        for writer in self._connections.values():
+            # Ends the request loop of the connection as if the client had closed it
+            writer.transport.close()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._queue.join()
+        self._batcher.cancel()
+        self._executor.shutdown()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def _handle(self, reader, writer):
+        """
+        Read the requests of a connection and queue them, with a separate task
+        writing the responses in order.
+        """
+        pending = asyncio.Queue(self.max_pending)
+        responder = asyncio.create_task(self._respond(pending, writer))
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    await pending.put({'id': None, 'error': "Request line is too long"})
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    await pending.put(await self._submit_safely(line))
+        except ConnectionError:
+            pass
+        finally:
+            await pending.put(None)
+            await responder
+            writer.close()
+            del self._connections[connection]
+
+    async def _respond(self, pending, writer):
+        """
+        Write the response of each request of a connection once it is ready.
+        """
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            if isinstance(item, asyncio.Future):
+                item = await item
+            elif callable(item):
+                item = item()
+            try:
+                writer.write(json.dumps(item).encode('utf-8') + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                return
+
+    async def _submit(self, line):
+        """
+        Decode a request line and queue its operations.
+
+        Returns:
+            asyncio.Future or dict or callable: The future response of queued
+            operations, an immediate response, or a command to run once the previous
+            responses of the connection are written.
+        """
+        self.requests += 1
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+        except (ValueError, AttributeError):
+            return {'id': None, 'error': "Malformed request"}
+        if 'command' in request:
+            return lambda: self._command(request_id, request['command'])
+        try:
+            single, operations, a, b = parse_operations(request)
+        except ValueError as e:
+            return {'id': request_id, 'error': str(e)}
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(Work(request_id, single, operations, a, b, future))
+        return future
+
+    async def _submit_safely(self, line):
+        """
+        Queue a request, answering it with an error if it fails unexpectedly, so one
+        request cannot end the connection and lose the responses of later ones.
+        """
+        try:
+            return await self._submit(line)
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Failed to handle request %r", line[:200])
+            return {'id': None, 'error': "Internal server error"}
+
+    def _command(self, request_id, command):
+        """
+        Run a command on the shared calculator.
+        """
+        if command == 'statistics':
+            statistics = {name: {key: _finite(value) for key, value in stats.items()}
+                          for name, stats in self.calculator.get_statistics().items()}
+            return {'id': request_id, 'statistics': statistics}
+        if command == 'history_size':
+            self.calculator.resolve_history()
+            return {'id': request_id, 'history_size': len(self.calculator.store)}
+        return {'id': request_id, 'error': f"Unknown command '{command}', expected one of "
+                                           f"{', '.join(COMMANDS)}"}
+
+    async def _run_batches(self):
+        """
+        Evaluate the queued requests in batches, one batch at a time.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            work = [await self._queue.get()]
+            size = len(work[0].a)
+            while size < self.max_batch and not self._queue.empty():
+                work.append(self._queue.get_nowait())
+                size += len(work[-1].a)
+            try:
+                batch = await loop.run_in_executor(
+                    self._executor, self.calculator.execute_many,
+                    np.concatenate([item.operations for item in work]),
+                    np.concatenate([item.a for item in work]),
+                    np.concatenate([item.b for item in work]))
+                self.batches += 1
+                start = 0
+                for item in work:
+                    end = start + len(item.a)
+                    item.future.set_result(self._response(item, batch.result[start:end],
+                                                          batch.errors[start:end]))
+                    start = end
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                logger.exception("Batch of %d operations failed", size)
+                for item in work:
+                    item.future.set_result({'id': item.request_id, 'error': str(e)})
+            finally:
+                for _ in work:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _response(work, result, errors):
+        """
+        Build the response of a request from its slice of a batch. Results that are
+        not finite are reported as errors.
+        """
+        if work.single:
+            if errors[0]:
+                return {'id': work.request_id, 'error': error_message(work.operations[0])}
+            if not np.isfinite(result[0]):
+                return {'id': work.request_id, 'error': NOT_FINITE}
+            return {'id': work.request_id, 'result': result[0].item()}
+        values = result.tolist()
+        messages = [None] * len(values)
+        for i in np.flatnonzero(errors | ~np.isfinite(result)).tolist():
+            values[i] = None
+            messages[i] = error_message(work.operations[i]) if errors[i] else NOT_FINITE
+        return {'id': work.request_id, 'result': values, 'error': messages}
+
+async def serve(calculator, path=None, host='127.0.0.1', port=0, **limits):
+    """
+    Run a calculation server until it is cancelled.
+
+    Args:
+        calculator (Calculator): The calculator shared by all clients.
+        path (str, optional): The Unix socket path. Defaults to None for TCP.
+        host (str, optional): The TCP host. Defaults to '127.0.0.1'.
+        port (int, optional): The TCP port. Defaults to 0 for any free port.
+        **limits: The batch and queue limits of CalculationServer.
+    """
+    server = CalculationServer(calculator, **limits)
+    await server.start(path, host, port)
+    print(f"Serving on {server.address}", flush=True)
+    await server.serve_forever()
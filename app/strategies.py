@@ -3,6 +3,7 @@ This module defines strategy classes for different arithmetic operations.
 """
 
 from abc import ABC, abstractmethod
+from app.power_engine import bounded_power, bounded_root
 
 class OperationStrategy(ABC):
     """
@@ -102,9 +103,19 @@ class DivideStrategy(OperationStrategy):
 
 class PowerStrategy(OperationStrategy):
     """
-    Strategy class for exponentiation.
+    Strategy class for exponentiation, bounded by the size budget of PowerLimits.
     """
     # pylint: disable=too-few-public-methods
+    def __init__(self, limits=None):
+        """
+        Initialize the strategy.
+
+        Args:
+            limits (PowerLimits, optional): The budgets. Defaults to None for the
+            limits of the power_engine module.
+        """
+        self.limits = limits
+
     def execute(self, a, b):
         """
         Execute the exponentiation strategy.
@@ -115,14 +126,28 @@ class PowerStrategy(OperationStrategy):
 
         Returns:
             float: The result of the exponentiation.
+
+        Raises:
+            ValueError: If the result is not a real number or exceeds the size budget.
         """
-        return a ** b
+        return bounded_power(a, b, self.limits)
 
 class RootStrategy(OperationStrategy):
     """
-    Strategy class for root calculation.
+    Strategy class for root calculation, exact for integer roots of integral numbers
+    and bounded by the budgets of PowerLimits.
     """
     # pylint: disable=too-few-public-methods
+    def __init__(self, limits=None):
+        """
+        Initialize the strategy.
+
+        Args:
+            limits (PowerLimits, optional): The budgets. Defaults to None for the
+            limits of the power_engine module.
+        """
+        self.limits = limits
+
     def execute(self, a, b):
         """
         Execute the root calculation strategy.
@@ -135,8 +160,34 @@ class RootStrategy(OperationStrategy):
             float: The result of the root calculation.
 
         Raises:
-            ValueError: If the root is zero.
+            ValueError: If the root is zero, the root is not a real number or a budget
+            is exceeded.
         """
-        if b == 0:
-            raise ValueError("Cannot take root with zero")
-        return a ** (1 / b)
+        return bounded_root(a, b, self.limits)
+
+class FunctionStrategy(OperationStrategy):
+    """
+    Strategy class wrapping a plain function of two operands, such as a plugin.
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(self, func):
+        """
+        Initialize the strategy with the function to call.
+
+        Args:
+            func (callable): A function taking two operands and returning the result.
+        """
+        self.func = func
+
+    def execute(self, a, b):
+        """
+        Execute the wrapped function.
+
+        Args:
+            a (float): The first operand.
+            b (float): The second operand.
+
+        Returns:
+            float: The result of the function.
+        """
+        return self.func(a, b)
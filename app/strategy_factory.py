@@ -4,41 +4,91 @@ for creating instances of different arithmetic operation strategies.
 """
 
 from app.strategies import (
-    AddStrategy, SubtractStrategy, MultiplyStrategy,
-    DivideStrategy, PowerStrategy, RootStrategy
+    OperationStrategy, AddStrategy, SubtractStrategy, MultiplyStrategy,
+    DivideStrategy, PowerStrategy, RootStrategy, FunctionStrategy
 )
 
 class StrategyFactory:
     """
     A factory class for creating instances of different arithmetic operation strategies.
+
+    Strategies are stateless, so the factory keeps a registry of shared strategy
+    instances keyed by operation name and dispatches with a single dict lookup.
     """
+    _strategies = {
+        'add': AddStrategy(),
+        'subtract': SubtractStrategy(),
+        'multiply': MultiplyStrategy(),
+        'divide': DivideStrategy(),
+        'power': PowerStrategy(),
+        'root': RootStrategy()
+    }
+    # Incremented on every registry change, so callers can cache resolved strategies
+    _generation = 0
+
     @staticmethod
     def create_strategy(operation):
         """
-        Create an instance of the strategy for the given operation.
+        Get the strategy for the given operation.
 
         Args:
-            operation (str): The operation for which to create a strategy.
+            operation (str): The operation for which to get a strategy.
 
         Returns:
-            OperationStrategy: An instance of the strategy for the given operation.
+            OperationStrategy: The registered strategy for the given operation.
 
         Raises:
             ValueError: If the operation is not supported.
         """
-        if operation == 'add':
-            return AddStrategy()
-        if operation == 'subtract':
-            return SubtractStrategy()
-        if operation == 'multiply':
-            return MultiplyStrategy()
-        if operation == 'divide':
-            return DivideStrategy()
-        if operation == 'power':
-            return PowerStrategy()
-        if operation == 'root':
-            return RootStrategy()
-        raise ValueError(f"Operation '{operation}' is not supported")
+        try:
+            return StrategyFactory._strategies[operation]
+        except KeyError:
+            raise ValueError(f"Operation '{operation}' is not supported") from None
+
+    @staticmethod
+    def register_strategy(operation, strategy, replace=False):
+        """
+        Register a strategy for an operation at runtime.
+
+        Args:
+            operation (str): The name of the operation.
+            strategy (OperationStrategy or callable): The strategy, or a function of two
+            operands that will be wrapped in a FunctionStrategy.
+            replace (bool, optional): Whether to replace an existing registration.
+            Defaults to False.
+
+        Returns:
+            bool: True if the strategy was registered, False if the operation was
+            already registered and replace is False.
+        """
+        if operation in StrategyFactory._strategies and not replace:
+            return False
+        if not isinstance(strategy, OperationStrategy):
+            strategy = FunctionStrategy(strategy)
+        StrategyFactory._strategies[operation] = strategy
+        StrategyFactory._generation += 1
+        return True
+
+    @staticmethod
+    def unregister_strategy(operation):
+        """
+        Remove the strategy registered for an operation.
+
+        Args:
+            operation (str): The name of the operation.
+        """
+        if StrategyFactory._strategies.pop(operation, None) is not None:
+            StrategyFactory._generation += 1
+
+    @staticmethod
+    def generation():
+        """
+        Get a counter that changes whenever a strategy is registered or unregistered.
+
+        Returns:
+            int: The generation of the registry.
+        """
+        return StrategyFactory._generation
 
     @staticmethod
     def supported_operations():
@@ -48,4 +98,4 @@ class StrategyFactory:
         Returns:
             list: A list of supported operations.
         """
-        return ['add', 'subtract', 'multiply', 'divide', 'power', 'root']
+        return list(StrategyFactory._strategies)
@@ -0,0 +1,178 @@
+"""
+This module defines vectorized kernels that evaluate arithmetic operations over
+NumPy arrays, mirroring the strategies defined in app.strategies.
+"""
+
+from collections import namedtuple
+import numpy as np
+from app.history_store import factorize_operations
+
+BatchResult = namedtuple('BatchResult', ['result', 'errors'])
+BatchResult.__doc__ = """
+The outcome of a batch of operations.
+
+Attributes:
+    result (np.ndarray): The float64 results, NaN where the operation failed.
+    errors (np.ndarray): A boolean mask marking the elements that failed.
+"""
+
+def _no_errors(result):
+    """
+    Build an empty error mask for a result array.
+    """
+    return np.zeros(result.shape, dtype=bool)
+
+def add(a, b):
+    """
+    Add two arrays element-wise.
+    """
+    result = np.add(a, b)
+    return BatchResult(result, _no_errors(result))
+
+def subtract(a, b):
+    """
+    Subtract two arrays element-wise.
+    """
+    result = np.subtract(a, b)
+    return BatchResult(result, _no_errors(result))
+
+def multiply(a, b):
+    """
+    Multiply two arrays element-wise.
+    """
+    result = np.multiply(a, b)
+    return BatchResult(result, _no_errors(result))
+
+def divide(a, b):
+    """
+    Divide two arrays element-wise, flagging division by zero.
+    """
+    errors = b == 0
+    result = np.divide(a, b, out=np.full(a.shape, np.nan), where=~errors)
+    return BatchResult(result, errors)
+
+def power(a, b):
+    """
+    Raise an array to a power element-wise, flagging results that are not finite
+    for finite inputs (zero to a negative power, overflow, complex results).
+    """
+    with np.errstate(all='ignore'):
+        result = np.power(a, b)
+    errors = ~np.isfinite(result) & np.isfinite(a) & np.isfinite(b)
+    result[errors] = np.nan
+    return BatchResult(result, errors)
+
+def root(a, b):
+    """
+    Take the root of an array element-wise, flagging roots with zero and results
+    that are not finite for finite inputs.
+
+    Like RootStrategy, odd roots of negative numbers are negative, and integer
+    roots that are exact integers are returned exactly.
+    """
+    zero_root = b == 0
+    odd = np.mod(b, 2) == 1
+    with np.errstate(all='ignore'):
+        result = np.power(np.abs(a), np.divide(1, b, out=np.full(b.shape, np.nan),
+                                               where=~zero_root))
+        # Snap results that are off by rounding from an exact integer root
+        nearest = np.round(result)
+        exact = (b > 0) & (np.mod(b, 1) == 0) & (np.power(nearest, b) == np.abs(a))
+        result = np.where(exact, nearest, result)
+        result = np.where(a < 0, np.where(odd, -result, np.nan), result)
+    errors = zero_root | (~np.isfinite(result) & np.isfinite(a) & np.isfinite(b))
+    result[errors] = np.nan
+    return BatchResult(result, errors)
+
+KERNELS = {
+    'add': add,
+    'subtract': subtract,
+    'multiply': multiply,
+    'divide': divide,
+    'power': power,
+    'root': root
+}
+
+def as_operands(a, b):
+    """
+    Convert two operand sequences to flat float64 arrays of the same length.
+
+    Args:
+        a (array_like): The first operands.
+        b (array_like): The second operands.
+
+    Returns:
+        tuple: The two operand arrays, broadcast against each other.
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    return a.ravel(), b.ravel()
+
+def evaluate(operation, strategy, a, b):
+    """
+    Evaluate an operation over operand arrays.
+
+    Operations with a vectorized kernel run as NumPy ufuncs. Any other operation
+    falls back to calling the strategy element by element.
+
+    Args:
+        operation (str): The operation to perform.
+        strategy (OperationStrategy): The strategy for the operation.
+        a (np.ndarray): The first operands.
+        b (np.ndarray): The second operands.
+
+    Returns:
+        BatchResult: The results and the error mask.
+    """
+    kernel = KERNELS.get(operation)
+    if kernel is not None:
+        return kernel(a, b)
+    result = np.full(a.shape, np.nan)
+    errors = np.zeros(a.shape, dtype=bool)
+    for i, (x, y) in enumerate(zip(a.tolist(), b.tolist())):
+        try:
+            result[i] = strategy.execute(x, y)
+        except (ValueError, ArithmeticError, TypeError):
+            errors[i] = True
+    return BatchResult(result, errors)
+
+def evaluate_many(operations, a, b, create_strategy):
+    """
+    Evaluate a mix of operations, one per element, grouping elements by operation
+    so that each group is evaluated with a single call.
+
+    Args:
+        operations (np.ndarray): The operation name of each element.
+        a (np.ndarray): The first operands.
+        b (np.ndarray): The second operands.
+        create_strategy (callable): Returns the strategy for an operation, or raises
+        ValueError if the operation is not supported.
+
+    Returns:
+        BatchResult: The results and the error mask. Unsupported operations are errors.
+    """
+    result = np.full(a.shape, np.nan)
+    errors = np.ones(a.shape, dtype=bool)
+    names, codes = factorize_operations(operations, len(operations))
+    for code, operation in enumerate(names):
+        try:
+            strategy = create_strategy(operation)
+        except ValueError:
+            continue
+        rows = codes == code
+        batch = evaluate(operation, strategy, a[rows], b[rows])
+        result[rows] = batch.result
+        errors[rows] = batch.errors
+    return BatchResult(result, errors)
+
+def count_by_operation(operations):
+    """
+    Count the elements of each operation.
+
+    Args:
+        operations (np.ndarray): The operation name of each element.
+
+    Returns:
+        dict: The number of elements of each operation name.
+    """
+    names, counts = np.unique(operations, return_counts=True)
+    return dict(zip(names.tolist(), counts.tolist()))
@@ -0,0 +1,4 @@
+"""
+Benchmarks for the calculator application. Run a benchmark module with
+`python -m benchmarks.<module>` from the repository root.
+"""
@@ -0,0 +1,97 @@
+"""
+Size and throughput benchmark for compressed history files.
+
+Writes a history of random operations as plain CSV and with each supported
+compression, then reports the file size, the whole-file write throughput, the
+append throughput of buffered single-row appends and the time to load the file
+into a HistoryStore.
+
+Usage:
+    python -m benchmarks.bench_compression [--rows N] [--appends N]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.history_compression import EXTENSIONS
+from app.history_loader import read_history_store
+from app.history_log import HistoryLog
+from app.manager_history import write_csv_history
+
+OPERATIONS = ['add', 'subtract', 'multiply', 'divide', 'power', 'root']
+
+def make_rows(count, seed=0):
+    """
+    Generate rows of random operations.
+
+    Args:
+        count (int): The number of rows.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        list: The operation, operands and result of each row.
+    """
+    rng = np.random.default_rng(seed)
+    operations = np.array(OPERATIONS)[rng.integers(0, len(OPERATIONS), count)].tolist()
+    a = rng.uniform(0, 100, count).round(3).tolist()
+    b = rng.uniform(0, 5, count).round(3).tolist()
+    result = rng.uniform(0, 1000, count).tolist()
+    return list(zip(operations, a, b, result))
+
+def bench_file(filename, rows, appends):
+    """
+    Time writing, appending to and loading one history file.
+
+    Returns:
+        dict: The file size in bytes, the write and append throughput in rows per
+        second and the load time in seconds.
+    """
+    start = time.perf_counter()
+    write_csv_history(filename, rows)
+    write = len(rows) / (time.perf_counter() - start)
+    size = os.path.getsize(filename)
+    start = time.perf_counter()
+    store = read_history_store(filename)
+    load = time.perf_counter() - start
+    if len(store) != len(rows):
+        raise AssertionError(f"{filename}: loaded {len(store)} rows, expected {len(rows)}")
+    log = HistoryLog(filename)
+    start = time.perf_counter()
+    for row in rows[:appends]:
+        log.append(row)
+    log.close()
+    append = appends / (time.perf_counter() - start)
+    return {'size': size, 'write': write, 'append': append, 'load': load}
+
+def main():
+    """
+    Run the benchmark and print a table of results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000,
+                        help='rows in the history (default: 1000000)')
+    parser.add_argument('--appends', type=int, default=100_000,
+                        help='rows appended one at a time (default: 100000)')
+    args = parser.parse_args()
+    rows = make_rows(args.rows)
+    appends = min(args.appends, args.rows)
+    print(f"{'format':<8}{'MB':>10}{'ratio':>8}{'write rows/s':>15}{'append rows/s':>15}"
+          f"{'load s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        # Load a small file first, so pandas is imported before any timing
+        warmup = os.path.join(directory, 'warmup.csv')
+        write_csv_history(warmup, rows[:10])
+        read_history_store(warmup)
+        baseline = None
+        for name, extension in [('csv', '')] + list(EXTENSIONS.items()):
+            results = bench_file(os.path.join(directory, 'history.csv' + extension), rows,
+                                 appends)
+            baseline = baseline or results['size']
+            print(f"{name:<8}{results['size'] / 1e6:>10.2f}{baseline / results['size']:>7.1f}x"
+                  f"{results['write']:>15,.0f}{results['append']:>15,.0f}{results['load']:>9.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Stress benchmark for concurrent sessions sharing a calculator and a history file.
+
+Runs operations from 1 to N threads on a shared Calculator whose operations are
+saved to a CSV history file by an AutoSaveObserver, then from 1 to N processes
+that each append to the same history file, reporting the throughput and the
+number of group commits. After each run the history file is checked to hold
+exactly one row per operation, so lost or interleaved appends fail the run.
+
+Usage:
+    python -m benchmarks.bench_concurrency [--operations N] [--threads N ...]
+                                           [--processes N ...] [--durable]
+"""
+
+import argparse
+import concurrent.futures
+import os
+import tempfile
+import threading
+import time
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.manager_history import ManagerHistory
+from app.observers import AutoSaveObserver
+
+OPERATIONS = ['add', 'subtract', 'multiply', 'divide']
+
+def run_session(calculator, first, count):
+    """
+    Execute a range of operations on a calculator.
+
+    Args:
+        calculator (Calculator): The calculator to use.
+        first (int): The index of the first operation.
+        count (int): The number of operations.
+    """
+    for i in range(first, first + count):
+        calculator.execute_operation(OPERATIONS[i % len(OPERATIONS)], i, 1 + i % 7)
+
+def run_process(filename, first, count, durable):
+    """
+    Execute a range of operations in a worker process with its own calculator,
+    appending them to a shared history file.
+
+    Returns:
+        int: The number of group commits of the process.
+    """
+    manager = ManagerHistory(filename)
+    manager.log.durable = durable
+    calculator = Calculator(CalculatorConfig(history_enabled=False))
+    calculator.add_observer(AutoSaveObserver(manager))
+    run_session(calculator, first, count)
+    manager.close()
+    return manager.log.commits
+
+def check_rows(filename, expected):
+    """
+    Check that a history file holds one row per operation.
+
+    Raises:
+        AssertionError: If rows were lost or duplicated.
+    """
+    history = ManagerHistory(filename).load_history()
+    if len(history) != expected or history['operand1'].nunique() != expected:
+        raise AssertionError(f"{filename}: expected {expected} rows, found {len(history)}")
+
+def bench_threads(directory, operations, threads, durable):
+    """
+    Time a shared calculator used from several threads.
+
+    Returns:
+        tuple: The operations per second and the number of group commits.
+    """
+    filename = os.path.join(directory, f'threads-{threads}.csv')
+    manager = ManagerHistory(filename)
+    manager.log.durable = durable
+    calculator = Calculator(CalculatorConfig(history_enabled=True))
+    calculator.add_observer(AutoSaveObserver(manager))
+    share = operations // threads
+    workers = [threading.Thread(target=run_session, args=(calculator, i * share, share))
+               for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    manager.close()
+    elapsed = time.perf_counter() - start
+    if len(calculator.store) != share * threads:
+        raise AssertionError(f"Calculator recorded {len(calculator.store)} operations, "
+                             f"expected {share * threads}")
+    check_rows(filename, share * threads)
+    return share * threads / elapsed, manager.log.commits
+
+def bench_processes(directory, operations, processes, durable):
+    """
+    Time several processes appending to the same history file.
+
+    Returns:
+        tuple: The operations per second and the number of group commits.
+    """
+    filename = os.path.join(directory, f'processes-{processes}.csv')
+    share = operations // processes
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        commits = sum(pool.map(run_process, [filename] * processes,
+                               [i * share for i in range(processes)],
+                               [share] * processes, [durable] * processes))
+    elapsed = time.perf_counter() - start
+    check_rows(filename, share * processes)
+    return share * processes / elapsed, commits
+
+def main():
+    """
+    Run the benchmark and print a table of results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--operations', type=int, default=200_000,
+                        help='operations per run (default: 200000)')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='thread counts (default: 1 2 4 8)')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4],
+                        help='process counts (default: 1 2 4)')
+    parser.add_argument('--durable', action='store_true',
+                        help='sync each group commit to disk')
+    args = parser.parse_args()
+    print(f"{'sessions':<14}{'ops/s':>14}{'commits':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in args.threads:
+            throughput, commits = bench_threads(directory, args.operations, threads,
+                                                args.durable)
+            print(f"{f'{threads} threads':<14}{throughput:>14,.0f}{commits:>10}")
+        for processes in args.processes:
+            throughput, commits = bench_processes(directory, args.operations, processes,
+                                                  args.durable)
+            print(f"{f'{processes} processes':<14}{throughput:>14,.0f}{commits:>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Benchmark suite for the calculator, history and I/O hot paths.
+
+For each history size, times Calculator.execute_operation and save_operation
+against a calculator already holding that many operations, ManagerHistory.add_history
+against a file of that size, and load_history, save_history and print_history of
+the whole file. Reports throughput, p50/p99 latency and peak traced memory, and can
+save the results as JSON and compare them with an earlier run.
+
+Usage:
+    python -m benchmarks.bench_history [--sizes N ...] [--calls N] [--repeat N]
+                                       [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from app.calculator import Calculator
+from app.history import History
+from app.manager_history import ManagerHistory
+
+SIZES = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+OPERATIONS = ['add', 'subtract', 'multiply', 'divide', 'power', 'root']
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_history(size, seed=0):
+    """
+    Build random operation columns for a history of a given size.
+
+    Args:
+        size (int): The number of operations.
+        seed (int, optional): The random seed. Defaults to 0.
+
+    Returns:
+        tuple: The operations, first operands, second operands and results.
+    """
+    rng = np.random.default_rng(seed)
+    operations = np.array(OPERATIONS, dtype=object)[rng.integers(0, 4, size)]
+    a = rng.uniform(1, 100, size).round(3)
+    b = rng.uniform(1, 100, size).round(3)
+    return operations, a, b, a + b
+
+def summarize(samples, rows=1):
+    """
+    Summarize timing samples.
+
+    Args:
+        samples (list): Durations in seconds.
+        rows (int, optional): The number of rows handled per sample. Defaults to 1.
+
+    Returns:
+        dict: The throughput in rows per second and the p50 and p99 latencies in
+        microseconds.
+    """
+    samples = np.asarray(samples)
+    return {
+        'samples': len(samples),
+        'throughput': rows * len(samples) / samples.sum() if samples.sum() else float('inf'),
+        'p50_us': float(np.percentile(samples, 50) * 1e6),
+        'p99_us': float(np.percentile(samples, 99) * 1e6)
+    }
+
+def peak_memory(func):
+    """
+    Run a function under tracemalloc.
+
+    Args:
+        func (callable): The function to run.
+
+    Returns:
+        int: The peak traced memory in bytes.
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def time_calls(call, count):
+    """
+    Time a number of calls one by one.
+
+    Args:
+        call (callable): Called with the index of the call.
+        count (int): The number of calls.
+
+    Returns:
+        list: The duration of each call in seconds.
+    """
+    samples = []
+    clock = time.perf_counter
+    for i in range(count):
+        start = clock()
+        call(i)
+        samples.append(clock() - start)
+    return samples
+
+def bench_calculator(size, calls):
+    """
+    Time execute_operation and save_operation on a calculator holding `size` operations.
+
+    Returns:
+        dict: The results keyed by benchmark name.
+    """
+    columns = make_history(size)
+    calculator = Calculator()
+    calculator.store.extend(*columns)
+    operands = columns[1].tolist()
+    results = {}
+    for name, call in (
+            ('execute_operation',
+             lambda i: calculator.execute_operation('add', operands[i % size], 2.0)),
+            ('save_operation',
+             lambda i: calculator.save_operation('add', operands[i % size], 2.0, 3.0))):
+        results[name] = summarize(time_calls(call, calls))
+        results[name]['peak_bytes'] = peak_memory(lambda call=call: time_calls(call, calls))
+    return results
+
+def bench_manager(size, calls, repeat, directory):
+    """
+    Time ManagerHistory.add_history, load_history, save_history and print_history
+    on a CSV history file of `size` rows.
+
+    Returns:
+        dict: The results keyed by benchmark name.
+    """
+    # pylint: disable=too-many-locals
+    filename = os.path.join(directory, f'history_{size}.csv')
+    manager = ManagerHistory(filename, flush_rows=64)
+    operations, a, b, result = make_history(size)
+    manager.add_history_batch(operations, a, b, result)
+    manager.close()
+    frame = manager.load_history()
+    records = [History('add', float(i), 2.0, i + 2.0) for i in range(calls)]
+    results = {}
+
+    def add_history():
+        samples = time_calls(lambda i: manager.add_history(records[i]), calls)
+        manager.close()
+        return samples
+
+    def print_history():
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            with contextlib.redirect_stdout(devnull):
+                manager.print_history()
+
+    output = os.path.join(directory, f'saved_{size}.csv')
+    benchmarks = {
+        'load_history': manager.load_history,
+        'save_history': lambda: manager.save_history(frame, output),
+        'print_history': print_history
+    }
+    for name, func in benchmarks.items():
+        results[name] = summarize(time_calls(lambda _, func=func: func(), repeat), size)
+        results[name]['peak_bytes'] = peak_memory(func)
+    results['add_history'] = summarize(add_history())
+    results['add_history']['peak_bytes'] = peak_memory(add_history)
+    return results
+
+def run_suite(sizes, calls, repeat):
+    """
+    Run every benchmark for every history size.
+
+    Args:
+        sizes (list): The history sizes.
+        calls (int): The number of timed calls for per-call benchmarks.
+        repeat (int): The number of timed runs for whole-history benchmarks.
+
+    Returns:
+        dict: The results keyed by size, then by benchmark name.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            results[str(size)] = {**bench_calculator(size, calls),
+                                  **bench_manager(size, calls, repeat, directory)}
+            print_results({str(size): results[str(size)]})
+    return results
+
+def metadata():
+    """
+    Describe the environment of a benchmark run.
+
+    Returns:
+        dict: The time, Python version, platform and git commit of the run.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'commit': commit
+    }
+
+def print_results(results, baseline=None):
+    """
+    Print a table of results, with the throughput ratio to a baseline run if given.
+
+    Args:
+        results (dict): The results keyed by size, then by benchmark name.
+        baseline (dict, optional): The results of an earlier run. Defaults to None.
+    """
+    for size, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            line = (f"{size:>9} {name:<18}{stats['throughput']:>14,.0f} rows/s"
+                    f"{stats['p50_us']:>12,.1f} us p50{stats['p99_us']:>12,.1f} us p99"
+                    f"{stats['peak_bytes'] / 2**20:>10,.2f} MiB")
+            old = (baseline or {}).get(size, {}).get(name)
+            if old:
+                line += f"{stats['throughput'] / old['throughput']:>8.2f}x"
+            print(line)
+
+def main():
+    """
+    Run the benchmark suite, print the results and optionally save them as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='history sizes (default: 10 to 1000000)')
+    parser.add_argument('--calls', type=int, default=1_000,
+                        help='timed calls per-call benchmark (default: 1000)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='timed runs per whole-history benchmark (default: 3)')
+    parser.add_argument('--output', metavar='FILE', help='save the results as JSON')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='print throughput ratios against an earlier JSON run')
+    args = parser.parse_args()
+    results = run_suite(args.sizes, args.calls, args.repeat)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        print(f"\nCompared with {args.compare}:")
+        print_results(results, baseline)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({'metadata': metadata(), 'results': results}, file, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Latency benchmark for the calculation path with logging off, synchronous and
+asynchronous.
+
+Each operation is executed on a calculator with a LoggingObserver and logs one
+DEBUG record to the `app` logger, configured like logging.conf with a console
+handler (writing to the null device) and a file handler. The synchronous mode
+formats and writes everything on the calling thread; the asynchronous mode uses
+AsyncLogging and a buffered LoggingObserver. The benchmark reports throughput and
+p50/p99 latency per operation.
+
+Usage:
+    python -m benchmarks.bench_logging [--operations N] [--rate-limit N]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+from app.async_logging import AsyncLogging
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.observers import LoggingObserver
+
+OPERATIONS = ['add', 'subtract', 'multiply', 'divide']
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+def configure_handlers(target, log_file, devnull):
+    """
+    Give a logger the console and file handlers of logging.conf.
+
+    Returns:
+        list: The handlers added.
+    """
+    handlers = [logging.StreamHandler(devnull), logging.FileHandler(log_file)]
+    for handler in handlers:
+        handler.setLevel(logging.DEBUG)
+        handler.setFormatter(logging.Formatter(FORMAT))
+        target.addHandler(handler)
+    return handlers
+
+def run_operations(calculator, operations):
+    """
+    Execute operations, logging each one, and return the latency of each in seconds.
+    """
+    bench_logger = logging.getLogger('app.bench')
+    latencies = np.empty(operations)
+    for i in range(operations):
+        operation = OPERATIONS[i % len(OPERATIONS)]
+        start = time.perf_counter()
+        result = calculator.execute_operation(operation, i, 1 + i % 7)
+        bench_logger.debug("Executed %s(%s, %s) = %s", operation, i, 1 + i % 7, result)
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+def bench_mode(mode, operations, directory, devnull, rate_limit):
+    """
+    Time the operations with logging off, 'sync' or 'async'.
+
+    Returns:
+        np.ndarray: The latency of each operation in seconds.
+    """
+    # pylint: disable=too-many-arguments
+    target = logging.getLogger('app')
+    saved = target.level, target.propagate, target.handlers[:]
+    for handler in saved[2]:
+        target.removeHandler(handler)
+    target.propagate = False
+    calculator = Calculator(CalculatorConfig(history_enabled=False))
+    handlers = []
+    async_logging = None
+    observer = None
+    if mode == 'off':
+        target.setLevel(logging.WARNING)
+    else:
+        target.setLevel(logging.DEBUG)
+        handlers = configure_handlers(target, os.path.join(directory, f'{mode}.log'), devnull)
+        observer = LoggingObserver(buffered=mode == 'async', stream=devnull)
+        calculator.add_observer(observer)
+        if mode == 'async':
+            async_logging = AsyncLogging(rate_limit=rate_limit)
+            async_logging.start()
+    try:
+        return run_operations(calculator, operations)
+    finally:
+        if async_logging is not None:
+            async_logging.stop()
+        if observer is not None:
+            observer.close()
+        for handler in handlers:
+            target.removeHandler(handler)
+            handler.close()
+        target.setLevel(saved[0])
+        target.propagate = saved[1]
+        for handler in saved[2]:
+            target.addHandler(handler)
+
+def main():
+    """
+    Run the benchmark and print a table of results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--operations', type=int, default=100_000,
+                        help='operations per mode (default: 100000)')
+    parser.add_argument('--rate-limit', type=float, default=0,
+                        help='records per second per logger in async mode, 0 for no '
+                             'limit (default: 0)')
+    args = parser.parse_args()
+    print(f"{'logging':<10}{'ops/s':>12}{'p50 us':>10}{'p99 us':>10}")
+    with tempfile.TemporaryDirectory() as directory, \
+            open(os.devnull, 'w', encoding='utf-8') as devnull:
+        for mode in ('off', 'sync', 'async'):
+            latencies = bench_mode(mode, args.operations, directory, devnull, args.rate_limit)
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1e6
+            print(f"{mode:<10}{len(latencies) / latencies.sum():>12,.0f}{p50:>10.1f}{p99:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Scaling benchmark for the parallel batch engine.
+
+Generates a file of random operations and evaluates it with the sequential batch
+mode and with the parallel engine on 1 to N worker processes, reporting the
+throughput and the speedup over the sequential run.
+
+Usage:
+    python -m benchmarks.bench_parallel [--lines N] [--workers N ...] [--shard-size BYTES]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from app.batch import run_batch
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.parallel import SHARD_SIZE, run_parallel
+
+OPERATIONS = ['add', 'subtract', 'multiply', 'divide', 'power', 'root']
+
+def write_operations(filename, lines, seed=0):
+    """
+    Write a file of random operations.
+
+    Args:
+        filename (str): The file to write.
+        lines (int): The number of operations.
+        seed (int, optional): The random seed. Defaults to 0.
+    """
+    rng = np.random.default_rng(seed)
+    operations = np.array(OPERATIONS)[rng.integers(0, len(OPERATIONS), lines)]
+    a = rng.uniform(0, 100, lines).round(3)
+    b = rng.uniform(0, 5, lines).round(3)
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write('\n'.join(f"{op} {x} {y}" for op, x, y in zip(operations, a, b)) + '\n')
+
+def timed_run(func):
+    """
+    Run a function with its output discarded and return the elapsed seconds.
+    """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        start = time.perf_counter()
+        func(devnull)
+        return time.perf_counter() - start
+
+def bench_scaling(filename, lines, workers, shard_size):
+    """
+    Time the sequential batch mode and the parallel engine for each worker count.
+
+    Args:
+        filename (str): The file of operations.
+        lines (int): The number of operations in the file.
+        workers (list): The worker counts to time.
+        shard_size (int): The size of a shard in bytes.
+
+    Returns:
+        dict: Operations per second keyed by 'sequential' and by worker count.
+    """
+    def sequential(outfile):
+        with open(filename, encoding='utf-8') as infile:
+            run_batch(infile, outfile, Calculator(CalculatorConfig(history_enabled=False)))
+
+    results = {'sequential': lines / timed_run(sequential)}
+    for count in workers:
+        elapsed = timed_run(lambda outfile, count=count: run_parallel(
+            filename, outfile, Calculator(CalculatorConfig(history_enabled=False)),
+            workers=count, shard_size=shard_size))
+        results[count] = lines / elapsed
+    return results
+
+def main():
+    """
+    Run the benchmark and print a table of results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=2_000_000,
+                        help='operations in the generated file (default: 2000000)')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='worker counts (default: powers of two up to the CPU count)')
+    parser.add_argument('--shard-size', type=int, default=SHARD_SIZE,
+                        help=f'bytes per worker task (default: {SHARD_SIZE})')
+    args = parser.parse_args()
+    cpus = os.cpu_count() or 1
+    workers = args.workers or sorted({2 ** i for i in range(cpus.bit_length())} | {cpus})
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'operations.txt')
+        write_operations(filename, args.lines)
+        results = bench_scaling(filename, args.lines, workers, args.shard_size)
+    baseline = results['sequential']
+    print(f"{'workers':<12}{'ops/s':>14}{'speedup':>10}")
+    for name, throughput in results.items():
+        print(f"{name:<12}{throughput:>14,.0f}{throughput / baseline:>9.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Startup benchmark for the application's entry points.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for each
+entry point and reports the cumulative import time of the module, the wall-clock
+time of the interpreter and whether pandas and numpy were imported.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat N] [module ...]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ENTRY_POINTS = ['app', 'app.strategies', 'app.strategy_factory', 'app.plugins',
+                'app.calculator', 'app.manager_history', 'app.repl']
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure_import(module):
+    """
+    Import a module in a fresh interpreter with -X importtime.
+
+    Args:
+        module (str): The module to import.
+
+    Returns:
+        dict: The cumulative import time of the module in microseconds, the wall-clock
+        time in seconds and which heavy dependencies were imported.
+    """
+    code = f"import {module}"
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                               cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        cumulative[name] = int(cumulative_us)
+    return {
+        'import_us': cumulative.get(module, 0),
+        'wall_s': wall,
+        'pandas': 'pandas' in cumulative,
+        'numpy': 'numpy' in cumulative
+    }
+
+def main():
+    """
+    Run the benchmark and print a table of results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=ENTRY_POINTS,
+                        help='modules to import (default: the main entry points)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per module; the fastest is reported (default: 5)')
+    args = parser.parse_args()
+    print(f"{'module':<24}{'import ms':>12}{'wall ms':>10}{'pandas':>8}{'numpy':>8}")
+    for module in args.modules:
+        runs = [measure_import(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run['import_us'])
+        print(f"{module:<24}{best['import_us'] / 1000:>12.1f}"
+              f"{min(run['wall_s'] for run in runs) * 1000:>10.1f}"
+              f"{'yes' if best['pandas'] else 'no':>8}{'yes' if best['numpy'] else 'no':>8}")
+
+if __name__ == '__main__':
+    main()
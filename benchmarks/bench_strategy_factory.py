@@ -0,0 +1,50 @@
+"""
+Microbenchmark for StrategyFactory dispatch.
+
+Measures the cost of looking up a strategy and of a full lookup-and-execute
+for every registered operation.
+
+Usage:
+    python -m benchmarks.bench_strategy_factory [--number N]
+"""
+
+import argparse
+import timeit
+from app.strategy_factory import StrategyFactory
+
+def bench_dispatch(number):
+    """
+    Time strategy lookup and execution for every supported operation.
+
+    Args:
+        number (int): The number of calls to time per operation.
+
+    Returns:
+        dict: Nanoseconds per call for each operation, for lookup and for lookup plus execute.
+    """
+    results = {}
+    create = StrategyFactory.create_strategy
+    for operation in StrategyFactory.supported_operations():
+        lookup = timeit.timeit(lambda op=operation: create(op), number=number)
+        execute = timeit.timeit(lambda op=operation: create(op).execute(6.0, 3.0), number=number)
+        results[operation] = {
+            'lookup_ns': lookup / number * 1e9,
+            'lookup_execute_ns': execute / number * 1e9
+        }
+    return results
+
+def main():
+    """
+    Run the benchmark and print a table of results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=1_000_000,
+                        help='calls per operation (default: 1000000)')
+    args = parser.parse_args()
+    print(f"{'operation':<12}{'lookup ns':>12}{'lookup+execute ns':>20}")
+    for operation, timing in bench_dispatch(args.number).items():
+        print(f"{operation:<12}{timing['lookup_ns']:>12.1f}{timing['lookup_execute_ns']:>20.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -3,25 +3,141 @@ import warnings
 # Suppress the specific FutureWarning
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
+import argparse
 import logging
 import logging.config
+import sys
 from dotenv import load_dotenv
 import os
-from app import App    
 
-# Load environment variables from .env file
-load_dotenv()
+def parse_args(argv=None):
+    """
+    Parse the command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Advanced Python Calculator")
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                        help="evaluate 'operation a b' or JSON lines from FILE "
+                             "(or stdin) instead of starting the REPL")
+    parser.add_argument('--chunk-size', type=int, default=65_536,
+                        help='lines processed at a time in batch mode (default: 65536)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker processes for batch mode on a file, 0 for one per '
+                             'CPU (default: 1)')
+    parser.add_argument('--shard-size', type=int, default=4 << 20, metavar='BYTES',
+                        help='bytes of input per worker task (default: 4194304)')
+    parser.add_argument('--history', metavar='FILE',
+                        help='append the operations of a batch run or the server to this '
+                             'history file')
+    parser.add_argument('--serve', action='store_true',
+                        help='run a calculation server for newline-delimited JSON requests '
+                             'instead of starting the REPL')
+    parser.add_argument('--socket', metavar='PATH',
+                        help='Unix socket path of the server (default: TCP on --port)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='localhost TCP port of the server (default: 8765)')
+    return parser.parse_args(argv)
 
-# Access environment variables
-environment = os.getenv('ENVIRONMENT')
-debug = os.getenv('DEBUG')
+def run_batch(args):
+    """
+    Run the non-interactive batch mode and return the exit status.
+    """
+    # Keep stdout for results: only warnings, on stderr
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    from app.batch import run_batch as run
+    from app.calculator import Calculator
+    from app.calculator_config import CalculatorConfig
+    from app.plugins import register_plugins
+    register_plugins()
+    # Record history on a worker thread, overlapping file writes with evaluation
+    calculator = Calculator(CalculatorConfig(history_enabled=False, observer_dispatch='async'))
+    manager = None
+    if args.history:
+        from app.manager_history import ManagerHistory
+        from app.observers import AutoSaveObserver
+        manager = ManagerHistory(args.history)
+        calculator.add_observer(AutoSaveObserver(manager))
+    try:
+        parallel = args.workers != 1 and args.batch != '-'
+        if parallel:
+            # Files can be split into shards for worker processes; stdin cannot. Small
+            # files, or a single CPU, are faster in-process
+            from app.parallel import worth_parallel
+            parallel = worth_parallel(args.batch, args.workers or None)
+        if parallel:
+            from app.parallel import run_parallel
+            _, failed = run_parallel(args.batch, sys.stdout, calculator, args.workers or None,
+                                     args.shard_size, args.chunk_size)
+        elif args.batch == '-':
+            _, failed = run(sys.stdin, sys.stdout, calculator, args.chunk_size)
+        else:
+            with open(args.batch, encoding='utf-8') as infile:
+                _, failed = run(infile, sys.stdout, calculator, args.chunk_size)
+    finally:
+        calculator.close_observers()
+        if manager is not None:
+            manager.close()
+    return 1 if failed else 0
 
-print(f"Environment: {environment}")
-print(f"Debug: {debug}")
+def run_server(args):
+    """
+    Run the calculation server until it is interrupted.
+    """
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    import asyncio
+    from app.calculator import Calculator
+    from app.calculator_config import CalculatorConfig
+    from app.manager_history import ManagerHistory
+    from app.observers import AutoSaveObserver
+    from app.plugins import register_plugins
+    from app.server import serve
+    register_plugins()
+    # One warm calculator and history for every client; file writes on a worker thread
+    calculator = Calculator(CalculatorConfig(observer_dispatch='async'))
+    history_file = args.history or calculator.config.calculator_history_file
+    calculator.load_history(history_file, mode='background')
+    manager = ManagerHistory(history_file)
+    calculator.add_observer(AutoSaveObserver(manager))
+    try:
+        asyncio.run(serve(calculator, args.socket, port=args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        calculator.close_observers()
+        manager.close()
+    return 0
 
-# Load logging configuration
-logging.config.fileConfig('logging.conf')
+def main(argv=None):
+    """
+    Start the calculator REPL, or the batch mode when requested.
+    """
+    args = parse_args(argv)
 
-# Initialize and run the application
-app = App()
-app.run()
\ No newline at end of file
+    # Load environment variables from .env file
+    load_dotenv()
+
+    if args.batch:
+        sys.exit(run_batch(args))
+    if args.serve:
+        sys.exit(run_server(args))
+
+    # Access environment variables
+    environment = os.getenv('ENVIRONMENT')
+    debug = os.getenv('DEBUG')
+
+    print(f"Environment: {environment}")
+    print(f"Debug: {debug}")
+
+    # Load logging configuration
+    logging.config.fileConfig('logging.conf')
+    if os.getenv('LOG_MODE', '').lower() == 'async':
+        # Format and write log records on a background thread
+        from app.async_logging import AsyncLogging
+        AsyncLogging.from_env().start()
+
+    # Initialize and run the application
+    from app import App
+    app = App()
+    app.run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+This module contains unit tests for the running aggregates.
+"""
+
+import math
+import numpy as np
+import pytest
+from app.aggregates import OperationAggregates, RunningStats
+from app.history_store import HistoryStore
+
+def test_running_stats_match_numpy():
+    """
+    Test that Welford updates and batch merges agree with NumPy.
+    """
+    values = np.random.default_rng(0).normal(1e6, 3.0, 1000)
+    one_by_one = RunningStats()
+    for value in values.tolist():
+        one_by_one.update(value)
+    merged = RunningStats()
+    for part in np.array_split(values, 7):
+        merged.merge(len(part), part.mean(), ((part - part.mean()) ** 2).sum(),
+                     part.min(), part.max())
+    for stats in (one_by_one, merged):
+        summary = stats.to_dict()
+        assert summary['count'] == 1000
+        assert summary['mean'] == pytest.approx(values.mean())
+        assert summary['variance'] == pytest.approx(values.var(ddof=1))
+        assert summary['sum'] == pytest.approx(values.sum())
+        assert (summary['min'], summary['max']) == (values.min(), values.max())
+
+def test_empty_stats_are_nan():
+    """
+    Test the statistics of an operation without results.
+    """
+    summary = RunningStats().to_dict()
+    assert summary['count'] == 0
+    assert math.isnan(summary['mean']) and math.isnan(summary['variance'])
+
+def test_rebuild_from_store_keeps_errors():
+    """
+    Test that a rebuild recomputes the statistics and keeps the error counts.
+    """
+    aggregates = OperationAggregates()
+    aggregates.update('add', 100)
+    aggregates.update('add', 'not a number')
+    aggregates.record_errors('divide', 2)
+    store = HistoryStore()
+    store.extend(np.array(['add', 'divide', 'add'], dtype=object), np.ones(3), np.ones(3),
+                 np.array([2.0, 1.0, 4.0]))
+    aggregates.rebuild(store)
+    summary = aggregates.summary()
+    assert summary['add']['count'] == 2
+    assert summary['add']['mean'] == 3.0
+    assert summary['add']['variance'] == 2.0
+    assert summary['divide']['errors'] == 2
+    assert summary['divide']['count'] == 1
+    assert aggregates.summary('power')['count'] == 0
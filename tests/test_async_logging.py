@@ -0,0 +1,107 @@
+"""
+This module contains unit tests for the asynchronous logging pipeline.
+"""
+
+import logging
+import queue
+import threading
+import pytest
+from app.async_logging import (AsyncLogging, BufferedFileHandler, LazyQueueHandler,
+                               RateLimitFilter)
+
+class ThreadName:
+    """
+    A log argument that records the thread it is formatted on.
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.formatted_on = None
+
+    def __str__(self):
+        self.formatted_on = threading.current_thread().name
+        return 'value'
+
+def _record(name='app.test', level=logging.DEBUG, msg='message', args=()):
+    """
+    Create a log record.
+    """
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+def test_rate_limit_filter():
+    """
+    Test that each logger is limited separately and warnings always pass.
+    """
+    rate_filter = RateLimitFilter(rate=0.001, burst=2)
+    assert [rate_filter.filter(_record()) for _ in range(4)] == [True, True, False, False]
+    assert rate_filter.filter(_record('app.other'))
+    assert rate_filter.filter(_record(level=logging.WARNING))
+    assert rate_filter.dropped == {'app.test': 2}
+    with pytest.raises(ValueError, match="must be positive"):
+        RateLimitFilter(0)
+
+def test_buffered_file_handler_writes_batches(tmp_path):
+    """
+    Test that records are written once a batch is full, or at once for errors.
+    """
+    log_file = tmp_path / "app.log"
+    handler = BufferedFileHandler(str(log_file), capacity=3, flush_interval=3600)
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    handler.handle(_record(msg='one'))
+    handler.handle(_record(msg='two'))
+    assert not log_file.exists()
+    handler.handle(_record(msg='three'))
+    assert log_file.read_text(encoding='utf-8').splitlines() == [
+        'DEBUG one', 'DEBUG two', 'DEBUG three']
+    handler.handle(_record(level=logging.ERROR, msg='failed'))
+    assert log_file.read_text(encoding='utf-8').splitlines()[-1] == 'ERROR failed'
+    handler.handle(_record(msg='last'))
+    handler.close()
+    assert log_file.read_text(encoding='utf-8').splitlines()[-1] == 'DEBUG last'
+
+def test_lazy_queue_handler_drops_when_full():
+    """
+    Test that a full queue drops records instead of blocking.
+    """
+    handler = LazyQueueHandler(queue.Queue(1))
+    handler.handle(_record())
+    handler.handle(_record())
+    assert handler.dropped == 1
+
+def test_async_logging_formats_on_listener(tmp_path):
+    """
+    Test that records are formatted and written by the listener, and that stopping
+    writes every record and restores the original handlers.
+    """
+    log_file = tmp_path / "app.log"
+    target = logging.getLogger('test_async_logging')
+    target.setLevel(logging.DEBUG)
+    target.propagate = False
+    file_handler = logging.FileHandler(str(log_file), delay=True)
+    file_handler.setFormatter(logging.Formatter('%(name)s %(message)s'))
+    target.addHandler(file_handler)
+    async_logging = AsyncLogging('test_async_logging', flush_interval=3600)
+    try:
+        async_logging.start()
+        assert async_logging.running
+        assert target.handlers == [async_logging.queue_handler]
+        argument = ThreadName()
+        for i in range(100):
+            target.debug("record %d %s", i, argument)
+    finally:
+        async_logging.stop()
+        target.removeHandler(file_handler)
+        file_handler.close()
+    assert not async_logging.running
+    assert argument.formatted_on != threading.current_thread().name
+    lines = log_file.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 100
+    assert lines[-1] == 'test_async_logging record 99 value'
+
+def test_async_logging_from_env(monkeypatch):
+    """
+    Test that the rate limit is read from the LOG_RATE_LIMIT environment variable.
+    """
+    monkeypatch.setenv('LOG_RATE_LIMIT', '50')
+    assert AsyncLogging.from_env().rate_filter.rate == 50
+    monkeypatch.delenv('LOG_RATE_LIMIT')
+    assert AsyncLogging.from_env().rate_filter is None
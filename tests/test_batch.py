@@ -0,0 +1,98 @@
+"""
+This module contains unit tests for the batch mode.
+"""
+
+import io
+import os
+import subprocess
+import sys
+import numpy as np
+from app.batch import error_message, parse_chunk, run_batch
+from app.calculator import Calculator
+from app.strategy_factory import StrategyFactory
+
+def test_parse_chunk_plain_lines():
+    """
+    Test the bulk parsing of plain 'operation a b' lines.
+    """
+    operations, a, b, invalid = parse_chunk(['add 1 2', 'divide 6 3'])
+    assert operations.tolist() == ['add', 'divide']
+    assert a.tolist() == [1.0, 6.0]
+    assert b.tolist() == [2.0, 3.0]
+    assert not invalid.any()
+
+def test_parse_chunk_mixed_lines():
+    """
+    Test parsing JSON and malformed lines.
+    """
+    operations, a, b, invalid = parse_chunk(['{"op": "power", "a": 2, "b": 3}', 'add 1',
+                                             'add x 2', 'subtract 5 3'])
+    assert operations[0] == 'power' and a[0] == 2 and b[0] == 3
+    assert invalid.tolist() == [False, True, True, False]
+    assert operations[3] == 'subtract'
+
+def test_parse_chunk_checks_fields_per_line():
+    """
+    Test that lines with too few or too many fields are not completed from their
+    neighbours.
+    """
+    operations, _, _, invalid = parse_chunk(['add 1', '2 multiply 3 4', 'add 1 2'])
+    assert invalid.tolist() == [True, True, False]
+    assert operations[2] == 'add'
+
+def test_error_message():
+    """
+    Test that only operations without a strategy are reported as not supported.
+    """
+    def fail(a, b):
+        raise ValueError(f"Cannot handle {a} and {b}")
+
+    StrategyFactory.register_strategy('fail', fail)
+    try:
+        assert error_message('fail') == "Operation 'fail' failed"
+    finally:
+        StrategyFactory.unregister_strategy('fail')
+    assert error_message('fail') == "Operation 'fail' is not supported"
+    assert error_message('divide') == "Cannot divide by zero"
+
+def test_run_batch():
+    """
+    Test that run_batch writes one result per operation in input order.
+    """
+    infile = io.StringIO("add 1 2\n\n# comment\ndivide 6 0\nmodulo 1 2\nmultiply 2 3\n")
+    outfile = io.StringIO()
+    calc = Calculator()
+    total, failed = run_batch(infile, outfile, calc, chunksize=2)
+    assert (total, failed) == (4, 2)
+    assert outfile.getvalue().splitlines() == [
+        '3.0', 'Error: Cannot divide by zero',
+        "Error: Operation 'modulo' is not supported", '6.0']
+    assert calc.get_history()['operation'].tolist() == ['add', 'multiply']
+
+def test_execute_many_keeps_input_order():
+    """
+    Test that execute_many records mixed operations in input order.
+    """
+    calc = Calculator()
+    batch = calc.execute_many(['add', 'multiply', 'add'], [1, 2, 3], np.array([1, 2, 3]))
+    assert batch.result.tolist() == [2.0, 4.0, 6.0]
+    assert calc.get_history()['operation'].tolist() == ['add', 'multiply', 'add']
+
+def test_execute_many_with_operations_that_are_not_strings():
+    """
+    Test that operation names that are not strings are errors of their own rows.
+    """
+    calc = Calculator()
+    batch = calc.execute_many(np.array(['add', 5, None, 'add'], dtype=object), 1, 2)
+    assert batch.errors.tolist() == [False, True, True, False]
+    assert calc.get_history()['operation'].tolist() == ['add', 'add']
+
+def test_main_batch_mode():
+    """
+    Test the batch mode of main.py reading from stdin.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run([sys.executable, 'main.py', '--batch'], cwd=root,
+                               input="add 1 2\nroot 16 2\n", capture_output=True,
+                               text=True, check=True)
+    assert completed.stdout.splitlines() == ['3.0', '4.0']
@@ -2,6 +2,7 @@
 This module contains unit tests for the Calculator class.
 """
 
+import threading
 import pytest
 from app.calculator import Calculator
 
@@ -115,3 +116,59 @@ def test_load_history_with_data(tmp_path):
     assert history.iloc[-1]['operand1'] == 1
     assert history.iloc[-1]['operand2'] == 2
     assert history.iloc[-1]['result'] == 3
+
+def test_query_history():
+    """
+    Test querying the history by operation and result range.
+    """
+    calc = Calculator()
+    calc.execute_operation('add', 1, 2)
+    calc.execute_operation('divide', 6, 3)
+    assert calc.query_history('divide')['result'].tolist() == [2.0]
+    calc.execute_operation('divide', 9, 3)
+    calc.execute_operation('add', 10, 20)
+    matches = calc.query_history(result=(2, 5))
+    assert matches.index.tolist() == [0, 1, 2]
+    assert calc.query_history('add', result=(10, None))['operand1'].tolist() == [10.0]
+
+def test_get_statistics():
+    """
+    Test the running statistics of the calculator, including errors and batches.
+    """
+    calc = Calculator()
+    calc.execute_operation('add', 1, 2)
+    calc.execute_operation('add', 2, 3)
+    with pytest.raises(ValueError):
+        calc.execute_operation('divide', 1, 0)
+    calc.execute_batch('divide', [6, 1], [3, 0])
+    calc.execute_many(['add', 'modulo'], [1, 1], [1, 1])
+    stats = calc.get_statistics()
+    assert stats['add']['count'] == 3
+    assert stats['add']['mean'] == pytest.approx(10 / 3)
+    assert stats['add']['min'] == 2 and stats['add']['max'] == 5
+    assert stats['divide']['count'] == 1
+    assert stats['divide']['errors'] == 2
+    assert 'modulo' not in stats
+    calc.history = calc.history.iloc[:1]
+    assert calc.get_statistics('add')['count'] == 1
+    calc.clear_history()
+    assert not calc.get_statistics()
+
+def test_concurrent_operations_are_all_recorded():
+    """
+    Test that operations executed from several threads are all recorded.
+    """
+    calculator = Calculator()
+
+    def execute(offset):
+        for i in range(500):
+            calculator.execute_operation('add', offset, i)
+
+    threads = [threading.Thread(target=execute, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calculator.get_history()) == 2000
+    assert calculator.get_statistics('add')['count'] == 2000
+    assert len(calculator.query_history(operation='add', operand1=(3, 3))) == 500
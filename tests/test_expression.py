@@ -0,0 +1,144 @@
+"""
+This module contains unit tests for the expression engine.
+"""
+
+import numpy as np
+import pytest
+from app.calculator import Calculator
+from app.expression import Call, Constant, compile_expression, tokenize
+from app.strategy_factory import StrategyFactory
+
+def test_tokenize():
+    """
+    Test that an expression is split into numbers, names and symbols.
+    """
+    assert tokenize('2.5e1 ** root(x,3)') == [
+        ('number', 25.0), ('symbol', '^'), ('name', 'root'), ('symbol', '('),
+        ('name', 'x'), ('symbol', ','), ('number', 3.0), ('symbol', ')'), ('end', None)]
+
+@pytest.mark.parametrize("text, expected", [
+    ('2 + 3 * 4 ^ 0.5', 8.0),
+    ('(2 + 3) * 4', 20.0),
+    ('10 - 4 - 3', 3.0),
+    ('2 ^ 3 ^ 2', 512.0),
+    ('-2 ^ 2', -4.0),
+    ('-(1 + 2) * -3', 9.0),
+    ('root(27, 3)', 3.0),
+    ('power(2, root(9, 2)) / 4', 2.0),
+])
+def test_constant_expressions_are_folded(text, expected):
+    """
+    Test precedence and associativity, and that constant expressions are folded.
+    """
+    expression = compile_expression(text)
+    assert expression.is_constant
+    assert expression.evaluate() == pytest.approx(expected)
+
+def test_variables():
+    """
+    Test evaluating an expression with variables.
+    """
+    expression = compile_expression('x * 2 + root(y, 2)')
+    assert expression.variables == ('x', 'y')
+    assert isinstance(expression.tree, Call)
+    assert expression.evaluate(x=1, y=16) == 6.0
+    with pytest.raises(ValueError, match="Missing value for variable"):
+        expression.evaluate(x=1)
+
+def test_partial_folding():
+    """
+    Test that constant subexpressions of a variable expression are folded.
+    """
+    expression = compile_expression('x + 2 * 3')
+    assert expression.tree.right == Constant(6.0)
+
+def test_errors_are_raised_on_evaluation():
+    """
+    Test that a failing constant operation is not folded and raises on evaluation.
+    """
+    expression = compile_expression('1 / 0')
+    assert not expression.is_constant
+    with pytest.raises(ValueError, match="Cannot divide by zero"):
+        expression.evaluate()
+
+@pytest.mark.parametrize("text, message", [
+    ('2 +', "Unexpected end of expression"),
+    ('2 3', "Unexpected '3'"),
+    ('(1', "Expected '\\)' but found end of expression"),
+    ('root(1)', "Expected ',' but found '\\)'"),
+    ('2 $ 3', "Invalid character"),
+    ('modulo(7, 3)', "Operation 'modulo' is not supported"),
+])
+def test_invalid_expressions(text, message):
+    """
+    Test that invalid expressions raise ValueError.
+    """
+    with pytest.raises(ValueError, match=message):
+        compile_expression(text)
+
+@pytest.mark.parametrize("text", [
+    '(' * 1000 + '1' + ')' * 1000,
+    '-' * 1000 + '1',
+    '2' + ' ^ 2' * 1000,
+    'add(' * 1000 + '1' + ', 1)' * 1000,
+])
+def test_deeply_nested_expressions(text):
+    """
+    Test that deeply nested expressions raise ValueError instead of RecursionError.
+    """
+    with pytest.raises(ValueError, match="Expression is nested too deeply"):
+        compile_expression(text)
+
+def test_nested_expressions_within_limit():
+    """
+    Test that expressions nested within the limit are compiled and evaluated.
+    """
+    assert compile_expression('(' * 150 + '1' + ')' * 150).evaluate() == 1
+    assert compile_expression('x' + ' + x' * 150).evaluate(x=1) == 151
+
+def test_long_flat_chains():
+    """
+    Test that long chains of left-associative operators are not limited in length.
+    """
+    expression = compile_expression('x' + ' + x' * 10_000)
+    assert expression.evaluate(x=1) == 10_001
+    assert expression.evaluate_array(x=np.array([1.0, 2.0])).result.tolist() == [10_001, 20_002]
+    expression = compile_expression('x' + ' - 1 * x' * 5_000 + ' / 2')
+    # The last term is 1 * x / 2
+    assert expression.evaluate(x=2) == 2 - 4_999 * 2 - 1
+    assert expression.variables == ('x',)
+
+def test_compiled_expressions_are_cached():
+    """
+    Test that the same text is compiled once, until the registry changes.
+    """
+    expression = compile_expression('x + 1')
+    assert compile_expression(' x + 1 ') is expression
+    try:
+        StrategyFactory.register_strategy('modulo', lambda a, b: a % b)
+        assert compile_expression('x + 1') is not expression
+        assert compile_expression('modulo(x, 3)').evaluate(x=7) == 1
+    finally:
+        StrategyFactory.unregister_strategy('modulo')
+
+def test_evaluate_array():
+    """
+    Test evaluating an expression element-wise on arrays.
+    """
+    expression = compile_expression('x / y + 1')
+    batch = expression.evaluate_array(x=np.arange(4), y=np.array([1, 0, 2, 4]))
+    assert batch.errors.tolist() == [False, True, False, False]
+    np.testing.assert_allclose(batch.result[~batch.errors], [1.0, 2.0, 1.75])
+    assert np.isnan(batch.result[1])
+    batch = expression.evaluate_array(x=np.arange(3), y=2)
+    np.testing.assert_allclose(batch.result, [1.0, 1.5, 2.0])
+
+def test_calculator_evaluate_expression():
+    """
+    Test that the calculator evaluates expressions without recording them.
+    """
+    calculator = Calculator()
+    assert calculator.evaluate_expression('2 * x', x=4) == 8
+    batch = calculator.evaluate_expression_batch('root(x, 2)', x=[4, 9])
+    np.testing.assert_allclose(batch.result, [2.0, 3.0])
+    assert calculator.history.empty
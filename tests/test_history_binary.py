@@ -0,0 +1,100 @@
+"""
+This module contains unit tests for the binary history format.
+"""
+
+import numpy as np
+import pandas as pd
+from app.history_binary import BinaryHistoryFile, is_binary_history
+from app.manager_history import ManagerHistory, convert_history
+from app.history import History
+from app.calculator import Calculator
+
+def test_append_and_read_columns(tmp_path):
+    """
+    Test appending rows and reading them back through memory maps.
+    """
+    binary = BinaryHistoryFile(str(tmp_path / "history.bin"))
+    binary.append(['add', 1, 2, 3])
+    binary.extend_columns('divide', np.array([6.0, 9.0]), np.array([3.0, 3.0]),
+                          np.array([2.0, 3.0]))
+    binary.close()
+    assert is_binary_history(binary.filename)
+    assert len(binary) == 3
+    columns = binary.columns(['result'])
+    assert list(columns) == ['result']
+    assert columns['result'].tolist() == [3.0, 2.0, 3.0]
+    frame = pd.concat(binary.iter_chunks(2))
+    assert frame['operation'].tolist() == ['add', 'divide', 'divide']
+
+def test_file_grows_when_full(tmp_path):
+    """
+    Test that appending beyond the capacity keeps all rows.
+    """
+    binary = BinaryHistoryFile(str(tmp_path / "history.bin"))
+    binary.create(capacity=2)
+    for i in range(5):
+        binary.append(['add', i, 1, i + 1])
+    binary.close()
+    capacity, count, operations = binary.header()
+    assert count == 5 and capacity >= 5
+    assert operations == ['add']
+    assert binary.columns(['operand1'])['operand1'].tolist() == [0, 1, 2, 3, 4]
+
+def test_manager_history_binary_format(tmp_path):
+    """
+    Test ManagerHistory with the binary format.
+    """
+    manager = ManagerHistory(str(tmp_path / "history.bin"))
+    assert manager.history_format == 'binary'
+    manager.add_history(History('add', 1, 2, 3))
+    manager.add_history(History('multiply', 2, 3, 6))
+    history = manager.load_history()
+    assert history['operation'].tolist() == ['add', 'multiply']
+    manager.clear_history()
+    assert manager.load_history().empty
+
+def test_convert_history(tmp_path):
+    """
+    Test converting a history file from CSV to binary and back.
+    """
+    csv_file = tmp_path / "history.csv"
+    csv_file.write_text("operation,operand1,operand2,result\nadd,1,2,3\ndivide,6,3,2\n",
+                        encoding='utf-8')
+    binary_file = tmp_path / "history.bin"
+    round_trip = tmp_path / "round_trip.csv"
+    convert_history(str(csv_file), str(binary_file))
+    assert is_binary_history(str(binary_file))
+    convert_history(str(binary_file), str(round_trip))
+    assert not is_binary_history(str(round_trip))
+    history = pd.read_csv(round_trip)
+    assert history['operation'].tolist() == ['add', 'divide']
+    assert history['result'].tolist() == [3, 2]
+
+def test_calculator_load_binary_history(tmp_path):
+    """
+    Test that the calculator loads a binary history through memory maps and can extend it.
+    """
+    binary = BinaryHistoryFile(str(tmp_path / "history.bin"))
+    binary.extend([['add', 1, 2, 3], ['subtract', 5, 3, 2]])
+    binary.close()
+    calc = Calculator()
+    calc.load_history(binary.filename)
+    assert isinstance(calc.store.result, np.memmap)
+    calc.execute_operation('multiply', 2, 3)
+    assert calc.get_history()['operation'].tolist() == ['add', 'subtract', 'multiply']
+    assert len(binary) == 2
+
+def test_calculator_clears_binary_history(tmp_path):
+    """
+    Test that a history loaded through read-only memory maps can be cleared and extended.
+    """
+    binary = BinaryHistoryFile(str(tmp_path / "history.bin"))
+    binary.extend([['add', 1, 2, 3], ['subtract', 5, 3, 2]])
+    binary.close()
+    calc = Calculator()
+    calc.load_history(binary.filename)
+    calc.clear_history()
+    assert not isinstance(calc.store.result, np.memmap)
+    calc.execute_operation('add', 1, 2)
+    assert calc.get_history()['result'].tolist() == [3]
+    assert len(binary) == 2
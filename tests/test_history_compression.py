@@ -0,0 +1,162 @@
+"""
+This module contains unit tests for compressed history files.
+"""
+
+import gzip
+import os
+import pytest
+from app import history_compression
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.history import History
+from app.history_compression import (MEMBER_SIZE, compress, compressed_path, compression_for,
+                                     open_history, sync_member)
+from app.history_log import HistoryLog
+from app.history_loader import read_history_store
+from app.manager_history import ManagerHistory, write_csv_history
+
+@pytest.mark.parametrize('compression, extension', [('gzip', '.gz'), ('bz2', '.bz2'),
+                                                    ('xz', '.xz')])
+def test_append_and_load_compressed_history(tmp_path, compression, extension):
+    """
+    Test that appended rows are compressed and read back in chunks.
+    """
+    history_file = str(tmp_path / f"history.csv{extension}")
+    manager = ManagerHistory(history_file, flush_rows=3)
+    assert compression_for(history_file) == compression
+    for i in range(10):
+        manager.add_history(History('add', i, 1, i + 1))
+    manager.close()
+    with open(history_file, 'rb') as file:
+        assert not file.read().startswith(b'operation')
+    chunks = list(manager.iter_history(chunksize=4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert manager.load_history()['result'].tolist() == [float(i + 1) for i in range(10)]
+    with open_history(history_file) as file:
+        assert file.readline().strip() == 'operation,operand1,operand2,result'
+
+@pytest.mark.parametrize('compression, extension', [('gzip', '.gz'), ('bz2', '.bz2'),
+                                                    ('xz', '.xz')])
+def test_recover_truncated_compressed_history(tmp_path, caplog, compression, extension):
+    """
+    Test that a partially written last member is read up to its damage, and cut off
+    before new rows are appended.
+    """
+    history_file = str(tmp_path / f"history.csv{extension}")
+    manager = ManagerHistory(history_file, flush_rows=2)
+    for i in range(4):
+        manager.add_history(History('add', i, 1, i + 1))
+    manager.close()
+    member = compress(b'add,9,9,18\r\n' * 1000, compression)
+    with open(history_file, 'ab') as file:
+        file.write(member[:len(member) // 2])
+    rows = len(manager.load_history())
+    assert 4 <= rows < 1004
+    assert len(read_history_store(history_file)) == rows
+    assert "is damaged" in caplog.text
+    manager = ManagerHistory(history_file, flush_rows=1)
+    manager.add_history(History('multiply', 2, 3, 6))
+    manager.close()
+    assert manager.load_history()['result'].tolist() == [1.0, 2.0, 3.0, 4.0, 6.0]
+
+@pytest.mark.parametrize('extension', ['.gz', '.bz2', '.xz'])
+def test_recover_only_decompresses_after_last_sync_member(tmp_path, monkeypatch, extension):
+    """
+    Test that a complete compressed history is recovered without decompressing it,
+    and a damaged one only from its last sync member.
+    """
+    history_file = str(tmp_path / f"history.csv{extension}")
+    write_csv_history(history_file, [['add', i, 1, i + 1] for i in range(1000)])
+    manager = ManagerHistory(history_file)
+    manager.add_history(History('add', 1, 1, 2))
+    manager.close()
+    complete = os.path.getsize(history_file)
+    with open(history_file, 'rb') as file:
+        assert file.read().endswith(sync_member(compression_for(history_file)))
+    starts = []
+    scan = history_compression._complete_members_length  # pylint: disable=protected-access
+    def recording_scan(file, compression):
+        starts.append(file.tell())
+        return scan(file, compression)
+    monkeypatch.setattr(history_compression, '_complete_members_length', recording_scan)
+    assert not HistoryLog(history_file).recover()
+    assert not starts
+    member = compress(b'add,9,9,18\r\n' * 1000, compression_for(history_file))
+    with open(history_file, 'ab') as file:
+        file.write(member[:len(member) // 2])
+    assert HistoryLog(history_file).recover()
+    assert starts == [complete]
+    assert os.path.getsize(history_file) == complete
+    assert len(read_history_store(history_file)) == 1001
+
+def test_compressed_rows_are_written_in_large_members(tmp_path):
+    """
+    Test that a compressed log buffers rows into members of MEMBER_SIZE bytes
+    instead of flushing every `flush_rows` rows.
+    """
+    log = HistoryLog(str(tmp_path / "history.csv.gz"), flush_rows=1, flush_interval=60)
+    log.open()
+    log.append(['add', 1, 2, 3])
+    assert log.commits == 0
+    log.extend([['add', i, 1, i + 1] for i in range(MEMBER_SIZE // 10)])
+    assert log.commits == 1
+    log.append(['add', 2, 2, 4])
+    log.close()
+    assert log.commits == 2
+
+def test_read_compressed_history_with_trailing_garbage(tmp_path, caplog):
+    """
+    Test that data that is not compressed at all ends the history instead of raising.
+    """
+    history_file = str(tmp_path / "history.csv.gz")
+    write_csv_history(history_file, [['add', 1, 2, 3]])
+    with open(history_file, 'ab') as file:
+        file.write(b'not gzip data')
+    assert len(read_history_store(history_file)) == 1
+    assert "is damaged" in caplog.text
+
+def test_save_to_and_load_from_compressed_files(tmp_path):
+    """
+    Test copying history between plain and compressed files.
+    """
+    manager = ManagerHistory(str(tmp_path / "history.csv"))
+    manager.save_history([History('add', 1, 2, 3), History('divide', 6, 3, 2)])
+    manager.save_to(str(tmp_path / "copy.csv.bz2"))
+    manager.clear_history()
+    manager.load_from(str(tmp_path / "copy.csv.bz2"))
+    assert manager.load_history()['operation'].tolist() == ['add', 'divide']
+
+def test_compression_imports_plain_history(tmp_path):
+    """
+    Test that a configured compression renames the history and imports an existing
+    plain history with the same name.
+    """
+    plain_file = str(tmp_path / "history.csv")
+    write_csv_history(plain_file, [['add', 1, 2, 3]])
+    manager = ManagerHistory(plain_file, compression='gzip')
+    assert manager.filename == plain_file + '.gz'
+    manager.add_history(History('multiply', 2, 3, 6))
+    manager.close()
+    with gzip.open(manager.filename, 'rt', encoding='utf-8') as file:
+        assert file.read().splitlines()[1:] == ['add,1.0,2.0,3.0', 'multiply,2,3,6']
+
+def test_calculator_loads_configured_compression(tmp_path):
+    """
+    Test that Calculator.load_history adds the extension of the configured compression.
+    """
+    plain_file = str(tmp_path / "history.csv")
+    write_csv_history(plain_file + '.xz', [['add', 1, 2, 3], ['add', 2, 2, 4]])
+    calculator = Calculator(CalculatorConfig(calculator_history_file=plain_file,
+                                             history_compression='xz'))
+    calculator.load_history(mode='eager')
+    assert len(calculator.get_history()) == 2
+
+def test_invalid_compression(tmp_path):
+    """
+    Test that unknown compressions and compressed binary histories are rejected.
+    """
+    assert compressed_path('history.csv.gz', 'gzip') == 'history.csv.gz'
+    with pytest.raises(ValueError, match="Unsupported history compression 'zip'"):
+        compressed_path('history.csv', 'zip')
+    with pytest.raises(ValueError, match="only supported for CSV"):
+        ManagerHistory(str(tmp_path / "history.bin"), compression='gzip')
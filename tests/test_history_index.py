@@ -0,0 +1,74 @@
+"""
+This module contains unit tests for the history indexes.
+"""
+
+import numpy as np
+from app.history_index import HistoryIndex, SortedColumnIndex
+from app.history_store import HistoryStore
+
+def test_sorted_column_index_merges_buffer():
+    """
+    Test range lookups across the sorted main array and the append buffer.
+    """
+    index = SortedColumnIndex()
+    index.extend(np.array([5.0, 1.0, np.nan, 3.0]), np.arange(4))
+    for row, value in enumerate([2.0, 4.0, 3.0], start=4):
+        index.add(value, row)
+    assert len(index) == 6
+    assert index.range(2, 3).tolist() == [3, 4, 6]
+    assert index.range(None, 1).tolist() == [1]
+    assert index.range(4, None).tolist() == [0, 5]
+    for row in range(7, 7 + SortedColumnIndex.MIN_BUFFER + 1):
+        index.add(float(row), row)
+    assert len(index.values) > SortedColumnIndex.MIN_BUFFER
+    assert index.range(2, 3).tolist() == [3, 4, 6]
+
+def test_history_index_operation_rows():
+    """
+    Test the per-operation row index with single and batch updates.
+    """
+    index = HistoryIndex()
+    index.add(0, 1.0, 2.0, 3.0)
+    index.extend(np.array([1, 0, 1], dtype=np.int32), np.ones(3), np.ones(3), np.ones(3))
+    assert index.operation_rows(0).tolist() == [0, 2]
+    assert index.operation_rows(1).tolist() == [1, 3]
+    assert not index.operation_rows(2).size
+
+def test_store_query_matches_full_scan():
+    """
+    Test that indexed queries return the same rows as a scan, before and after appends.
+    """
+    rng = np.random.default_rng(1)
+    operations = np.array(['add', 'divide', 'power'], dtype=object)[rng.integers(0, 3, 1000)]
+    a, b = rng.uniform(-10, 10, 1000), rng.uniform(-10, 10, 1000)
+    store = HistoryStore()
+    store.extend(operations, a, b, a + b)
+
+    def check():
+        frame = store.to_frame()
+        expected = frame.index[(frame['operation'] == 'divide')
+                               & frame['result'].between(-2, 5)].tolist()
+        assert store.query('divide', result=(-2, 5)).tolist() == expected
+        expected = frame.index[frame['operand1'] >= 3].tolist()
+        assert store.query(operand1=(3, None)).tolist() == expected
+
+    check()
+    assert store.index is not None
+    for i in range(300):
+        store.append('divide', i / 100, 1.0, i / 100)
+    store.extend('add', np.array([1.0]), np.array([1.0]), np.array([2.0]))
+    check()
+    assert store.query('modulo').size == 0
+    assert store.query().tolist() == list(range(len(store)))
+
+def test_store_take():
+    """
+    Test that take returns the selected rows indexed by row id.
+    """
+    store = HistoryStore()
+    store.append('add', 1, 2, 3)
+    store.append('multiply', 2, 3, 6)
+    frame = store.take(np.array([1]))
+    assert frame.index.tolist() == [1]
+    assert frame.iloc[0]['operation'] == 'multiply'
+    assert store.take(np.empty(0, dtype=np.int64)).empty
@@ -0,0 +1,86 @@
+"""
+This module contains unit tests for deferred history loading.
+"""
+
+import pandas as pd
+from app.calculator import Calculator
+from app.history_loader import HistoryLoader
+from app.repl import REPL
+
+def write_history(path, rows):
+    """
+    Write a CSV history file with the given number of add operations.
+    """
+    pd.DataFrame({'operation': ['add'] * rows, 'operand1': range(rows),
+                  'operand2': [1] * rows, 'result': range(1, rows + 1)}).to_csv(path, index=False)
+
+def test_lazy_load_on_first_access(tmp_path, monkeypatch):
+    """
+    Test that a lazy load does not read the file until the history is accessed.
+    """
+    history_file = tmp_path / "history.csv"
+    write_history(history_file, 3)
+    calc = Calculator()
+    reads = []
+    original = pd.read_csv
+
+    def read_csv(*args, **kwargs):
+        reads.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(pd, 'read_csv', read_csv)
+    calc.load_history(str(history_file), mode='lazy')
+    assert not reads
+    assert len(calc.get_history()) == 3
+    assert len(reads) == 1
+
+def test_operations_before_load_are_kept(tmp_path):
+    """
+    Test that operations recorded before a deferred load are kept after the loaded ones.
+    """
+    history_file = tmp_path / "history.csv"
+    write_history(history_file, 2)
+    calc = Calculator()
+    calc.load_history(str(history_file), mode='lazy')
+    calc.execute_operation('multiply', 2, 3)
+    history = calc.get_history()
+    assert history['operation'].tolist() == ['add', 'add', 'multiply']
+    assert history.iloc[-1]['result'] == 6
+
+def test_background_load(tmp_path):
+    """
+    Test loading the history in a background thread.
+    """
+    history_file = tmp_path / "history.csv"
+    write_history(history_file, 5)
+    loader = HistoryLoader(str(history_file), background=True)
+    store = loader.result()
+    assert loader.done()
+    assert len(store) == 5
+
+def test_lazy_load_missing_file():
+    """
+    Test that a deferred load of a missing file leaves the history empty.
+    """
+    calc = Calculator()
+    calc.load_history('data/missing_history.csv', mode='background')
+    assert calc.get_history().empty
+
+def test_clear_discards_pending_load(tmp_path):
+    """
+    Test that clearing the history cancels a pending load.
+    """
+    history_file = tmp_path / "history.csv"
+    write_history(history_file, 2)
+    calc = Calculator()
+    calc.load_history(str(history_file), mode='lazy')
+    calc.clear_history()
+    assert calc.get_history().empty
+
+def test_repl_defers_history_load():
+    """
+    Test that the REPL does not load the calculator history at startup.
+    """
+    repl = REPL()
+    assert repl.calculator.history_loader is not None
+    assert not repl.calculator.history_loader.done()
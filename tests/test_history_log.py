@@ -0,0 +1,154 @@
+"""
+This module contains unit tests for the HistoryLog class.
+"""
+
+import concurrent.futures
+import threading
+import time
+from app.history_log import HistoryLog
+from app.manager_history import ManagerHistory, write_csv_history
+from app.history import History
+
+def _append_rows(filename, writer, count):
+    """
+    Append rows to a history file from a separate process.
+    """
+    log = HistoryLog(filename, flush_rows=7)
+    for i in range(count):
+        log.append(['add', writer, i, writer + i])
+    log.close()
+
+def test_append_writes_header_to_empty_file(tmp_path):
+    """
+    Test that appending to an empty file writes the CSV header first.
+    """
+    history_file = tmp_path / "history.csv"
+    log = HistoryLog(str(history_file), flush_rows=1)
+    log.append(['add', 1.0, 2.0, 3.0])
+    log.close()
+    assert history_file.read_text(encoding='utf-8').splitlines() == [
+        'operation,operand1,operand2,result', 'add,1.0,2.0,3.0']
+
+def test_append_buffers_until_flush_rows(tmp_path):
+    """
+    Test that rows are buffered until the size threshold is reached.
+    """
+    history_file = tmp_path / "history.csv"
+    history_file.write_text('operation,operand1,operand2,result\n', encoding='utf-8')
+    log = HistoryLog(str(history_file), flush_rows=3, flush_interval=3600)
+    log.append(['add', 1, 1, 2])
+    log.append(['add', 1, 2, 3])
+    assert log.pending == 2
+    assert len(history_file.read_text(encoding='utf-8').splitlines()) == 1
+    log.append(['add', 1, 3, 4])
+    assert log.pending == 0
+    assert len(history_file.read_text(encoding='utf-8').splitlines()) == 4
+    log.close()
+
+def test_append_flushes_after_interval(tmp_path):
+    """
+    Test that buffered rows are flushed once the flush interval has elapsed.
+    """
+    history_file = tmp_path / "history.csv"
+    log = HistoryLog(str(history_file), flush_rows=1000, flush_interval=0)
+    log.append(['add', 1, 1, 2])
+    assert log.pending == 0
+    log.close()
+
+def test_idle_log_flushes_after_interval(tmp_path):
+    """
+    Test that pending rows are flushed by the timer when nothing else is appended.
+    """
+    history_file = tmp_path / "history.csv"
+    log = HistoryLog(str(history_file), flush_rows=1000, flush_interval=0.05)
+    log.append(['add', 1, 1, 2])
+    assert log.pending == 1
+    deadline = time.monotonic() + 5
+    while log.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert log.pending == 0
+    assert history_file.read_text(encoding='utf-8').splitlines()[1] == 'add,1,1,2'
+    log.close()
+
+def test_extend_appends_rows(tmp_path):
+    """
+    Test that extend appends several rows at once.
+    """
+    history_file = tmp_path / "history.csv"
+    log = HistoryLog(str(history_file), flush_rows=2)
+    log.extend([['add', 1, 1, 2], ['subtract', 3, 1, 2]])
+    log.close()
+    assert len(history_file.read_text(encoding='utf-8').splitlines()) == 3
+
+def test_recover_truncated_last_line(tmp_path):
+    """
+    Test that a partially written last line is dropped on open.
+    """
+    history_file = tmp_path / "history.csv"
+    history_file.write_bytes(b'operation,operand1,operand2,result\r\nadd,1,2,3\r\nmul')
+    log = HistoryLog(str(history_file), flush_rows=1)
+    assert log.recover()
+    assert history_file.read_bytes() == b'operation,operand1,operand2,result\r\nadd,1,2,3\r\n'
+    assert not log.recover()
+
+def test_add_history_does_not_reload_file(tmp_path, monkeypatch):
+    """
+    Test that add_history appends without re-reading the history file.
+    """
+    manager = ManagerHistory(str(tmp_path / "history.csv"))
+    monkeypatch.setattr(manager, 'save_history', None)
+    monkeypatch.setattr(ManagerHistory, 'load_history', None)
+    for i in range(10):
+        manager.add_history(History('add', i, 1, i + 1))
+    manager.close()
+    monkeypatch.undo()
+    assert len(manager.load_history()) == 10
+
+def test_concurrent_appends_keep_every_row(tmp_path):
+    """
+    Test that rows appended from several threads are all written, once each, with a
+    single header.
+    """
+    history_file = tmp_path / "history.csv"
+    log = HistoryLog(str(history_file), flush_rows=5)
+
+    def append(writer):
+        for i in range(200):
+            log.append(['add', writer, i, writer + i])
+
+    threads = [threading.Thread(target=append, args=(writer,)) for writer in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    log.close()
+    lines = history_file.read_text(encoding='utf-8').splitlines()
+    assert lines[0] == 'operation,operand1,operand2,result'
+    assert len(lines) == 1 + 8 * 200
+    assert len(set(lines[1:])) == 8 * 200
+    assert log.commits < 8 * 200
+
+def test_appends_from_several_processes(tmp_path):
+    """
+    Test that processes appending to the same file never lose or interleave rows.
+    """
+    history_file = str(tmp_path / "history.csv")
+    with concurrent.futures.ProcessPoolExecutor(3) as pool:
+        list(pool.map(_append_rows, [history_file] * 3, range(3), [500] * 3))
+    manager = ManagerHistory(history_file)
+    history = manager.load_history()
+    assert len(history) == 1500
+    assert sorted(history.groupby('operand1').size().tolist()) == [500, 500, 500]
+
+def test_append_follows_replaced_file(tmp_path):
+    """
+    Test that appends go to the new file after another writer replaced it.
+    """
+    history_file = tmp_path / "history.csv"
+    log = HistoryLog(str(history_file), flush_rows=1)
+    log.append(['add', 1, 1, 2])
+    write_csv_history(str(history_file), [['multiply', 2, 3, 6]])
+    log.append(['add', 1, 2, 3])
+    log.close()
+    assert history_file.read_text(encoding='utf-8').splitlines() == [
+        'operation,operand1,operand2,result', 'multiply,2,3,6', 'add,1,2,3']
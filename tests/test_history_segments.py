@@ -0,0 +1,192 @@
+"""
+This module contains unit tests for the segmented history format.
+"""
+
+import json
+import os
+import time
+import numpy as np
+from app.history_loader import read_history_store
+from app.history_segments import SegmentedHistory, is_segmented_history, segments_path
+from app.manager_history import ManagerHistory
+
+def make_history(path, rows, segment_rows=10, **kwargs):
+    """
+    Create a segmented history with `rows` add operations.
+    """
+    history = SegmentedHistory(str(path), segment_rows=segment_rows, **kwargs)
+    for i in range(rows):
+        history.append(['add', i, 1, i + 1])
+    history.flush()
+    return history
+
+def test_segments_rotate_when_full(tmp_path):
+    """
+    Test that appends rotate to a new segment when the open one is full.
+    """
+    history = make_history(tmp_path / "history.segments", 25)
+    history.extend_columns('divide', np.arange(5.0), np.ones(5), np.arange(5.0))
+    history.close()
+    assert is_segmented_history(history.directory)
+    segments = history.segments
+    assert [(entry['start'], entry['rows'], entry['sealed']) for entry in segments] == [
+        (0, 10, True), (10, 10, True), (20, 10, True)]
+    assert segments[-1]['operations'] == ['add', 'divide']
+    assert (segments[0]['min_result'], segments[0]['max_result']) == (1.0, 10.0)
+    reopened = SegmentedHistory(history.directory)
+    assert len(reopened) == 30
+    assert reopened.read_rows()['result'].tolist()[-5:] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+def test_tail_and_row_ranges(tmp_path):
+    """
+    Test reading the last rows and a range of rows across segments.
+    """
+    history = make_history(tmp_path / "history.segments", 25)
+    assert history.tail(3)['result'].tolist() == [23.0, 24.0, 25.0]
+    assert history.tail(3).index.tolist() == [22, 23, 24]
+    rows = history.read_rows(8, 12)
+    assert rows.index.tolist() == [8, 9, 10, 11]
+    assert rows['operand1'].tolist() == [8.0, 9.0, 10.0, 11.0]
+    history.close()
+
+def test_query_skips_segments(tmp_path, monkeypatch):
+    """
+    Test that a query only reads the segments whose manifest entry can match.
+    """
+    history = make_history(tmp_path / "history.segments", 30)
+    history.close()
+    read = []
+    original = SegmentedHistory._read_segment  # pylint: disable=protected-access
+    monkeypatch.setattr(SegmentedHistory, '_read_segment',
+                        staticmethod(lambda source: read.append(source) or original(source)))
+    matches = history.query('add', (12, 14))
+    assert matches['result'].tolist() == [12.0, 13.0, 14.0]
+    assert len(read) == 1
+    assert history.query('divide').empty
+
+def test_clear_is_a_manifest_update(tmp_path):
+    """
+    Test that clearing empties the manifest and removes the segment files.
+    """
+    history = make_history(tmp_path / "history.segments", 15)
+    history.clear()
+    assert len(history) == 0
+    assert os.listdir(history.directory) == ['manifest.json']
+    history.append(['add', 1, 1, 2])
+    history.close()
+    assert len(SegmentedHistory(history.directory)) == 1
+
+def test_recover_rows_missing_from_manifest(tmp_path):
+    """
+    Test that rows flushed after the manifest was last written are recovered.
+    """
+    history = make_history(tmp_path / "history.segments", 3)
+    # The session ends without closing, as in a crash
+    path = os.path.join(history.directory, history.segments[-1]['file'])
+    with open(path, 'a', encoding='utf-8') as file:
+        file.write('multiply,2,3,6\nmultiply,2,')
+    reopened = SegmentedHistory(history.directory)
+    assert len(reopened) == 4
+    assert 'multiply' in reopened.segments[-1]['operations']
+    assert reopened.tail(1)['result'].tolist() == [6.0]
+
+def make_sessions(path, sessions, rows, **kwargs):
+    """
+    Append `rows` add operations in each of several sessions, each closing the history.
+    """
+    for session in range(sessions):
+        history = SegmentedHistory(str(path), segment_rows=100, **kwargs)
+        for i in range(rows):
+            history.append(['add', session, i, session * rows + i + 1])
+        history.close()
+
+def test_close_seals_the_open_segment(tmp_path):
+    """
+    Test that closing seals the open segment, so each session starts a new one.
+    """
+    directory = str(tmp_path / "history.segments")
+    make_sessions(directory, 2, 3, compact_segments=0)
+    history = SegmentedHistory(directory)
+    assert [(entry['rows'], entry['sealed']) for entry in history.segments] == [
+        (3, True), (3, True)]
+
+def test_compaction_merges_small_segments(tmp_path):
+    """
+    Test that the small sealed segments of short sessions are merged without losing rows.
+    """
+    directory = str(tmp_path / "history.segments")
+    make_sessions(directory, 5, 3, compact_segments=0)
+    history = SegmentedHistory(directory, segment_rows=100, compact_segments=0)
+    assert history.compact() == 4
+    assert [(entry['rows'], entry['sealed']) for entry in history.segments] == [(15, True)]
+    assert history.read_rows()['result'].tolist() == [float(i) for i in range(1, 16)]
+    assert len(os.listdir(directory)) == 2
+
+def test_background_compaction(tmp_path):
+    """
+    Test that enough small sealed segments start a background compaction when the
+    next session appends.
+    """
+    directory = str(tmp_path / "history.segments")
+    make_sessions(directory, 4, 3, compact_segments=0)
+    history = SegmentedHistory(directory, segment_rows=100, compact_segments=4)
+    history.append(['add', 0, 0, 0])
+    history.close()
+    # The segment of this session is merged too if it was sealed before the
+    # compaction started
+    assert [entry['rows'] for entry in history.segments] in ([12, 1], [13])
+    assert len(history) == 13
+
+def test_timed_flush_updates_manifest(tmp_path):
+    """
+    Test that rows flushed by the timer of an idle session are recorded in the manifest.
+    """
+    directory = str(tmp_path / "history.segments")
+    history = SegmentedHistory(directory, flush_rows=100, flush_interval=0.05)
+    history.append(['add', 1, 2, 3])
+
+    def manifest_rows():
+        with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as file:
+            return json.load(file)['segments'][-1]['rows']
+
+    deadline = time.monotonic() + 5
+    while manifest_rows() != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert manifest_rows() == 1
+    history.close()
+
+def test_manager_history_segmented_format(tmp_path):
+    """
+    Test a ManagerHistory in segmented format, importing an existing CSV history.
+    """
+    filename = str(tmp_path / "history.csv")
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write('operation,operand1,operand2,result\nadd,1,2,3\nsubtract,5,2,3\n')
+    manager = ManagerHistory(filename, history_format='segmented', segment_rows=2)
+    assert manager.filename == segments_path(filename) == str(tmp_path / "history.segments")
+    manager.add_history_batch('multiply', np.array([2.0]), np.array([4.0]), np.array([8.0]))
+    assert manager.load_history()['operation'].tolist() == ['add', 'subtract', 'multiply']
+    assert manager.tail(1)['result'].tolist() == [8.0]
+    manager.close()
+    assert len(read_history_store(manager.filename)) == 3
+
+def test_save_to_links_sealed_segments(tmp_path):
+    """
+    Test that copying between segmented histories hard-links the sealed segments.
+    """
+    source = ManagerHistory(str(tmp_path / "source.segments"), segment_rows=2)
+    source.add_history_batch('add', np.arange(5.0), np.ones(5), np.arange(5.0) + 1)
+    destination = str(tmp_path / "copy.segments")
+    source.save_to(destination)
+    copy = SegmentedHistory(destination)
+    assert [entry['sealed'] for entry in copy.segments] == [True, True, False]
+    first = os.path.join(destination, copy.segments[0]['file'])
+    assert os.stat(first).st_nlink == 2
+    copy.append(['add', 9, 1, 10])
+    copy.close()
+    assert len(SegmentedHistory(source.filename)) == 5
+    assert len(SegmentedHistory(destination)) == 6
+    source.save_to(str(tmp_path / "copy.csv"))
+    source.close()
+    with open(tmp_path / "copy.csv", encoding='utf-8') as file:
+        assert len(file.read().splitlines()) == 6
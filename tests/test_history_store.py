@@ -0,0 +1,115 @@
+"""
+This module contains unit tests for the HistoryStore class.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+from app.history_store import HistoryStore
+from app.calculator import Calculator
+from app.manager_history import ManagerHistory
+from app.observers import AutoSaveObserver
+
+def test_append_and_to_frame():
+    """
+    Test that appended operations appear in the DataFrame view.
+    """
+    store = HistoryStore(capacity=2)
+    store.append('add', 1, 2, 3)
+    store.append('divide', 6, 3, 2)
+    store.append('add', 2, 2, 4)
+    frame = store.to_frame()
+    assert len(store) == 3
+    assert list(frame['operation']) == ['add', 'divide', 'add']
+    assert list(frame['result']) == [3.0, 2.0, 4.0]
+    assert store.operations == ['add', 'divide']
+
+def test_growth_is_geometric():
+    """
+    Test that the columns grow geometrically instead of one row at a time.
+    """
+    store = HistoryStore(capacity=4)
+    capacities = set()
+    for i in range(1000):
+        store.append('add', i, 1, i + 1)
+        capacities.add(len(store.codes))
+    assert len(capacities) <= 10
+    assert store.result[999] == 1000
+
+def test_to_frame_is_cached():
+    """
+    Test that the DataFrame view is only rebuilt after the store changes.
+    """
+    store = HistoryStore()
+    store.append('add', 1, 2, 3)
+    frame = store.to_frame()
+    assert store.to_frame() is frame
+    store.append('add', 1, 2, 3)
+    assert store.to_frame() is not frame
+
+def test_exact_values_are_kept():
+    """
+    Test that numbers a float64 cannot hold are NaN in the arrays but kept exactly
+    in the DataFrame view.
+    """
+    store = HistoryStore()
+    store.append('root', -8, 3, complex(1, 1.7))
+    store.append('power', 2, 2000, 2 ** 2000)
+    store.append('add', 1, 2, 3)
+    assert math.isnan(store.result[0]) and math.isnan(store.result[1])
+    assert store.to_frame()['result'].tolist() == [complex(1, 1.7), 2 ** 2000, 3.0]
+    assert store.take(np.array([1, 2]))['result'].tolist() == [2 ** 2000, 3.0]
+    copy = HistoryStore()
+    copy.append('add', 1, 1, 2)
+    copy.extend_store(store)
+    assert copy.to_frame()['result'].tolist()[1:3] == [complex(1, 1.7), 2 ** 2000]
+    store.clear()
+    store.append('add', 1, 2, 3)
+    assert store.to_frame()['result'].tolist() == [3.0]
+
+def test_exact_values_match_history_file(tmp_path):
+    """
+    Test that an exact integer power is the same in memory and after reloading the
+    CSV history written by the AutoSaveObserver.
+    """
+    history_file = str(tmp_path / "history.csv")
+    calculator = Calculator()
+    calculator.add_observer(AutoSaveObserver(ManagerHistory(history_file, flush_rows=1)))
+    calculator.execute_operation('power', 2, 2000)
+    calculator.execute_operation('add', 1, 2)
+    assert calculator.get_history()['result'].tolist() == [2 ** 2000, 3]
+    reloaded = Calculator()
+    reloaded.load_history(history_file)
+    assert reloaded.get_history()['result'].tolist() == [2 ** 2000, 3]
+
+def test_from_frame():
+    """
+    Test creating a store from a DataFrame with missing and invalid values.
+    """
+    frame = pd.DataFrame({'operation': ['add', 'multiply'],
+                          'operand1': [1, 2], 'operand2': [2, 3], 'result': [3, 'six']})
+    store = HistoryStore.from_frame(frame)
+    assert len(store) == 2
+    restored = store.to_frame()
+    assert restored.iloc[1]['operation'] == 'multiply'
+    assert pd.isna(restored.iloc[1]['result'])
+
+def test_clear():
+    """
+    Test clearing the store.
+    """
+    store = HistoryStore()
+    store.append('add', 1, 2, 3)
+    store.clear()
+    assert len(store) == 0
+    assert store.to_frame().empty
+
+def test_calculator_history_setter():
+    """
+    Test that assigning a DataFrame to Calculator.history replaces the store.
+    """
+    calc = Calculator()
+    calc.history = pd.DataFrame([{'operation': 'add', 'operand1': 1, 'operand2': 1, 'result': 2}])
+    calc.execute_operation('subtract', 5, 3)
+    history = calc.get_history()
+    assert list(history['operation']) == ['add', 'subtract']
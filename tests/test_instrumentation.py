@@ -0,0 +1,84 @@
+"""
+This module contains unit tests for the instrumentation module.
+"""
+
+import pytest
+from app.calculator import Calculator
+from app.instrumentation import Instrumentation, LatencyHistogram, instrumentation, timed
+from app.manager_history import ManagerHistory
+from app.observers import LoggingObserver
+
+@pytest.fixture(name='enabled')
+def fixture_enabled():
+    """
+    Enable the global instrumentation for a test and reset it afterwards.
+    """
+    instrumentation.reset()
+    instrumentation.enable()
+    yield instrumentation
+    instrumentation.enable(False)
+    instrumentation.reset()
+
+def test_histogram_buckets_and_quantiles():
+    """
+    Test that calls land in the right buckets and quantiles use the bucket bounds.
+    """
+    histogram = LatencyHistogram()
+    for elapsed_ns in [500, 1_500, 1_500, 3_000_000, 5_000_000_000]:
+        histogram.record(elapsed_ns)
+    histogram.record(1_000, error=True)
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 6
+    assert snapshot['errors'] == 1
+    assert snapshot['buckets'] == {'1us': 2, '2us': 2, '5ms': 1, 'inf': 1}
+    assert snapshot['p50_us'] == 2.0
+    assert snapshot['p99_us'] == 5_000_000.0
+    assert snapshot['min_us'] == 0.5
+
+def test_disabled_instrumentation_records_nothing():
+    """
+    Test that nothing is recorded while instrumentation is disabled.
+    """
+    instrumentation.reset()
+    Calculator().execute_operation('add', 1, 2)
+    assert not instrumentation.snapshot()
+
+def test_timed_records_calls_and_errors():
+    """
+    Test that the timed decorator counts calls and errors.
+    """
+    registry = Instrumentation(enabled=True)
+    registry.call('ok', lambda: None)
+    with pytest.raises(ZeroDivisionError):
+        registry.call('fail', lambda: 1 / 0)
+    assert registry.snapshot()['ok']['count'] == 1
+    assert registry.snapshot()['fail']['errors'] == 1
+
+    @timed('test.double')
+    def double(x):
+        return 2 * x
+    assert double(2) == 4
+    assert 'test.double' not in registry.snapshot()
+
+def test_calculator_hot_paths_are_instrumented(enabled, tmp_path, capsys):
+    """
+    Test that strategy execution, observer fan-out and history I/O are recorded.
+    """
+    calc = Calculator()
+    calc.add_observer(LoggingObserver())
+    calc.execute_operation('add', 1, 2)
+    with pytest.raises(ValueError):
+        calc.execute_operation('divide', 1, 0)
+    manager = ManagerHistory(str(tmp_path / 'history.csv'))
+    manager.save_history(calc.get_history())
+    manager.load_history()
+    capsys.readouterr()
+    snapshot = enabled.snapshot()
+    assert snapshot['calculator.execute_operation']['count'] == 2
+    assert snapshot['calculator.execute_operation']['errors'] == 1
+    assert snapshot['strategy.add']['count'] == 1
+    assert snapshot['strategy.divide']['errors'] == 1
+    assert snapshot['observer.LoggingObserver']['count'] == 1
+    assert snapshot['calculator.notify_observers']['count'] == 1
+    assert snapshot['history_file.save_history']['count'] == 1
+    assert snapshot['history_file.load_history']['count'] == 1
@@ -0,0 +1,40 @@
+"""
+This module contains tests for lazy imports of heavy dependencies.
+"""
+
+import subprocess
+import sys
+from app.lazy import lazy_import
+
+def imported_modules(code):
+    """
+    Run code in a fresh interpreter and report whether pandas and numpy were imported.
+    """
+    check = "import sys; print('pandas' in sys.modules, 'numpy' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', f"{code}; {check}"], capture_output=True,
+                            text=True, check=True).stdout.split()
+    return output[0] == 'True', output[1] == 'True'
+
+def test_lazy_module():
+    """
+    Test that a lazy module imports on first attribute access.
+    """
+    module = lazy_import('json')
+    assert 'not imported' in repr(module)
+    assert module.dumps([1]) == '[1]'
+    assert "'json' (imported)" in repr(module)
+
+def test_core_does_not_import_pandas_or_numpy():
+    """
+    Test that the arithmetic core starts without pandas or numpy.
+    """
+    code = "import app.strategies, app.strategy_factory, app.plugins"
+    assert imported_modules(code) == (False, False)
+
+def test_calculation_does_not_import_pandas():
+    """
+    Test that a single calculation does not import pandas.
+    """
+    code = "from app import Calculator; Calculator().execute_operation('add', 1, 2)"
+    pandas_imported, _ = imported_modules(code)
+    assert not pandas_imported
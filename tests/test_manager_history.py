@@ -4,6 +4,7 @@ This module contains unit tests for the ManagerHistory class.
 
 import os
 import pandas as pd  # Import pandas
+import pytest
 from app.manager_history import ManagerHistory
 from app.history import History
 
@@ -182,3 +183,96 @@ def test_load_history_with_extra_columns(tmp_path):
     assert history.iloc[0]['operand1'] == 1
     assert history.iloc[0]['operand2'] == 2
     assert history.iloc[0]['result'] == 3
+
+def test_iter_history_chunks(tmp_path):
+    """
+    Test iterating over the history file in chunks.
+    """
+    history_file = tmp_path / "chunked_history.csv"
+    rows = "".join(f"add,{i},1,{i + 1}\n" for i in range(10))
+    history_file.write_text("operation,operand1,operand2,result\n" + rows, encoding='utf-8')
+    manager = ManagerHistory(str(history_file))
+    chunks = list(manager.iter_history(chunksize=4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert chunks[-1].iloc[-1]['result'] == 10
+    assert all(chunk['operand1'].dtype == 'float64' for chunk in chunks)
+
+def test_iter_history_with_ragged_rows(tmp_path):
+    """
+    Test iterating over a history file whose rows have varying numbers of fields.
+    """
+    ragged_file = tmp_path / "ragged_history.csv"
+    ragged_file.write_text("operation,operand1,operand2,result\n"
+                           "add,1,2,3\nadd,1,2\nadd,1,2,3,4,5\nadd,2,2,4,x\n", encoding='utf-8')
+    manager = ManagerHistory(str(ragged_file))
+    history = pd.concat(manager.iter_history(chunksize=1), ignore_index=True)
+    assert len(history) == 4
+    assert history['operand1'].tolist() == [1, 1, 1, 2]
+    assert pd.isna(history.iloc[1]['result'])
+    assert history.iloc[3]['result'] == 4
+
+def test_load_from_same_file(tmp_path):
+    """
+    Test that loading history from the history file itself keeps its contents.
+    """
+    history_file = tmp_path / "history.csv"
+    manager = ManagerHistory(str(history_file))
+    manager.add_history(History('add', 1, 2, 3))
+    manager.load_from(str(history_file))
+    assert len(manager.load_history()) == 1
+
+def test_save_history_to_same_file_by_another_name(tmp_path, monkeypatch):
+    """
+    Test that saving to the history file under another spelling of its name replaces
+    the rows still buffered for it, instead of appending them to the saved history.
+    """
+    monkeypatch.chdir(tmp_path)
+    manager = ManagerHistory(str(tmp_path / "history.csv"), flush_rows=100)
+    manager.add_history(History('add', 1, 2, 3))
+    manager.save_history([History('multiply', 2, 3, 6)], filename=os.path.join('.', 'history.csv'))
+    manager.add_history(History('subtract', 5, 1, 4))
+    manager.log.close()
+    assert manager.load_history()['operation'].tolist() == ['multiply', 'subtract']
+
+def test_save_history_frame_format(tmp_path):
+    """
+    Test that saving a DataFrame writes the same rows as the csv module would.
+    """
+    filename = str(tmp_path / 'history.csv')
+    manager = ManagerHistory(filename)
+    frame = pd.DataFrame({'operation': ['add', 'divide'], 'operand1': [1, 6.5],
+                          'operand2': [2, float('nan')], 'result': [3, 0.1]})
+    manager.save_history(frame)
+    with open(filename, encoding='utf-8') as file:
+        assert file.read().splitlines() == ['operation,operand1,operand2,result',
+                                            'add,1.0,2.0,3.0', 'divide,6.5,nan,0.1']
+    manager.save_history([History('add', 1, 2, 3)])
+    assert manager.load_history()['result'].tolist() == [3.0]
+
+def test_save_history_is_atomic(tmp_path):
+    """
+    Test that a failure while saving leaves the previous history file intact.
+    """
+    filename = str(tmp_path / 'history.csv')
+    manager = ManagerHistory(filename)
+    manager.save_history([History('add', 1, 2, 3)])
+
+    class FailingHistory(History):
+        """
+        A history record that fails while it is written.
+        """
+        @property
+        def result(self):
+            """
+            Fail to read the result.
+            """
+            raise RuntimeError("disk full")
+
+        @result.setter
+        def result(self, value):
+            pass
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        manager.save_history([History('multiply', 2, 3, 6), FailingHistory('add', 0, 0, 0)])
+    assert manager.load_history()['operation'].tolist() == ['add']
+    assert os.listdir(tmp_path) == ['history.csv']
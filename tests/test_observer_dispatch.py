@@ -0,0 +1,179 @@
+"""
+This module contains unit tests for the ObserverDispatcher class.
+"""
+
+import threading
+import numpy as np
+import pytest
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.observer_dispatch import ObserverDispatcher, coalesce
+
+class RecordingObserver:
+    """
+    An observer that records its updates, optionally waiting on an event first.
+    """
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.updates = []
+        self.batches = []
+
+    def update(self, operation, operand1, operand2, result):
+        """
+        Record a single update.
+        """
+        if self.gate is not None:
+            self.gate.wait()
+        self.updates.append((operation, operand1, operand2, result))
+
+    def update_batch(self, operation, operands1, operands2, results):
+        """
+        Record a batch update.
+        """
+        if self.gate is not None:
+            self.gate.wait()
+        self.batches.append((operation, operands1.tolist(), operands2.tolist(),
+                             results.tolist()))
+
+def make_calculator(observer, maxsize=1024, policy='block'):
+    """
+    Create a Calculator with async observer dispatch and one observer.
+    """
+    config = CalculatorConfig(observer_dispatch='async', observer_queue_size=maxsize,
+                              observer_backpressure=policy)
+    calc = Calculator(config)
+    calc.add_observer(observer)
+    return calc
+
+def test_async_dispatch_delivers_in_order():
+    """
+    Test that async dispatch delivers every update, in order, after flush.
+    """
+    observer = RecordingObserver()
+    calc = make_calculator(observer)
+    calc.execute_operation('add', 1, 2)
+    calc.execute_operation('multiply', 2, 3)
+    calc.execute_batch('subtract', [5, 6], [1, 1])
+    calc.flush_observers()
+    assert observer.updates == [('add', 1, 2, 3), ('multiply', 2, 3, 6)]
+    assert observer.batches == [('subtract', [5.0, 6.0], [1.0, 1.0], [4.0, 5.0])]
+    calc.close_observers()
+
+def test_async_dispatch_does_not_wait_for_observers():
+    """
+    Test that calculations return while an observer is still blocked.
+    """
+    gate = threading.Event()
+    observer = RecordingObserver(gate)
+    calc = make_calculator(observer)
+    assert calc.execute_operation('add', 1, 2) == 3
+    assert not observer.updates
+    gate.set()
+    calc.close_observers()
+    assert observer.updates == [('add', 1, 2, 3)]
+
+def test_drop_policy():
+    """
+    Test that the drop policy discards updates while the queue is full.
+    """
+    gate = threading.Event()
+    observer = RecordingObserver(gate)
+    calc = make_calculator(observer, maxsize=1, policy='drop')
+    for i in range(5):
+        calc.execute_operation('add', i, 0)
+    dropped = calc.dispatcher.dropped
+    gate.set()
+    calc.close_observers()
+    assert dropped >= 3
+    assert len(observer.updates) == 5 - dropped
+
+def test_coalesce_policy():
+    """
+    Test that the coalesce policy merges updates into a batch instead of losing them.
+    """
+    gate = threading.Event()
+    observer = RecordingObserver(gate)
+    calc = make_calculator(observer, maxsize=1, policy='coalesce')
+    for i in range(5):
+        calc.execute_operation('add', i, 1)
+    gate.set()
+    calc.close_observers()
+    delivered = [row[1] for row in observer.updates]
+    for _, operands1, _, _ in observer.batches:
+        delivered.extend(operands1)
+    assert delivered == [0, 1, 2, 3, 4]
+    assert observer.batches
+
+def test_coalesce_merges_events_once():
+    """
+    Test that coalesced single and batch events are merged into one batch, in order.
+    """
+    operation, a, b, result, is_batch = coalesce([
+        ('add', 1, 2, 3, False),
+        ('multiply', np.array([2.0, 3.0]), np.array([2.0, 2.0]), np.array([4.0, 6.0]), True),
+        (np.array(['subtract'], dtype=object), np.array([5.0]), np.array([1.0]),
+         np.array([4.0]), True)])
+    assert is_batch
+    assert operation.tolist() == ['add', 'multiply', 'multiply', 'subtract']
+    assert a.tolist() == [1.0, 2.0, 3.0, 5.0]
+    assert b.tolist() == [2.0, 2.0, 2.0, 1.0]
+    assert result.tolist() == [3.0, 4.0, 6.0, 4.0]
+
+def test_observer_errors_are_logged(caplog):
+    """
+    Test that an observer error does not stop the dispatcher.
+    """
+    def fail(*_):
+        raise RuntimeError("boom")
+    delivered = []
+    dispatcher = ObserverDispatcher(fail, lambda *args: delivered.append(args))
+    dispatcher.submit('add', 1, 2, 3)
+    dispatcher.submit_batch('add', np.ones(2), np.ones(2), np.full(2, 2.0))
+    dispatcher.close()
+    assert "Observer failed" in caplog.text
+    assert len(delivered) == 1
+
+def test_closed_dispatcher_rejects_updates():
+    """
+    Test that a closed dispatcher raises on submit, while the calculator falls back
+    to synchronous updates.
+    """
+    dispatcher = ObserverDispatcher(print, print)
+    dispatcher.close()
+    with pytest.raises(ValueError, match="closed"):
+        dispatcher.submit('add', 1, 2, 3)
+    observer = RecordingObserver()
+    calc = make_calculator(observer)
+    calc.close_observers()
+    calc.execute_operation('add', 1, 2)
+    assert observer.updates == [('add', 1, 2, 3)]
+
+def test_blocked_update_is_delivered_after_close():
+    """
+    Test that an update waiting for room in a full queue when the dispatcher is
+    closed is still delivered, after the queued ones.
+    """
+    gate = threading.Event()
+    observer = RecordingObserver(gate)
+    dispatcher = ObserverDispatcher(observer.update, observer.update_batch, maxsize=1)
+    dispatcher.submit('add', 1, 1, 2)
+    dispatcher.submit('add', 2, 2, 4)
+    producer = threading.Thread(target=dispatcher.submit, args=('add', 3, 3, 6))
+    producer.start()
+    producer.join(0.05)
+    assert producer.is_alive()
+    closer = threading.Thread(target=dispatcher.close)
+    closer.start()
+    gate.set()
+    producer.join()
+    closer.join()
+    assert observer.updates == [('add', 1, 1, 2), ('add', 2, 2, 4), ('add', 3, 3, 6)]
+
+def test_invalid_dispatcher_settings():
+    """
+    Test that invalid queue sizes and policies are rejected.
+    """
+    with pytest.raises(ValueError, match="at least 1"):
+        ObserverDispatcher(print, print, maxsize=0)
+    with pytest.raises(ValueError, match="Unknown backpressure policy"):
+        ObserverDispatcher(print, print, policy='spill')
@@ -0,0 +1,30 @@
+"""
+This module contains unit tests for the observer classes.
+"""
+
+import io
+from app.observers import LoggingObserver
+
+def test_logging_observer_buffers_output():
+    """
+    Test that a buffered LoggingObserver writes pending lines together, in order.
+    """
+    stream = io.StringIO()
+    observer = LoggingObserver(buffered=True, stream=stream, flush_lines=3, flush_interval=3600)
+    observer.update('add', 1, 2, 3)
+    observer.update('subtract', 5, 2, 3)
+    assert stream.getvalue() == ''
+    observer.update('multiply', 2, 3, 6)
+    assert stream.getvalue().splitlines() == [
+        'Logging: add,1,2,3', 'Logging: subtract,5,2,3', 'Logging: multiply,2,3,6']
+    observer.update('divide', 6, 3, 2)
+    observer.close()
+    assert stream.getvalue().splitlines()[-1] == 'Logging: divide,6,3,2'
+
+def test_logging_observer_unbuffered(capsys):
+    """
+    Test that an unbuffered LoggingObserver prints each operation at once.
+    """
+    observer = LoggingObserver()
+    observer.update('add', 1, 2, 3)
+    assert capsys.readouterr().out == 'Logging: add,1,2,3\n'
@@ -0,0 +1,74 @@
+"""
+This module contains unit tests for the parallel batch engine.
+"""
+
+import io
+from app.batch import run_batch
+from app.calculator import Calculator
+from app.parallel import evaluate_shard, run_parallel, shard_file, worth_parallel
+
+LINES = ['add 1 2', 'divide 6 0', '# comment', '', '{"op": "power", "a": 2, "b": 10}',
+         'modulo 1 2', 'subtract 5 x', 'root 27 3', 'multiply 2.5 4']
+
+def write_input(tmp_path, repeat=20):
+    """
+    Write an input file with a mix of valid, failing and malformed lines.
+    """
+    path = tmp_path / 'operations.txt'
+    path.write_text('\n'.join(LINES * repeat) + '\n', encoding='utf-8')
+    return str(path)
+
+def test_shard_file_covers_whole_lines(tmp_path):
+    """
+    Test that shards partition the file at line ends.
+    """
+    filename = write_input(tmp_path)
+    shards = shard_file(filename, shard_size=50)
+    with open(filename, 'rb') as file:
+        data = file.read()
+    assert shards[0][0] == 0 and shards[-1][1] == len(data)
+    for (_, end), (start, _) in zip(shards, shards[1:]):
+        assert end == start
+        assert data[end - 1:end] == b'\n'
+    assert shard_file(filename, shard_size=1 << 20) == [(0, len(data))]
+
+def test_evaluate_shard(tmp_path):
+    """
+    Test evaluating a single shard.
+    """
+    filename = write_input(tmp_path, repeat=1)
+    text, total, failed, (operations, _, _, result) = evaluate_shard(filename, 0, 8)
+    assert text == '3.0\n'
+    assert (total, failed) == (1, {})
+    assert operations.tolist() == ['add'] and result.tolist() == [3.0]
+
+def test_run_parallel_matches_sequential_batch(tmp_path):
+    """
+    Test that the parallel engine writes the same output and history, in input order,
+    as the sequential batch mode.
+    """
+    filename = write_input(tmp_path)
+    sequential, parallel = io.StringIO(), io.StringIO()
+    calc_sequential, calc_parallel = Calculator(), Calculator()
+    with open(filename, encoding='utf-8') as infile:
+        expected = run_batch(infile, sequential, calc_sequential, chunksize=7)
+    assert run_parallel(filename, parallel, calc_parallel, workers=2, shard_size=64,
+                        chunksize=3) == expected
+    assert parallel.getvalue() == sequential.getvalue()
+    assert calc_parallel.get_history().equals(calc_sequential.get_history())
+    assert calc_parallel.get_statistics() == calc_sequential.get_statistics()
+    assert calc_parallel.get_statistics()['divide']['errors'] == 20
+
+def test_worth_parallel(tmp_path, monkeypatch):
+    """
+    Test that only large files on several CPUs are evaluated in worker processes.
+    """
+    filename = write_input(tmp_path)
+    monkeypatch.setattr('os.cpu_count', lambda: 4)
+    assert not worth_parallel(filename, 2)
+    monkeypatch.setattr('app.parallel.MIN_PARALLEL_SIZE', 1)
+    assert worth_parallel(filename, 2)
+    assert worth_parallel(filename)
+    assert not worth_parallel(filename, 1)
+    monkeypatch.setattr('os.cpu_count', lambda: 1)
+    assert not worth_parallel(filename, 2)
@@ -2,7 +2,10 @@
 This module contains tests for the plugin loading functionality.
 """
 
-from app.plugins import load_plugins
+import json
+import os
+import sys
+from app.plugins import LazyPlugin, discover_plugins, load_plugins
 
 def test_load_plugins():
     """
@@ -15,3 +18,53 @@ def test_load_plugins():
     assert 'divide' in plugins
     assert 'power' in plugins
     assert 'root' in plugins
+
+def test_plugins_are_imported_on_first_call(tmp_path):
+    """
+    Test that discovery does not import plugin modules and that a call does.
+    """
+    (tmp_path / 'modulo.py').write_text("def modulo(a, b):\n    return a % b\n"
+                                        "def _helper():\n    pass\n")
+    plugins = discover_plugins(str(tmp_path), package=None)
+    assert list(plugins) == ['modulo']
+    assert isinstance(plugins['modulo'], LazyPlugin)
+    assert not plugins['modulo'].loaded
+    assert 'modulo' not in sys.modules
+    assert plugins['modulo'](7, 4) == 3
+    assert plugins['modulo'].loaded
+
+def test_manifest_is_reused_until_a_plugin_changes(tmp_path, monkeypatch):
+    """
+    Test that unchanged plugins are not parsed again and changed ones are.
+    """
+    plugin = tmp_path / 'double.py'
+    plugin.write_text("def double(a, b):\n    return 2 * a\n")
+    manifest_file = str(tmp_path / 'manifest.json')
+    discover_plugins(str(tmp_path), package=None, manifest_file=manifest_file)
+    with open(manifest_file, encoding='utf-8') as file:
+        entry = json.load(file)['plugins']['double.py']
+    assert entry['functions'] == ['double']
+    assert len(entry['sha256']) == 64
+
+    parsed = []
+    monkeypatch.setattr('app.plugins._public_functions',
+                        lambda source, filename: parsed.append(filename) or ['triple'])
+    assert list(discover_plugins(str(tmp_path), package=None,
+                                 manifest_file=manifest_file)) == ['double']
+    # A new modification time with the same content is resolved by the hash
+    os.utime(plugin, ns=(entry['mtime_ns'] + 10**9, entry['mtime_ns'] + 10**9))
+    assert list(discover_plugins(str(tmp_path), package=None,
+                                 manifest_file=manifest_file)) == ['double']
+    assert not parsed
+    plugin.write_text("def triple(a, b):\n    return 3 * a\n")
+    assert list(discover_plugins(str(tmp_path), package=None,
+                                 manifest_file=manifest_file)) == ['triple']
+    assert len(parsed) == 1
+
+def test_invalid_plugins_are_skipped(tmp_path, caplog):
+    """
+    Test that plugins with syntax errors are skipped with a warning.
+    """
+    (tmp_path / 'broken.py').write_text("def broken(a, b)\n")
+    assert not discover_plugins(str(tmp_path), package=None)
+    assert "Skipping plugin" in caplog.text
@@ -0,0 +1,118 @@
+"""
+This module contains unit tests for the cost-bounded power and root engine.
+"""
+
+import math
+import random
+import time
+import pytest
+from app.calculator import Calculator
+from app.power_engine import PowerLimits, bounded_power, bounded_root, integer_root
+from app.strategies import PowerStrategy, RootStrategy
+
+def test_integer_root():
+    """
+    Test that integer roots are floors of the exact roots.
+    """
+    rng = random.Random(0)
+    for _ in range(2000):
+        n = rng.randint(1, 40)
+        a = rng.getrandbits(rng.randint(1, 500))
+        root = integer_root(a, n)
+        assert root ** n <= a < (root + 1) ** n
+    assert integer_root(3 ** 30000, 3) == 3 ** 10000
+    assert integer_root(0, 5) == 0 and integer_root(1, 5) == 1
+
+def test_integer_root_deadline():
+    """
+    Test that an integer root gives up once its deadline has passed.
+    """
+    with pytest.raises(ValueError, match="time limit"):
+        integer_root(7 ** 20000, 3, deadline=time.perf_counter() - 1)
+
+@pytest.mark.parametrize("a, b, expected", [
+    (2, 10, 1024),
+    (2, -3, 0.125),
+    (-2, 3.0, -8.0),
+    (2.0, 0.5, math.sqrt(2)),
+    (1, 10 ** 12, 1),
+])
+def test_bounded_power(a, b, expected):
+    """
+    Test exponentiation within the budgets.
+    """
+    assert bounded_power(a, b) == pytest.approx(expected)
+
+@pytest.mark.parametrize("a, b, message", [
+    (10, 10_000_000, "over the limit of"),
+    (0, -1, "Cannot raise zero to a negative power"),
+    (-8.0, 1 / 3, "Cannot raise a negative number to a fractional power"),
+    (10.0, 400, "too large for a float"),
+])
+def test_bounded_power_errors(a, b, message):
+    """
+    Test that powers exceeding a budget or the reals raise ValueError quickly.
+    """
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match=message):
+        bounded_power(a, b)
+    assert time.perf_counter() - start < 0.1
+
+@pytest.mark.parametrize("a, b, expected", [
+    (27, 3, 3),
+    (1000.0, 3.0, 10.0),
+    (-8, 3, -2),
+    (27, -3, 1 / 3),
+    (2, 2, math.sqrt(2)),
+    (8, 1.5, 4.0),
+    (10 ** 401, 2, math.sqrt(10) * 1e200),
+])
+def test_bounded_root(a, b, expected):
+    """
+    Test roots, which are exact for exact integer roots.
+    """
+    assert bounded_root(a, b) == pytest.approx(expected, rel=1e-15)
+
+def test_exact_roots_keep_integers():
+    """
+    Test that exact roots of ints are ints, even beyond the float range.
+    """
+    assert bounded_root(10 ** 400, 2) == 10 ** 200
+    assert isinstance(bounded_root(64, 3), int)
+    assert isinstance(bounded_root(64.0, 3), float)
+
+@pytest.mark.parametrize("a, b, message", [
+    (27, 0, "Cannot take root with zero"),
+    (-4, 2, "Cannot take an even root of a negative number"),
+    (-8, 0.5, "Cannot take a fractional root of a negative number"),
+    (0, -2, "Cannot take a negative root of zero"),
+])
+def test_bounded_root_errors(a, b, message):
+    """
+    Test that roots that are not real numbers raise ValueError.
+    """
+    with pytest.raises(ValueError, match=message):
+        bounded_root(a, b)
+
+def test_strategies_use_their_limits():
+    """
+    Test that strategies enforce the budgets they are given.
+    """
+    limits = PowerLimits(max_bits=64, time_limit=1.0)
+    assert PowerStrategy(limits).execute(2, 63) == 2 ** 63
+    with pytest.raises(ValueError, match="over the limit of 64 bits"):
+        PowerStrategy(limits).execute(2, 65)
+    with pytest.raises(ValueError, match="Root operand"):
+        RootStrategy(limits).execute(2 ** 100, 2)
+    with pytest.raises(ValueError, match="time limit of 0s"):
+        RootStrategy(PowerLimits(time_limit=0)).execute(7 ** 20000, 3)
+
+def test_calculator_power_budget():
+    """
+    Test that a huge power fails fast in the calculator and is counted as an error.
+    """
+    calc = Calculator()
+    with pytest.raises(ValueError, match="over the limit"):
+        calc.execute_operation('power', 10, 10_000_000)
+    assert calc.get_statistics('power')['errors'] == 1
+    assert calc.get_history().empty
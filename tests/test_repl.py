@@ -3,7 +3,10 @@ This module contains unit tests for the REPL class.
 """
 
 import pytest
+from app.calculator import Calculator
+from app.instrumentation import instrumentation
 from app.repl import REPL
+from app.strategy_factory import StrategyFactory
 
 def test_repl_commands():
     """
@@ -102,29 +105,104 @@ def test_load_plugins(monkeypatch):
     Test loading plugins in the REPL.
     """
     repl = REPL()
-    monkeypatch.setattr('os.listdir', lambda _: ['add.py', 'subtract.py'])
+    repl.calculator = Calculator()
+    monkeypatch.setattr('app.plugins.load_plugins',
+                        lambda: {'add': lambda a, b: a + b, 'modulo': lambda a, b: a % b})
+    repl.load_plugins()
+    assert 'add' in repl.commands
+    assert 'modulo' in repl.commands
+    inputs = iter(['7', '4'])
+    monkeypatch.setattr('builtins.input', lambda _: next(inputs))
+    monkeypatch.setattr('builtins.print', lambda x: None)
+    repl.commands['modulo']()
+    assert repl.calculator.history.iloc[-1]['operation'] == 'modulo'
+    assert repl.calculator.history.iloc[-1]['result'] == 3
+    StrategyFactory.unregister_strategy('modulo')
 
-    class MockSpec:
-        """
-        A mock spec class for testing.
-        """
-        def __init__(self):
-            self.loader = self
-        def exec_module(self, module):
-            """
-            Mock exec_module method.
-            """
-            setattr(module, 'add', lambda a, b: a + b)
-            setattr(module, 'subtract', lambda a, b: a - b)
-        def load_module(self, _):
-            """
-            Mock load_module method.
-            """
-            return None
+def test_cache_command(monkeypatch):
+    """
+    Test the cache command in the REPL.
+    """
+    repl = REPL()
+    printed = []
+    monkeypatch.setattr('builtins.print', printed.append)
+    repl.show_cache()
+    assert printed[-1] == "Result cache is disabled"
+    monkeypatch.setenv('RESULT_CACHE_SIZE', '8')
+    repl = REPL()
+    repl.calculator.observers.remove(repl.auto_save_observer)
+    repl.calculator.clear_history()
+    inputs = iter(['power', '2', '10', 'power', '2', '10', 'cache', 'exit'])
+    monkeypatch.setattr('builtins.input', lambda _: next(inputs))
+    with pytest.raises(SystemExit):
+        repl.run()
+    assert "1 hits, 1 misses, 0 evictions" in printed[-2]
+    assert len(repl.calculator.history) == 2
 
-    monkeypatch.setattr('importlib.util.spec_from_file_location', lambda name, path: MockSpec())
-    monkeypatch.setattr('importlib.util.module_from_spec', lambda spec: spec)
+def test_stats_command(monkeypatch):
+    """
+    Test the stats command in the REPL.
+    """
+    repl = REPL()
+    printed = []
+    monkeypatch.setattr('builtins.print', printed.append)
+    repl.show_stats()
+    assert "Instrumentation is disabled" in printed[-1]
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        repl.show_stats()
+        assert printed[-1] == "No calls recorded yet"
+        Calculator().execute_operation('add', 1, 2)
+        repl.show_stats()
+    finally:
+        instrumentation.enable(False)
+        instrumentation.reset()
+    assert any(line.startswith('strategy.add') for line in printed)
 
-    repl.load_plugins()
-    assert 'add' in repl.commands
-    assert 'subtract' in repl.commands
+def test_query_command(monkeypatch):
+    """
+    Test the query command in the REPL.
+    """
+    repl = REPL()
+    repl.calculator = Calculator()
+    repl.calculator.execute_operation('add', 1, 2)
+    repl.calculator.execute_operation('divide', 8, 2)
+    printed = []
+    monkeypatch.setattr('builtins.print', printed.append)
+    inputs = iter(['divide', '1 5', '', 'x', '', '100 200'])
+    monkeypatch.setattr('builtins.input', lambda _: next(inputs))
+    repl.query_history()
+    assert printed[-1] == 'divide,8.0,2.0,4.0'
+    repl.query_history()
+    assert printed[-1].startswith('Error:')
+    repl.query_history()
+    assert printed[-1] == "No matching operations"
+
+def test_summary_command(monkeypatch):
+    """
+    Test the summary command in the REPL.
+    """
+    repl = REPL()
+    repl.calculator = Calculator()
+    printed = []
+    monkeypatch.setattr('builtins.print', printed.append)
+    repl.show_summary()
+    assert printed[-1] == "No operations recorded yet"
+    repl.calculator.execute_operation('multiply', 2, 3)
+    repl.show_summary()
+    assert printed[-1].split()[:3] == ['multiply', '1', '0']
+
+def test_eval_command(monkeypatch):
+    """
+    Test the eval command in the REPL.
+    """
+    repl = REPL()
+    printed = []
+    monkeypatch.setattr('builtins.print', printed.append)
+    inputs = iter(['2 + 3 * 4 ^ 0.5', 'root(27, 3) +'])
+    monkeypatch.setattr('builtins.input', lambda _: next(inputs))
+    repl.evaluate_expression()
+    assert printed[-1] == "Result: 8.0"
+    repl.evaluate_expression()
+    assert printed[-1] == "Error: Unexpected end of expression"
@@ -0,0 +1,141 @@
+"""
+This module contains unit tests for the ResultCache class.
+"""
+
+import pytest
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.result_cache import ResultCache
+from app.strategies import FunctionStrategy
+
+class CountingStrategy(FunctionStrategy):  # pylint: disable=too-few-public-methods
+    """
+    A strategy that counts how many times it is executed.
+    """
+    def __init__(self, func):
+        super().__init__(func)
+        self.calls = 0
+
+    def execute(self, a, b):
+        self.calls += 1
+        return super().execute(a, b)
+
+def test_cache_hits_and_misses():
+    """
+    Test that repeated calls are answered from the cache.
+    """
+    cache = ResultCache(maxsize=4)
+    strategy = CountingStrategy(lambda a, b: a ** b)
+    assert cache.execute(strategy, 2, 10) == 1024
+    assert cache.execute(strategy, 2, 10) == 1024
+    assert strategy.calls == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+    assert stats.memory > 0
+
+def test_cache_keeps_operand_types_apart():
+    """
+    Test that 1 and 1.0 are cached separately.
+    """
+    cache = ResultCache()
+    strategy = CountingStrategy(lambda a, b: a + b)
+    assert isinstance(cache.execute(strategy, 1, 2), int)
+    assert isinstance(cache.execute(strategy, 1.0, 2.0), float)
+    assert strategy.calls == 2
+
+def test_cache_keeps_signed_zeros_apart():
+    """
+    Test that 0.0 and -0.0, which compare equal, are cached separately.
+    """
+    cache = ResultCache()
+    strategy = CountingStrategy(lambda a, b: a / b)
+    assert cache.execute(strategy, 1.0, 0.5) == 2.0
+    assert str(cache.execute(strategy, 0.0, 1.0)) == '0.0'
+    assert str(cache.execute(strategy, -0.0, 1.0)) == '-0.0'
+    assert str(cache.execute(strategy, 1.0, complex(-0.0, 1.0))) == '-1j'
+    assert str(cache.execute(strategy, 1.0, complex(0.0, 1.0))) == '-1j'
+    assert strategy.calls == 5
+
+def test_cache_skips_nan_operands():
+    """
+    Test that calls with a NaN operand, which could never be looked up again, are
+    not cached.
+    """
+    cache = ResultCache()
+    strategy = CountingStrategy(lambda a, b: a + b)
+    for _ in range(3):
+        assert str(cache.execute(strategy, float('nan'), 1.0)) == 'nan'
+        assert str(cache.execute(strategy, 1.0, complex(float('nan'), 0))) == '(nan+0j)'
+    assert strategy.calls == 6
+    assert len(cache) == 0
+
+def test_cache_evicts_least_recently_used():
+    """
+    Test that the least recently used entry is evicted when the cache is full.
+    """
+    cache = ResultCache(maxsize=2)
+    strategy = CountingStrategy(lambda a, b: a + b)
+    cache.execute(strategy, 1, 1)
+    cache.execute(strategy, 2, 2)
+    cache.execute(strategy, 1, 1)
+    cache.execute(strategy, 3, 3)
+    assert cache.stats().evictions == 1
+    cache.execute(strategy, 1, 1)
+    assert strategy.calls == 3
+    cache.execute(strategy, 2, 2)
+    assert strategy.calls == 4
+
+def test_cache_memory_limit():
+    """
+    Test that the memory limit bounds the cache.
+    """
+    cache = ResultCache(maxsize=1000, max_memory=400)
+    strategy = FunctionStrategy(lambda a, b: a * b)
+    for i in range(50):
+        cache.execute(strategy, float(i), 2.0)
+    assert cache.memory <= 400
+    assert 0 < len(cache) < 50
+
+def test_cache_skips_unhashable_operands():
+    """
+    Test that calls with unhashable operands are executed without caching.
+    """
+    cache = ResultCache()
+    strategy = FunctionStrategy(lambda a, b: a + b)
+    assert cache.execute(strategy, [1], [2]) == [1, 2]
+    assert len(cache) == 0
+
+def test_invalid_cache_limits():
+    """
+    Test that limits that are not positive are rejected.
+    """
+    with pytest.raises(ValueError, match="must be positive"):
+        ResultCache(maxsize=0)
+
+def test_calculator_cache_records_history_and_never_caches_errors():
+    """
+    Test that cache hits are still recorded and that failing calls are not cached.
+    """
+    calc = Calculator(CalculatorConfig(result_cache_size=16))
+    updates = []
+
+    class Observer:  # pylint: disable=too-few-public-methods
+        """
+        An observer recording updates.
+        """
+        def update(self, *args):
+            """
+            Record an update.
+            """
+            updates.append(args)
+
+    calc.add_observer(Observer())
+    calc.execute_operation('add', 1, 2)
+    calc.execute_operation('add', 1, 2)
+    assert calc.cache.stats().hits == 1
+    assert len(calc.history) == 2
+    assert len(updates) == 2
+    for _ in range(2):
+        with pytest.raises(ValueError, match="Cannot divide by zero"):
+            calc.execute_operation('divide', 1, 0)
+    assert len(calc.cache) == 1
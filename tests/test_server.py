@@ -0,0 +1,128 @@
+"""
+This module contains unit tests for the calculation server.
+"""
+
+import asyncio
+import json
+import os
+import pytest
+from app.calculator import Calculator
+from app.calculator_config import CalculatorConfig
+from app.server import CalculationServer, parse_operations
+
+async def _exchange(reader, writer, requests):
+    """
+    Send pipelined requests and read one response per request.
+    """
+    writer.write(b''.join(json.dumps(request).encode('utf-8') + b'\n'
+                          if not isinstance(request, bytes) else request
+                          for request in requests))
+    await writer.drain()
+    return [json.loads(await reader.readline()) for _ in requests]
+
+def test_parse_operations():
+    """
+    Test that scalar and list operands are broadcast to flat arrays.
+    """
+    single, operations, a, b = parse_operations({'op': 'add', 'a': 1, 'b': 2})
+    assert single and operations.tolist() == ['add'] and a.tolist() == [1.0]
+    single, operations, a, b = parse_operations({'op': ['add', 'root'], 'a': [1, 8], 'b': 3})
+    assert not single and operations.tolist() == ['add', 'root'] and b.tolist() == [3.0, 3.0]
+    for request in ({'op': 'add', 'a': 1}, {'op': 'add', 'a': 'x', 'b': 1},
+                    {'op': 'add', 'a': [1, 2], 'b': [1, 2, 3]}, {'op': 5, 'a': 1, 'b': 2},
+                    {'op': ['add', None], 'a': 1, 'b': 2}):
+        with pytest.raises(ValueError, match="Malformed request"):
+            parse_operations(request)
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_requests_over_tcp():
+    """
+    Test single, batch, failing, malformed and command requests over TCP.
+    """
+    async def run():
+        server = await CalculationServer(Calculator()).start(port=0)
+        reader, writer = await asyncio.open_connection(*server.address)
+        responses = await _exchange(reader, writer, [
+            {'id': 1, 'op': 'add', 'a': 1, 'b': 2},
+            {'id': 2, 'op': 'divide', 'a': 1, 'b': 0},
+            {'id': 3, 'op': ['multiply', 'modulo'], 'a': [2, 5], 'b': 3},
+            b'not json\n',
+            {'id': 4, 'command': 'history_size'},
+            {'id': 5, 'command': 'restart'}])
+        responses += await _exchange(reader, writer, [
+            {'id': 6, 'op': ['add', 5], 'a': 1, 'b': 2},
+            {'id': 7, 'op': 'add', 'a': 1e308, 'b': 1e308},
+            {'id': 8, 'op': ['add', 'multiply'], 'a': 1e308, 'b': [1, 1e308]},
+            {'id': 9, 'command': 'statistics'}])
+        writer.close()
+        await server.close()
+        return responses
+
+    responses = asyncio.run(run())
+    assert responses[0] == {'id': 1, 'result': 3.0}
+    assert responses[1] == {'id': 2, 'error': "Cannot divide by zero"}
+    assert responses[2] == {'id': 3, 'result': [6.0, None],
+                            'error': [None, "Operation 'modulo' is not supported"]}
+    assert responses[3] == {'id': None, 'error': "Malformed request"}
+    assert responses[4] == {'id': 4, 'history_size': 2}
+    assert responses[5]['error'].startswith("Unknown command 'restart'")
+    assert responses[6] == {'id': 6, 'error': "Malformed request"}
+    assert responses[7] == {'id': 7, 'error': "Result is not a finite number"}
+    assert responses[8] == {'id': 8, 'result': [1e308, None],
+                            'error': [None, "Result is not a finite number"]}
+    assert responses[9]['statistics']['add']['max'] is None
+
+def test_oversized_integer_operand():
+    """
+    Test that an operand too large for a float is a malformed request and the
+    connection keeps answering later requests.
+    """
+    async def run():
+        server = await CalculationServer(Calculator()).start(port=0)
+        reader, writer = await asyncio.open_connection(*server.address)
+        responses = await _exchange(reader, writer, [
+            b'{"id": 1, "op": "add", "a": 1' + b'0' * 400 + b', "b": 1}\n',
+            {'id': 2, 'op': 'add', 'a': 1, 'b': 2}])
+        writer.close()
+        await server.close()
+        return responses
+
+    assert asyncio.run(run()) == [{'id': 1, 'error': "Malformed request"},
+                                  {'id': 2, 'result': 3.0}]
+
+def test_concurrent_clients_share_history(tmp_path):
+    """
+    Test that pipelined requests of many clients over a Unix socket are answered in
+    order, coalesced into batches and recorded in one history, with queues small
+    enough that clients are held back.
+    """
+    path = str(tmp_path / "calculator.sock")
+    calculator = Calculator(CalculatorConfig(history_enabled=True))
+
+    async def client(offset):
+        reader, writer = await asyncio.open_unix_connection(path)
+        responses = await _exchange(reader, writer, [
+            {'id': i, 'op': 'add', 'a': offset, 'b': i} for i in range(50)])
+        writer.close()
+        return responses
+
+    async def run():
+        server = await CalculationServer(calculator, queue_size=4, max_pending=8).start(path)
+        results = await asyncio.gather(*(client(offset) for offset in range(20)))
+        await server.close()
+        return server, results
+
+    server, results = asyncio.run(run())
+    for offset, responses in enumerate(results):
+        assert responses == [{'id': i, 'result': float(offset + i)} for i in range(50)]
+    assert len(calculator.store) == 1000
+    assert server.requests == 1000
+    assert server.batches < 1000
+    assert not os.path.exists(path)
+
+def test_invalid_server_limits():
+    """
+    Test that limits must be positive.
+    """
+    with pytest.raises(ValueError, match="must be positive"):
+        CalculationServer(Calculator(), max_batch=0)
@@ -0,0 +1,65 @@
+"""
+This module contains unit tests for the StrategyFactory class.
+"""
+
+import pytest
+from app.strategy_factory import StrategyFactory
+from app.strategies import AddStrategy, FunctionStrategy
+from app.calculator import Calculator
+
+def test_create_strategy_returns_singleton():
+    """
+    Test that the same strategy instance is returned for every call.
+    """
+    strategy = StrategyFactory.create_strategy('add')
+    assert isinstance(strategy, AddStrategy)
+    assert StrategyFactory.create_strategy('add') is strategy
+
+def test_create_strategy_unsupported():
+    """
+    Test that an unsupported operation raises ValueError.
+    """
+    with pytest.raises(ValueError, match="Operation 'modulo' is not supported"):
+        StrategyFactory.create_strategy('modulo')
+
+def test_register_strategy():
+    """
+    Test registering a function as a new operation at runtime.
+    """
+    try:
+        assert StrategyFactory.register_strategy('modulo', lambda a, b: a % b)
+        assert isinstance(StrategyFactory.create_strategy('modulo'), FunctionStrategy)
+        assert 'modulo' in StrategyFactory.supported_operations()
+        assert Calculator().execute_operation('modulo', 7, 3) == 1
+    finally:
+        StrategyFactory.unregister_strategy('modulo')
+    assert 'modulo' not in StrategyFactory.supported_operations()
+
+def test_register_strategy_does_not_replace_by_default():
+    """
+    Test that registering an existing operation keeps the original strategy.
+    """
+    original = StrategyFactory.create_strategy('add')
+    assert not StrategyFactory.register_strategy('add', lambda a, b: 0)
+    assert StrategyFactory.create_strategy('add') is original
+
+def test_supported_operations():
+    """
+    Test that the supported operations come from the registry.
+    """
+    operations = StrategyFactory.supported_operations()
+    for operation in ['add', 'subtract', 'multiply', 'divide', 'power', 'root']:
+        assert operation in operations
+
+def test_generation_changes_with_registry():
+    """
+    Test that the registry generation changes on register and unregister only.
+    """
+    generation = StrategyFactory.generation()
+    assert not StrategyFactory.register_strategy('add', lambda a, b: 0)
+    assert StrategyFactory.generation() == generation
+    StrategyFactory.register_strategy('modulo', lambda a, b: a % b)
+    assert StrategyFactory.generation() == generation + 1
+    StrategyFactory.unregister_strategy('modulo')
+    StrategyFactory.unregister_strategy('modulo')
+    assert StrategyFactory.generation() == generation + 2
@@ -0,0 +1,122 @@
+"""
+This module contains unit tests for the vectorized kernels and Calculator.execute_batch.
+"""
+
+import numpy as np
+import pytest
+from app.calculator import Calculator
+from app.manager_history import ManagerHistory
+from app.observers import AutoSaveObserver
+
+@pytest.mark.parametrize('operation, expected', [
+    ('add', [3.0, 5.0, 1.0]),
+    ('subtract', [-1.0, 1.0, 1.0]),
+    ('multiply', [2.0, 6.0, 0.0]),
+    ('power', [1.0, 9.0, 1.0]),
+])
+def test_execute_batch(operation, expected):
+    """
+    Test batch execution of operations without errors.
+    """
+    calc = Calculator()
+    batch = calc.execute_batch(operation, [1, 3, 1], [2, 2, 0])
+    assert batch.result.tolist() == expected
+    assert not batch.errors.any()
+    assert len(calc.get_history()) == 3
+
+def test_execute_batch_divide_by_zero():
+    """
+    Test that division by zero is reported in the error mask.
+    """
+    calc = Calculator()
+    batch = calc.execute_batch('divide', np.array([6.0, 1.0, 9.0]), np.array([3.0, 0.0, 3.0]))
+    assert batch.errors.tolist() == [False, True, False]
+    assert batch.result[0] == 2 and batch.result[2] == 3
+    assert np.isnan(batch.result[1])
+    assert calc.get_history()['result'].tolist() == [2.0, 3.0]
+
+def test_execute_batch_root():
+    """
+    Test batch roots, including root with zero.
+    """
+    calc = Calculator()
+    batch = calc.execute_batch('root', [27, 16, 4], [3, 2, 0])
+    assert batch.errors.tolist() == [False, False, True]
+    assert batch.result[:2] == pytest.approx([3, 4])
+
+def test_execute_batch_root_matches_strategy():
+    """
+    Test that batch roots agree with RootStrategy on negative bases and exact roots.
+    """
+    calc = Calculator()
+    batch = calc.execute_batch('root', [1000, -8, -4, 8], [3, 3, 2, 1.5])
+    assert batch.errors.tolist() == [False, False, True, False]
+    assert batch.result[:2].tolist() == [10.0, -2.0]
+    for a, b, result in [(1000, 3, 10.0), (-8, 3, -2.0), (8, 1.5, 4.0)]:
+        assert calc.execute_operation('root', a, b) == pytest.approx(result)
+
+def test_execute_batch_broadcasts_scalars():
+    """
+    Test that a scalar operand is broadcast against an array.
+    """
+    calc = Calculator()
+    batch = calc.execute_batch('multiply', [1, 2, 3], 2)
+    assert batch.result.tolist() == [2.0, 4.0, 6.0]
+
+def test_execute_batch_unsupported_operation():
+    """
+    Test that an unsupported operation raises ValueError.
+    """
+    calc = Calculator()
+    with pytest.raises(ValueError, match="is not supported"):
+        calc.execute_batch('modulo', [1], [2])
+
+def test_execute_batch_notifies_observers_once():
+    """
+    Test that observers receive one batch notification, or per-row updates as a fallback.
+    """
+    calls = []
+
+    class BatchObserver:
+        """
+        An observer that supports batch updates.
+        """
+        def update(self, *args):
+            """
+            Record a single update.
+            """
+            calls.append(('update', args))
+        def update_batch(self, operation, a, b, result):
+            """
+            Record a batch update.
+            """
+            calls.append(('batch', operation, len(a), len(b), len(result)))
+
+    class SimpleObserver:
+        """
+        An observer that only supports single updates.
+        """
+        # pylint: disable=too-few-public-methods
+        def update(self, *args):
+            """
+            Record a single update.
+            """
+            calls.append(('simple', args))
+
+    calc = Calculator()
+    calc.add_observer(BatchObserver())
+    calc.add_observer(SimpleObserver())
+    calc.execute_batch('add', [1, 2], [3, 4])
+    assert calls[0] == ('batch', 'add', 2, 2, 2)
+    assert calls[1:] == [('simple', ('add', 1.0, 3.0, 4.0)), ('simple', ('add', 2.0, 4.0, 6.0))]
+
+def test_execute_batch_auto_save(tmp_path):
+    """
+    Test that the auto-save observer appends a batch to the history file.
+    """
+    manager = ManagerHistory(str(tmp_path / "history.csv"))
+    calc = Calculator()
+    calc.add_observer(AutoSaveObserver(manager))
+    calc.execute_batch('divide', [4, 1, 9], [2, 0, 3])
+    history = manager.load_history()
+    assert history['result'].tolist() == [2.0, 3.0]